@@ -8,8 +8,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 # Inicializa Django
 django.setup()
 
-from channels.routing import ProtocolTypeRouter, URLRouter
+try:
+    from channels.routing import ProtocolTypeRouter
+except ImportError:
+    # channels no está en requirements.txt; para HTTP (incluido el SSE de los trabajos) basta Django
+    ProtocolTypeRouter = None
 
-application = ProtocolTypeRouter({
-    "http": get_asgi_application()
-})
\ No newline at end of file
+if ProtocolTypeRouter is not None:
+    application = ProtocolTypeRouter({
+        "http": get_asgi_application()
+    })
+else:
+    application = get_asgi_application()
@@ -166,4 +166,42 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
-}
\ No newline at end of file
+}
+
+# Caché de resultados del generador de horarios (entradas guardadas en la base de datos)
+SOLVER_CACHE_MAX_ENTRIES = config('SOLVER_CACHE_MAX_ENTRIES', default=500, cast=int)
+
+# Trabajos de generación de horarios: con GENERATION_JOBS_ASYNC=True calculate-balance los encola y
+# `manage.py run_generation_worker` los ejecuta; si no, se ejecutan dentro de la misma petición.
+# Queda desactivado por defecto porque build.sh/render-install.sh no levantan el worker: activarlo
+# solo donde haya un proceso `python manage.py run_generation_worker` corriendo junto a la web.
+GENERATION_JOBS_ASYNC = config('GENERATION_JOBS_ASYNC', default=False, cast=bool)
+GENERATION_WORKER_CONCURRENCY = config('GENERATION_WORKER_CONCURRENCY', default=2, cast=int)
+GENERATION_WORKER_POLL_SECONDS = config('GENERATION_WORKER_POLL_SECONDS', default=1.0, cast=float)
+# Procesos con que calculate-balance/batch/ resuelve los horarios de un lote
+GENERATION_BATCH_WORKERS = config('GENERATION_BATCH_WORKERS', default=4, cast=int)
+# Frecuencia máxima con que un trabajo guarda el progreso de la búsqueda tabú, y con que el
+# endpoint de eventos (SSE) lo consulta
+GENERATION_PROGRESS_INTERVAL_MS = config('GENERATION_PROGRESS_INTERVAL_MS', default=250, cast=int)
+GENERATION_EVENTS_POLL_SECONDS = config('GENERATION_EVENTS_POLL_SECONDS', default=0.5, cast=float)
+# Vigencia del ticket con que EventSource abre los eventos de un trabajo (?ticket=). Con el
+# sondeo de WSGI el navegador reconecta con la misma URL, así que cubre una generación entera.
+# Los eventos y la detención solo funcionan con GENERATION_JOBS_ASYNC=True.
+GENERATION_EVENTS_TICKET_SECONDS = config('GENERATION_EVENTS_TICKET_SECONDS', default=300, cast=int)
+
+# Caché en disco de las exportaciones de horarios (PDF/PNG). Con EXPORT_CACHE_MAX_MB=0 se desactiva.
+# EXPORT_CACHE_VERSION se aumenta cuando cambia la forma de renderizar (la plantilla ya cuenta sola).
+EXPORT_CACHE_DIR = config('EXPORT_CACHE_DIR', default=os.path.join(BASE_DIR, 'export_cache'))
+EXPORT_CACHE_MAX_MB = config('EXPORT_CACHE_MAX_MB', default=256, cast=int)
+EXPORT_CACHE_VERSION = config('EXPORT_CACHE_VERSION', default='1')
+# Navegadores Chromium que cada proceso mantiene abiertos para exportar (renders simultáneos),
+# renders antes de relanzar cada uno y segundos máximos de espera en la cola
+EXPORT_BROWSER_POOL_SIZE = config('EXPORT_BROWSER_POOL_SIZE', default=2, cast=int)
+EXPORT_BROWSER_MAX_RENDERS = config('EXPORT_BROWSER_MAX_RENDERS', default=100, cast=int)
+EXPORT_BROWSER_QUEUE_TIMEOUT = config('EXPORT_BROWSER_QUEUE_TIMEOUT', default=60, cast=float)
+# Motor de exportación por defecto: 'chromium' (plantilla HTML con Playwright) o 'pymupdf'
+# (dibujado directo, sin navegador). Cada pedido puede elegir otro con ?engine=
+EXPORT_ENGINE = config('EXPORT_ENGINE', default='chromium')
+# Horarios que se renderizan a la vez al exportar un período entero como ZIP (con Chromium,
+# además, nunca más que EXPORT_BROWSER_POOL_SIZE)
+EXPORT_BULK_WORKERS = config('EXPORT_BULK_WORKERS', default=4, cast=int)
@@ -9,3 +9,5 @@ class BaseConfig(AppConfig):
         # Crear grupos por defecto al iniciar la app
         from .permissions import create_default_groups
         create_default_groups()
+        # Invalidación del calendario precalculado de los períodos
+        from . import signals  # noqa: F401
@@ -0,0 +1,9 @@
+from .browser import BrowserPool, browser_pool
+from .cache import RenderCache, render_cache
+
+__all__ = [
+    "BrowserPool",
+    "browser_pool",
+    "RenderCache",
+    "render_cache",
+]
@@ -0,0 +1,150 @@
+import atexit
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def lanzar_chromium():
+    """Inicia Playwright y un Chromium headless. Devuelve (playwright, browser)."""
+    from playwright.sync_api import sync_playwright  # type: ignore
+    playwright = sync_playwright().start()
+    try:
+        return playwright, playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+    except BaseException:
+        playwright.stop()
+        raise
+
+
+class BrowserPool:
+    """
+    Navegadores Chromium ya lanzados, compartidos por las exportaciones del proceso.
+
+    La API síncrona de Playwright solo puede usarse desde el hilo que la inició, así que cada
+    navegador vive en su propio hilo y atiende renders de una cola común: como mucho `tamaño`
+    renders a la vez y el resto espera su turno (hasta `espera_max` segundos en la cola). Antes
+    de cada render se comprueba que el navegador siga conectado, y se relanza después de
+    `max_renders` renders o de un error, para que no acumule memoria.
+    """
+
+    def __init__(self, tamaño, max_renders=100, espera_max=60, lanzar=lanzar_chromium):
+        self.tamaño = max(1, tamaño)
+        self.max_renders = max_renders
+        self.espera_max = espera_max
+        self.lanzar = lanzar
+        self._cola = queue.Queue()
+        self._hilos = []
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+    def _iniciar_hilos(self):
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError('El pool de navegadores está cerrado')
+            while len(self._hilos) < self.tamaño:
+                hilo = threading.Thread(target=self._atender, name=f'chromium-{len(self._hilos)}', daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def _atender(self):
+        playwright = browser = None
+        renders = 0
+        while True:
+            tarea = self._cola.get()
+            if tarea is None:
+                break
+            funcion, futuro = tarea
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                if browser is not None and (renders >= self.max_renders or not browser.is_connected()):
+                    self._cerrar_navegador(playwright, browser)
+                    playwright = browser = None
+                if browser is None:
+                    playwright, browser = self.lanzar()
+                    renders = 0
+                renders += 1
+                context = browser.new_context()
+                try:
+                    futuro.set_result(funcion(context.new_page()))
+                finally:
+                    context.close()
+            except BaseException as e:
+                futuro.set_exception(e)
+                # Ante cualquier error se descarta el navegador: el siguiente render lanza otro
+                self._cerrar_navegador(playwright, browser)
+                playwright = browser = None
+        self._cerrar_navegador(playwright, browser)
+
+    @staticmethod
+    def _cerrar_navegador(playwright, browser):
+        for cerrar in (getattr(browser, 'close', None), getattr(playwright, 'stop', None)):
+            if cerrar is None:
+                continue
+            try:
+                cerrar()
+            except Exception:
+                pass
+
+    def ejecutar(self, funcion):
+        """
+        Ejecuta funcion(page) en un navegador del pool y devuelve su resultado. `espera_max` es
+        solo la espera en la cola: si vence, el render se cancela y se lanza TimeoutError; un
+        render que ya empezó se espera hasta que termine.
+        """
+        self._iniciar_hilos()
+        futuro = Future()
+        self._cola.put((funcion, futuro))
+        try:
+            return futuro.result(timeout=self.espera_max)
+        except TimeoutError:
+            if futuro.cancel():
+                raise  # Seguía en la cola: ningún navegador lo va a renderizar
+            return futuro.result()
+
+    def pdf(self, html, emular_impresion=False, **opciones):
+        """PDF A4 de `html` (por defecto con las opciones de page.pdf que usaban las vistas)."""
+        def renderizar(page):
+            if emular_impresion:
+                # Forzar estilos de impresión para que la plantilla con @page se aplique
+                try:
+                    page.emulate_media(media="print")
+                except Exception:
+                    pass
+            page.set_content(html, wait_until="networkidle")
+            return page.pdf(format="A4", **opciones)
+        return self.ejecutar(renderizar)
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrado = True
+            hilos, self._hilos = self._hilos, []
+        for _ in hilos:
+            self._cola.put(None)
+        for hilo in hilos:
+            hilo.join(timeout=10)
+
+
+def browser_pool():
+    """BrowserPool del proceso (EXPORT_BROWSER_POOL_SIZE navegadores); se crea en el primer uso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                settings.EXPORT_BROWSER_POOL_SIZE,
+                settings.EXPORT_BROWSER_MAX_RENDERS,
+                settings.EXPORT_BROWSER_QUEUE_TIMEOUT,
+            )
+            atexit.register(_pool.cerrar)
+        return _pool
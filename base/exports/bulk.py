@@ -0,0 +1,81 @@
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class _Salida:
+    """
+    Destino de ZipFile que solo junta lo escrito hasta que se lo retira con vaciar(). ZipFile
+    lo trata como un flujo no posicionable y escribe cada miembro con descriptor de datos, así
+    que nunca vuelve atrás sobre lo ya entregado.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def zip_en_paralelo(tareas, renderizar, workers=4):
+    """
+    Genera (en trozos de bytes) un ZIP con el resultado de renderizar(tarea) para cada tarea.
+
+    `renderizar` devuelve (nombre, contenido) o (nombre, None) si falló; los fallos se listan al
+    final en ERRORES.txt. Se renderizan hasta `workers` tareas a la vez y cada miembro se escribe
+    en cuanto termina su render (en el orden en que terminan), así que en memoria hay como mucho
+    unos `workers` archivos aunque el período tenga cientos de horarios.
+    """
+    salida = _Salida()
+    errores = []
+    nombres = set()
+    tareas = iter(tareas)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='exportar-zip') as pool, \
+            zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo:
+        pendientes = set()
+        try:
+            while True:
+                # Mantener `workers` renders en curso, sin encolar todo el período de una vez
+                for tarea in tareas:
+                    pendientes.add(pool.submit(renderizar, tarea))
+                    if len(pendientes) >= workers:
+                        break
+                if not pendientes:
+                    break
+                listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    nombre, contenido = futuro.result()
+                    if contenido is None:
+                        errores.append(nombre)
+                        continue
+                    nombre = _nombre_unico(nombre, nombres)
+                    # Los PDF y PNG ya vienen comprimidos: se guardan tal cual
+                    archivo.writestr(nombre, contenido)
+                    yield salida.vaciar()
+            if errores:
+                archivo.writestr('ERRORES.txt', 'No se pudieron exportar:\n' + '\n'.join(errores) + '\n')
+        finally:
+            # Si el cliente corta la descarga, no seguir renderizando lo que falta
+            for futuro in pendientes:
+                futuro.cancel()
+    yield salida.vaciar()
+
+
+def _nombre_unico(nombre, usados):
+    base, punto, extension = nombre.rpartition('.')
+    if not punto:
+        base, extension = nombre, ''
+    candidato, k = nombre, 2
+    while candidato in usados:
+        candidato = f'{base} ({k}){punto}{extension}'
+        k += 1
+    usados.add(candidato)
+    return candidato
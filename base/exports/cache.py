@@ -0,0 +1,120 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+PLANTILLA = 'plantilla_horario.html'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class RenderCache:
+    """
+    Caché en disco de exportaciones ya renderizadas: un archivo por clave, escrito en un
+    temporal del mismo directorio y movido con os.replace (nunca se lee un archivo a medias).
+    La fecha de modificación marca el último uso; al superar `max_bytes` se borran los menos
+    usados. La comparten todos los procesos que apunten al mismo directorio.
+    """
+
+    def __init__(self, directorio, max_bytes, version=''):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.version = version
+        self._lock = threading.Lock()
+
+    @property
+    def activa(self):
+        return self.max_bytes > 0
+
+    def clave(self, *partes):
+        """Clave de una exportación: las partes (horario, formato, dpi...) más la versión del render."""
+        texto = '|'.join(str(parte) for parte in (self.version,) + partes)
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave)
+
+    def get(self, clave):
+        """Contenido guardado para `clave`, o None."""
+        if not self.activa:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                contenido = archivo.read()
+            os.utime(ruta)  # Último uso, para el LRU
+            return contenido
+        except FileNotFoundError:
+            return None
+
+    def put(self, clave, contenido):
+        if not self.activa or len(contenido) > self.max_bytes:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=self.directorio, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, self._ruta(clave))
+        except BaseException:
+            try:
+                os.unlink(temporal)
+            except FileNotFoundError:
+                pass
+            raise
+        self.podar()
+
+    def podar(self):
+        """Borra los archivos usados hace más tiempo hasta que el total quede bajo `max_bytes`."""
+        with self._lock:
+            archivos = []
+            total = 0
+            with os.scandir(self.directorio) as entradas:
+                for entrada in entradas:
+                    if entrada.name.startswith('.tmp-') or not entrada.is_file():
+                        continue
+                    info = entrada.stat()
+                    archivos.append((info.st_mtime, info.st_size, entrada.path))
+                    total += info.st_size
+            if total <= self.max_bytes:
+                return
+            for _, tamaño, ruta in sorted(archivos):
+                try:
+                    os.unlink(ruta)
+                except FileNotFoundError:
+                    continue
+                total -= tamaño
+                if total <= self.max_bytes:
+                    break
+
+    def limpiar(self):
+        with self._lock:
+            if not os.path.isdir(self.directorio):
+                return
+            with os.scandir(self.directorio) as entradas:
+                for entrada in entradas:
+                    if entrada.is_file():
+                        os.unlink(entrada.path)
+
+
+def version_plantilla():
+    """Hash de la plantilla HTML de las exportaciones: si cambia, las entradas viejas dejan de usarse."""
+    from django.template.loader import get_template
+    origen = get_template(PLANTILLA).template.source
+    return hashlib.sha1(origen.encode()).hexdigest()[:12]
+
+
+def render_cache():
+    """RenderCache del proceso, configurada con EXPORT_CACHE_DIR / EXPORT_CACHE_MAX_MB."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache(
+                settings.EXPORT_CACHE_DIR,
+                settings.EXPORT_CACHE_MAX_MB * 1024 * 1024,
+                f'{settings.EXPORT_CACHE_VERSION}:{version_plantilla()}',
+            )
+        return _cache
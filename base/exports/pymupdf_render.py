@@ -0,0 +1,254 @@
+"""
+Exportación del horario dibujada directamente con PyMuPDF, sin Chromium ni HTML.
+
+Reproduce la disposición de plantilla_horario.html (A4 apaisado: encabezado, 24 semanas en
+4 filas de 6 y el pie con las leyendas) a partir del mismo contexto que arma
+build_schedule_pdf_context, de modo que el contenido de cada celda es el mismo.
+"""
+
+ANCHO, ALTO = 842, 595  # A4 apaisado, en puntos
+MARGEN_SUPERIOR, MARGEN = 3, 11  # @page { margin: 1mm 4mm 4mm 4mm }
+
+ALTO_ENCABEZADO = 46
+SEMANAS_POR_FILA = 6
+DIAS = ('L', 'M', 'M', 'J', 'V', 'S')
+TURNOS = 6
+RELLENO_SEMANA = 3
+ALTO_TITULO = 10
+ALTO_DIAS = 12
+ALTO_CELDA = 13
+ALTO_FILA_LEYENDA = 10
+ALTO_ENCABEZADO_LEYENDA = 12
+
+NEGRO = (0, 0, 0)
+
+
+_fuentes = {}
+
+
+def _fuente(nombre):
+    import fitz  # PyMuPDF
+    if nombre not in _fuentes:
+        _fuentes[nombre] = fitz.Font(nombre)
+    return _fuentes[nombre]
+
+
+def _ancho_texto(texto, fuente, tamaño):
+    # fitz.Font mide bien los caracteres fuera de ASCII (ñ, tildes); get_text_length no
+    return _fuente(fuente).text_length(texto, fontsize=tamaño)
+
+
+def _ajustar(texto, ancho, fuente, tamaño, minimo=None):
+    """
+    Texto y tamaño de letra para que entre en `ancho`: primero se achica la letra hasta `minimo`
+    y después se corta el texto (como overflow-hidden en la plantilla).
+    """
+    texto = str(texto or '')
+    if minimo is not None:
+        while tamaño > minimo and _ancho_texto(texto, fuente, tamaño) > ancho:
+            tamaño -= 0.5
+    while texto and _ancho_texto(texto, fuente, tamaño) > ancho:
+        texto = texto[:-1]
+    return texto, tamaño
+
+
+class _Lienzo:
+    """
+    Acumula las líneas en un Shape y el texto en un TextWriter, y los escribe en la página de
+    una vez al final: dibujar cada celda por separado con la API de la página es varias veces
+    más lento.
+    """
+
+    def __init__(self, page):
+        import fitz  # PyMuPDF
+        self.page = page
+        self.shape = page.new_shape()
+        self.escritor = fitz.TextWriter(page.rect)
+
+    def texto(self, x, y, texto, tamaño, fuente='helv'):
+        if texto:
+            self.escritor.append((x, y), texto, font=_fuente(fuente), fontsize=tamaño)
+
+    def centrado(self, rect, texto, tamaño, fuente='helv', minimo=None):
+        texto, tamaño = _ajustar(texto, rect[2] - rect[0] - 1, fuente, tamaño, minimo)
+        ancho = _ancho_texto(texto, fuente, tamaño)
+        self.texto(rect[0] + (rect[2] - rect[0] - ancho) / 2, rect[1] + (rect[3] - rect[1] + tamaño * 0.7) / 2, texto, tamaño, fuente)
+
+    def izquierda(self, rect, texto, tamaño, fuente='helv', relleno=1.5):
+        texto, tamaño = _ajustar(texto, rect[2] - rect[0] - 2 * relleno, fuente, tamaño)
+        self.texto(rect[0] + relleno, rect[1] + (rect[3] - rect[1] + tamaño * 0.7) / 2, texto, tamaño, fuente)
+
+    def etiqueta(self, x, y, etiqueta, valor, tamaño=10):
+        """'Etiqueta: <strong>valor</strong>' en la posición (x, línea base y)."""
+        self.texto(x, y, etiqueta, tamaño)
+        self.texto(x + _ancho_texto(etiqueta, 'helv', tamaño), y, str(valor or ''), tamaño, 'hebo')
+
+    def linea(self, x0, y0, x1, y1):
+        self.shape.draw_line((x0, y0), (x1, y1))
+
+    def grilla(self, xs, ys):
+        """Bordes de una tabla: una línea por cada x de `xs` y cada y de `ys`."""
+        for x in xs:
+            self.linea(x, ys[0], x, ys[-1])
+        for y in ys:
+            self.linea(xs[0], y, xs[-1], y)
+
+    def terminar(self):
+        self.shape.finish(color=NEGRO, width=0.5)
+        self.shape.commit()
+        self.escritor.write_text(self.page, color=NEGRO)
+
+
+def rect_semana(indice):
+    """Rectángulo (x0, y0, x1, y1) de la semana `indice` (0-23), sin el relleno, en la grilla de 4 filas de 6."""
+    ancho = (ANCHO - 2 * MARGEN) / SEMANAS_POR_FILA
+    fila, columna = divmod(indice, SEMANAS_POR_FILA)
+    alto_primera = 2 * RELLENO_SEMANA + ALTO_TITULO + ALTO_DIAS + TURNOS * ALTO_CELDA
+    alto_resto = alto_primera - ALTO_DIAS
+    y = MARGEN_SUPERIOR + ALTO_ENCABEZADO + 8 + (0 if fila == 0 else alto_primera + (fila - 1) * alto_resto)
+    x = MARGEN + columna * ancho
+    alto = alto_primera if fila == 0 else alto_resto
+    return (x + RELLENO_SEMANA, y + RELLENO_SEMANA, x + ancho - RELLENO_SEMANA, y + alto - RELLENO_SEMANA)
+
+
+def rect_celda(semana, turno, dia):
+    """Rectángulo (x0, y0, x1, y1) de la celda (turno, día) de la semana `semana`, como las <td> de la plantilla."""
+    x0, y0, x1, _ = rect_semana(semana)
+    ancho = (x1 - x0) / len(DIAS)
+    y = y0 + ALTO_TITULO + (ALTO_DIAS if semana < SEMANAS_POR_FILA else 0) + turno * ALTO_CELDA
+    return (x0 + dia * ancho, y, x0 + (dia + 1) * ancho, y + ALTO_CELDA)
+
+
+def _fin_grilla():
+    return rect_semana(3 * SEMANAS_POR_FILA)[3] + RELLENO_SEMANA
+
+
+def _encabezado(lienzo, schedule, logo):
+    columna = (ANCHO - 2 * MARGEN) / 10
+    y0 = MARGEN_SUPERIOR
+    if logo:
+        try:
+            lienzo.page.insert_image((MARGEN, y0, MARGEN + columna, y0 + ALTO_ENCABEZADO), filename=logo, keep_proportion=True)
+        except Exception:
+            pass  # Sin logo si la imagen no se puede leer
+    lienzo.texto(MARGEN + 2 * columna, y0 + 33, 'P-4', 27)
+
+    x = MARGEN + 3 * columna + 1.5
+    lienzo.etiqueta(x, y0 + 12, 'Curso: ', schedule.get('course'))
+    lienzo.etiqueta(x, y0 + 24, 'Semestre: ', schedule.get('period'))
+    lienzo.etiqueta(x, y0 + 36, 'Carrera: ', schedule.get('career'))
+
+    x = MARGEN + 6 * columna + 3
+    lienzo.etiqueta(x, y0 + 10, 'Actualizado: ', schedule.get('updated'))
+    lienzo.etiqueta(x, y0 + 22, 'Grupo: ', schedule.get('group'))
+    lienzo.etiqueta(x + 150, y0 + 22, 'Facultad: ', schedule.get('faculty'))
+    lienzo.etiqueta(x, y0 + 34, 'Periodo: ', schedule.get('period'))
+    lienzo.etiqueta(x + 150, y0 + 34, 'Año: ', schedule.get('year'))
+
+
+def _semanas(lienzo, weeks):
+    for indice in range(4 * SEMANAS_POR_FILA):
+        semana = weeks[indice] if indice < len(weeks) else {}
+        x0, y0, x1, _ = rect_semana(indice)
+
+        numero = str(indice + 1)
+        titulo = f": {semana['title']}" if semana.get('title') else ''
+        ancho = _ancho_texto(numero, 'hebo', 7.5) + _ancho_texto(titulo, 'helv', 7.5)
+        x = x0 + (x1 - x0 - ancho) / 2
+        base = y0 + 7.5
+        lienzo.texto(x, base, numero, 7.5, 'hebo')
+        lienzo.texto(x + _ancho_texto(numero, 'hebo', 7.5), base, titulo, 7.5)
+        lienzo.linea(x, base + 1, x + ancho, base + 1)
+
+        if indice < SEMANAS_POR_FILA:
+            for dia, letra in enumerate(DIAS):
+                cx0, cy0, cx1, _ = rect_celda(indice, 0, dia)
+                lienzo.centrado((cx0, cy0 - ALTO_DIAS, cx1, cy0), letra, 10)
+
+        primera = rect_celda(indice, 0, 0)
+        ultima = rect_celda(indice, TURNOS - 1, len(DIAS) - 1)
+        ancho_celda = primera[2] - primera[0]
+        lienzo.grilla(
+            [primera[0] + dia * ancho_celda for dia in range(len(DIAS) + 1)],
+            [primera[1] + turno * ALTO_CELDA for turno in range(TURNOS)] + [ultima[3]],
+        )
+        for turno, fila in enumerate((semana.get('rows') or [])[:TURNOS]):
+            for dia, celda in enumerate(fila[:len(DIAS)]):
+                if celda:
+                    lienzo.centrado(rect_celda(indice, turno, dia), celda, 7, minimo=4.5)
+
+
+def _tabla(lienzo, x, y, anchos, titulos, filas, fuente_titulos='hebo'):
+    columnas = [x]
+    for ancho in anchos:
+        columnas.append(columnas[-1] + ancho)
+    ys = [y, y + ALTO_ENCABEZADO_LEYENDA]
+    for k, titulo in enumerate(titulos):
+        lienzo.centrado((columnas[k], y, columnas[k + 1], ys[1]), titulo, 10, fuente_titulos, minimo=7)
+    for fila in filas:
+        y = ys[-1]
+        for k, valor in enumerate(fila):
+            lienzo.izquierda((columnas[k], y, columnas[k + 1], y + ALTO_FILA_LEYENDA), valor, 8)
+        ys.append(y + ALTO_FILA_LEYENDA)
+    lienzo.grilla(columnas, ys)
+
+
+def _pie(lienzo, context):
+    y = _fin_grilla() + 3
+    mitad = (ANCHO - 2 * MARGEN) / 2
+    ancho = mitad * 0.9
+    _tabla(
+        lienzo, MARGEN, y, (ancho * 0.15, ancho * 0.45, ancho * 0.40), ('SIMB', 'ASIGNATURA', 'PROFESOR'),
+        [(s.get('subject_symb'), s.get('subject_name'), s.get('teacher_name')) for s in context.get('subjects_activities', [])],
+    )
+    cuarto = mitad / 2
+    ancho = cuarto * 0.9
+    _tabla(
+        lienzo, MARGEN + mitad, y, (ancho * 0.8, ancho * 0.2), ('ACTIVIDAD', 'SIMB'),
+        [(a.get('activity_name'), a.get('symb')) for a in context.get('activities_list', [])],
+    )
+
+    x = MARGEN + mitad + cuarto + cuarto * 0.05
+    lienzo.etiqueta(x, y + 12, 'Aula: ', context.get('schedule', {}).get('class_room'))
+    lienzo.texto(x, y + 40, "J' Colectivo de año:", 10)
+    lienzo.linea(x, y + 58, x + ancho, y + 58)
+    lienzo.texto(x, y + 86, 'Decano:', 10)
+    lienzo.linea(x, y + 104, x + ancho, y + 104)
+
+
+def logo_por_defecto():
+    from django.contrib.staticfiles import finders
+    return finders.find('img/img.jpg')
+
+
+def _documento(context, logo):
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    page = doc.new_page(width=ANCHO, height=ALTO)
+    lienzo = _Lienzo(page)
+    _encabezado(lienzo, context.get('schedule', {}), logo)
+    _semanas(lienzo, context.get('weeks', []))
+    _pie(lienzo, context)
+    lienzo.terminar()
+    return doc
+
+
+def renderizar_pdf(context, logo=None):
+    """PDF (bytes) del horario a partir del contexto de build_schedule_pdf_context."""
+    doc = _documento(context, logo)
+    try:
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def renderizar_png(context, dpi=300, logo=None):
+    """PNG del horario: la misma página de renderizar_pdf rasterizada con PyMuPDF a `dpi`."""
+    import fitz  # PyMuPDF
+    doc = _documento(context, logo)
+    try:
+        zoom = dpi / 72.0
+        pix = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return pix.tobytes("png")
+    finally:
+        doc.close()
@@ -0,0 +1,151 @@
+import bisect
+import datetime
+import threading
+
+_calendarios = {}
+_lock = threading.Lock()
+
+
+class PeriodCalendar:
+    """
+    Calendario precalculado de un período: días y semanas no disponibles (dos consultas),
+    bitmaps de fechas bloqueadas (bit k encendido = base + k días no disponible) y
+    la lista densa semana lectiva -> lunes. Todas las consultas por fecha son O(1).
+
+    Se obtiene con PeriodCalendar.para(period), que lo guarda en memoria por período y lo
+    reconstruye cuando cambian las fechas del período o su calendar_version (se incrementa
+    al guardar o borrar un DayNotAvailable o WeekNotAvailable, ver base/signals.py).
+    """
+
+    def __init__(self, period, dias_no_disponibles, semanas_no_disponibles):
+        self.period_id = period.pk
+        self.clave = (period.start, period.end, period.calendar_version)
+        self.inicio = period.get_start()
+        self.fin = period.get_end()
+        self.motivos = dict(dias_no_disponibles)  # {fecha: motivo}
+        self.dias_no_disponibles = [dia for dia, _ in dias_no_disponibles]
+        self.rangos = sorted(semanas_no_disponibles)  # [(inicio, fin)]
+
+        self.base = min([self.inicio] + self.dias_no_disponibles + [inicio for inicio, _ in self.rangos])
+        self._dias = 0
+        for dia in self.dias_no_disponibles:
+            self._dias |= 1 << (dia - self.base).days
+        self._semanas = 0
+        for inicio, fin in self.rangos:
+            desde = (inicio - self.base).days
+            self._semanas |= ((1 << ((fin - inicio).days + 1)) - 1) << desde
+        self._bloqueados = self._dias | self._semanas
+
+        # Semanas lectivas del período: lunes que no caen en una semana no disponible
+        self.lunes = []
+        lunes = self.inicio
+        while lunes <= self.fin:
+            if not self.en_semana_no_disponible(lunes):
+                self.lunes.append(lunes)
+            lunes += datetime.timedelta(weeks=1)
+        self.semana_de_lunes = {lunes: k for k, lunes in enumerate(self.lunes)}
+        self._fines_de_rango = sorted(fin for _, fin in self.rangos)
+
+    @classmethod
+    def para(cls, period):
+        """Calendario de `period` (instancia de Period), desde la caché si sigue vigente."""
+        with _lock:
+            calendario = _calendarios.get(period.pk)
+        if calendario is not None and calendario.clave == (period.start, period.end, period.calendar_version):
+            return calendario
+        calendario = cls.construir(period)
+        with _lock:
+            _calendarios[period.pk] = calendario
+        return calendario
+
+    @classmethod
+    def construir(cls, period):
+        """
+        Arma el calendario con dos consultas, o sin ninguna si el período viene de un queryset con
+        prefetch_related('daynotavailable_set', 'weeknotavailable_set') (listado de períodos).
+        """
+        from base.models import DayNotAvailable, WeekNotAvailable
+        prefetch = getattr(period, '_prefetched_objects_cache', {})
+        if 'daynotavailable_set' in prefetch:
+            dias = [(dia.day, dia.reason) for dia in period.daynotavailable_set.all()]
+        else:
+            dias = list(DayNotAvailable.objects.filter(period=period).order_by('pk').values_list('day', 'reason'))
+        if 'weeknotavailable_set' in prefetch:
+            semanas = [(semana.start_date, semana.end_date) for semana in period.weeknotavailable_set.all()]
+        else:
+            semanas = list(WeekNotAvailable.objects.filter(period=period).values_list('start_date', 'end_date'))
+        return cls(period, dias, semanas)
+
+    @staticmethod
+    def olvidar(period_id):
+        with _lock:
+            _calendarios.pop(period_id, None)
+
+    def _bit(self, bitmap, fecha):
+        desplazamiento = (fecha - self.base).days
+        return desplazamiento >= 0 and bool(bitmap >> desplazamiento & 1)
+
+    def dia_no_disponible(self, fecha):
+        return self._bit(self._dias, fecha)
+
+    def en_semana_no_disponible(self, fecha):
+        return self._bit(self._semanas, fecha)
+
+    def no_disponible(self, fecha):
+        """True si la fecha es un día no disponible o cae en una semana no disponible."""
+        return self._bit(self._bloqueados, fecha)
+
+    def bloqueado(self, fecha):
+        """True si no se puede dar clase ese día: fin de semana, día o semana no disponible."""
+        return fecha.weekday() > 4 or self._bit(self._bloqueados, fecha)
+
+    def indice_semana(self, fecha):
+        """Índice (desde 0) de la semana lectiva que contiene `fecha`, o None."""
+        return self.semana_de_lunes.get(fecha - datetime.timedelta(days=fecha.weekday()))
+
+    def lunes_de(self, num_semanas, ignorar=()):
+        """
+        Lunes de las primeras `num_semanas` semanas lectivas. Si el horario tiene más semanas
+        que el período se sigue contando después del fin. Los rangos de `ignorar` (de
+        self.rangos) no cuentan como bloqueados: sirve para ver las semanas que tenía el
+        calendario antes de agregarlos.
+        """
+        if ignorar:
+            rangos = [rango for rango in self.rangos if rango not in ignorar]
+            lunes = []
+            siguiente = self.inicio
+            while len(lunes) < num_semanas:
+                if not any(inicio <= siguiente <= fin for inicio, fin in rangos):
+                    lunes.append(siguiente)
+                siguiente += datetime.timedelta(weeks=1)
+            return lunes
+        if num_semanas <= len(self.lunes):
+            return self.lunes[:num_semanas]
+        lunes = list(self.lunes)
+        siguiente = self.fin - datetime.timedelta(days=self.fin.weekday()) + datetime.timedelta(weeks=1)
+        while len(lunes) < num_semanas:
+            if not self.en_semana_no_disponible(siguiente):
+                lunes.append(siguiente)
+            siguiente += datetime.timedelta(weeks=1)
+        return lunes
+
+    @property
+    def semanas(self):
+        return len(self.lunes)
+
+    def semanas_excluyendo_no_disponibles(self):
+        """Mismo cálculo que Period.number_of_weeks_excluding_unavailable: se resta una semana por cada 7 días bloqueados de cada rango."""
+        total = -(-((self.fin - self.inicio).days + 2) // 7)
+        return total - sum(((fin - inicio).days + 1) // 7 for inicio, fin in self.rangos)
+
+    def dias_no_disponibles_por_semana(self):
+        """Mismo resultado que Period.days_not_available_by_week, con búsqueda binaria sobre las semanas no disponibles."""
+        resultado = []
+        for dia in self.dias_no_disponibles:
+            semana_absoluta = (dia - self.inicio).days // 7 + 1
+            anteriores = bisect.bisect_left(self._fines_de_rango, dia)
+            resultado.append({
+                'numero_semana': semana_absoluta - anteriores,
+                'dia_semana': dia.weekday(),
+            })
+        return resultado
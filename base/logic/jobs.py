@@ -0,0 +1,273 @@
+import time
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+# Los modelos y el generador se importan dentro de las funciones: los procesos del worker
+# importan este módulo antes de que inicializar_proceso() haya configurado Django.
+
+
+def generar_desde_payload(payload, schedule_id, progreso=None, observador=None):
+    """Ejecuta generar_horario con los datos de entrada guardados en un trabajo."""
+    from .logicaHorario import generar_horario
+    return generar_horario(
+        payload['subjects_symbology'],
+        payload['time_base_list'],
+        payload['weeks_count'],
+        payload['balance_below_list'],
+        payload['encounters_list'],
+        payload['above_list'],
+        payload['below_list'],
+        payload['days_not_available_by_week'],
+        payload['activities_list'],
+        schedule_id,
+        payload['period_id'],
+        payload['tabu_iterations'],
+        engine=payload['engine'],
+        seed=payload['seed'],
+        solver=payload['solver'],
+        milp_time_limit=payload['milp_time_limit'],
+        tabu_starts=payload['tabu_starts'],
+        time_budget_ms=payload['time_budget_ms'],
+        max_no_improve=payload['max_no_improve'],
+        target_objective=payload['target_objective'],
+        use_cache=True,
+        progreso=progreso,
+        observador=observador,
+    )
+
+
+def encolar_generacion(schedule, payload, usuario=None):
+    """Crea un trabajo pendiente; lo ejecutará el proceso `run_generation_worker`."""
+    from base.models import GenerationJob
+    return GenerationJob.objects.create(
+        schedule=schedule,
+        payload=payload,
+        created_by=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+
+
+def reclamar_trabajos(cantidad, worker):
+    """
+    Marca como en curso hasta `cantidad` trabajos pendientes (los más antiguos primero) y
+    devuelve sus ids. Con select_for_update(skip_locked=True) varios procesos pueden reclamar
+    a la vez sin tomar el mismo trabajo.
+    """
+    from base.models import GenerationJob
+    if cantidad <= 0:
+        return []
+    with transaction.atomic():
+        ids = list(
+            GenerationJob.objects.select_for_update(skip_locked=True)
+            .filter(state=GenerationJob.State.PENDING)
+            .order_by('created', 'id')
+            .values_list('id', flat=True)[:cantidad]
+        )
+        if ids:
+            GenerationJob.objects.filter(pk__in=ids).update(
+                state=GenerationJob.State.RUNNING, started=timezone.now(), worker=worker, stage='en cola',
+            )
+    return ids
+
+
+def reencolar_en_curso(host):
+    """
+    Devuelve a pendientes los trabajos que quedaron en curso porque murió el worker de este
+    `host` que los había reclamado (worker = "host:pid" con un pid que ya no existe). No toca
+    los trabajos de workers vivos ni de otros hosts, ni los que corren dentro de una petición
+    (lotes y calculate-balance sin worker), que no tienen ese formato.
+    """
+    from base.models import GenerationJob
+
+    candidatos = GenerationJob.objects.filter(
+        state=GenerationJob.State.RUNNING, worker__startswith=f'{host}:',
+    ).values_list('pk', 'worker')
+    huerfanos = [pk for pk, worker in candidatos if not _proceso_vivo(worker[len(host) + 1:])]
+    if not huerfanos:
+        return 0
+    return GenerationJob.objects.filter(pk__in=huerfanos, state=GenerationJob.State.RUNNING).update(
+        state=GenerationJob.State.PENDING, progress=0, stage='', worker='', started=None,
+    )
+
+
+def _proceso_vivo(pid):
+    """Si existe en esta máquina un proceso con ese pid (el propio proceso cuenta como muerto)."""
+    import os
+    try:
+        pid = int(pid)
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False  # Un worker recién iniciado todavía no reclamó nada: es un pid reusado
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Existe, pero es de otro usuario
+    return True
+
+
+def marcar_fallido(job_id, error):
+    from base.models import GenerationJob
+    GenerationJob.objects.filter(pk=job_id).update(
+        state=GenerationJob.State.FAILED, error=error, finished=timezone.now(),
+    )
+
+
+# Segundos que dura la marca de "hay alguien mirando" que deja el endpoint de eventos
+OBSERVACION_SEGUNDOS = 10
+
+
+class ObservadorTrabajo:
+    """
+    Observador de TabuSearch.learn para un trabajo. Como mucho una vez cada
+    GENERATION_PROGRESS_INTERVAL_MS consulta si se pidió detener y si hay un cliente conectado
+    a los eventos (watched_until vigente). Solo en ese caso guarda el último evento en `live`;
+    sin nadie mirando actualiza el porcentaje y únicamente cuando cambia, así que una búsqueda
+    larga no se convierte en una escritura en la base de datos cada pocos milisegundos.
+    """
+
+    def __init__(self, job_id, desde=5, hasta=70):
+        self.job_id = job_id
+        self.desde = desde
+        self.hasta = hasta
+        self.intervalo = settings.GENERATION_PROGRESS_INTERVAL_MS / 1000.0
+        self.ultimo = float('-inf')
+        self.porcentaje = None
+
+    def __call__(self, evento):
+        from base.models import GenerationJob
+        ahora = time.monotonic()
+        if ahora - self.ultimo < self.intervalo and evento['iteration'] < evento['iterations']:
+            return False
+        self.ultimo = ahora
+        job = GenerationJob.objects.filter(pk=self.job_id).values('stop_requested', 'watched_until').first()
+        if job is None:
+            return False
+        porcentaje = self.desde + (self.hasta - self.desde) * evento['iteration'] // max(evento['iterations'], 1)
+        if job['watched_until'] is not None and job['watched_until'] > timezone.now():
+            GenerationJob.objects.filter(pk=self.job_id).update(live=evento, progress=porcentaje)
+        elif porcentaje != self.porcentaje:
+            GenerationJob.objects.filter(pk=self.job_id).update(progress=porcentaje)
+        self.porcentaje = porcentaje
+        return job['stop_requested']
+
+
+def marcar_observado(job_id):
+    """
+    Avisa al worker que hay un cliente mirando los eventos del trabajo durante los próximos
+    OBSERVACION_SEGUNDOS. Solo escribe cuando a la marca le queda menos de la mitad.
+    """
+    import datetime
+    from django.db.models import Q
+    from base.models import GenerationJob
+
+    ahora = timezone.now()
+    mitad = ahora + datetime.timedelta(seconds=OBSERVACION_SEGUNDOS / 2)
+    GenerationJob.objects.filter(pk=job_id).filter(Q(watched_until__isnull=True) | Q(watched_until__lt=mitad)).update(
+        watched_until=ahora + datetime.timedelta(seconds=OBSERVACION_SEGUNDOS),
+    )
+
+
+def solicitar_detencion(job_id):
+    """
+    Pide detener la búsqueda de un trabajo pendiente o en curso: se conserva la mejor solución
+    encontrada hasta ese momento y el horario se guarda igual. Devuelve False si ya terminó.
+    """
+    from base.models import GenerationJob
+    return GenerationJob.objects.filter(
+        pk=job_id, state__in=[GenerationJob.State.PENDING, GenerationJob.State.RUNNING],
+    ).update(stop_requested=True) > 0
+
+
+def ejecutar_trabajo(job_id, observar=True):
+    """
+    Ejecuta un trabajo reclamado y guarda su resultado o el error. Devuelve el estado final.
+
+    Con `observar` se guarda el progreso en vivo y se atienden los pedidos de detención
+    (ObservadorTrabajo). Cuando el trabajo corre dentro de la propia petición HTTP nadie puede
+    conocer su id hasta que termina, así que ahí se ejecuta sin observador y sin costo extra.
+    """
+    from base.models import GenerationJob
+    job = GenerationJob.objects.get(pk=job_id)
+
+    def progreso(porcentaje, etapa):
+        GenerationJob.objects.filter(pk=job_id).update(progress=porcentaje, stage=etapa)
+
+    try:
+        if job.schedule_id is None:
+            raise RuntimeError("El horario del trabajo ya no existe")
+        observador = ObservadorTrabajo(job_id) if observar else None
+        resumen = generar_desde_payload(job.payload, job.schedule_id, progreso, observador)
+        if resumen is None:
+            raise RuntimeError("No se encontró el horario o el período del trabajo")
+    except Exception:
+        print(f"Error en el trabajo de generación {job_id}")
+        traceback.print_exc()
+        marcar_fallido(job_id, traceback.format_exc())
+        return GenerationJob.State.FAILED
+
+    GenerationJob.objects.filter(pk=job_id).update(
+        state=GenerationJob.State.DONE, progress=100, stage='terminado', result=resumen,
+        finished=timezone.now(),
+    )
+    return GenerationJob.State.DONE
+
+
+def _ejecutar_medido(job_id, observar=True):
+    inicio = time.perf_counter()
+    estado = ejecutar_trabajo(job_id, observar)
+    return estado, round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def ejecutar_lote(job_ids, workers=None, observar=True):
+    """
+    Ejecuta varios trabajos ya marcados como en curso, repartidos en procesos (spawn, cada uno
+    con su propia conexión a la base de datos). Devuelve {job_id: (estado, milisegundos)}.
+    `observar` se pasa a ejecutar_trabajo.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers or settings.GENERATION_BATCH_WORKERS, len(job_ids))
+    if workers <= 1:
+        return {job_id: _ejecutar_medido(job_id, observar) for job_id in job_ids}
+
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=inicializar_proceso) as pool:
+        futuros = {pool.submit(_ejecutar_medido, job_id, observar): job_id for job_id in job_ids}
+        for futuro, job_id in futuros.items():
+            try:
+                resultados[job_id] = futuro.result()
+            except Exception as e:
+                from base.models import GenerationJob
+                marcar_fallido(job_id, f'El proceso terminó inesperadamente: {e!r}')
+                resultados[job_id] = (GenerationJob.State.FAILED, None)
+    return resultados
+
+
+def inicializar_proceso():
+    """Inicializador de los procesos del worker (arrancados con spawn): configura Django."""
+    import django
+    django.setup()
+
+
+def job_to_dict(job):
+    return {
+        'job_id': job.id,
+        'state': job.state,
+        'progress': job.progress,
+        'stage': job.stage,
+        'live': job.live or None,
+        'stop_requested': job.stop_requested,
+        'schedule_id': job.schedule_id,
+        'error': job.error or None,
+        'result': job.result or None,
+        'created': job.created,
+        'started': job.started,
+        'finished': job.finished,
+    }
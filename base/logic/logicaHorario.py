@@ -2,146 +2,908 @@ import numpy as np
 from pulp import *
 import csv
 import random
-import copy
+import heapq
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from math import ceil, floor, gcd
 # Datos iniciales
 
 
-def generar_horario(a,f,s,bs,enc,ub,lb,d,activ, schedule_id=None, period_id=None, tabu_iterations=50):
+class LoadState:
+    """
+    Estado incremental del balance de carga.
+
+    Guarda la matriz solución (asignaturas x semanas), los turnos acumulados de
+    cada asignatura hasta cada semana y la carga en horas de cada semana. Así un
+    movimiento (i, s1, s2) se evalúa recorriendo solo las semanas entre s1 y s2,
+    en lugar de copiar la matriz y recalcular la carga de todas las semanas.
+    """
+
+    def __init__(self, solution, h):
+        self.n = len(solution)
+        self.m = len(solution[0]) if self.n else 0
+        self.solution = [list(fila) for fila in solution]
+
+        # horas_acumuladas[i][k] = horas de los primeros k turnos de la asignatura i
+        self.horas_acumuladas = []
+        for i in range(self.n):
+            acumuladas = [0]
+            for horas in h[i]:
+                acumuladas.append(acumuladas[-1] + horas)
+            self.horas_acumuladas.append(acumuladas)
+
+        # turnos_acumulados[i][j] = sum(solution[i][:j+1])
+        self.turnos_acumulados = []
+        for fila in self.solution:
+            acumulados, total = [], 0
+            for turnos in fila:
+                total += turnos
+                acumulados.append(total)
+            self.turnos_acumulados.append(acumulados)
+
+        self.loads = [0] * self.m
+        for i in range(self.n):
+            anterior = 0
+            for j in range(self.m):
+                actual = self.turnos_acumulados[i][j]
+                self.loads[j] += self._horas(i, actual) - self._horas(i, anterior)
+                anterior = actual
+
+        self.average = sum(self.loads) / float(self.m) if self.m else 0.0
+        self.value = sum((load - self.average) ** 2 for load in self.loads)
+
+    def _horas(self, i, turnos):
+        acumuladas = self.horas_acumuladas[i]
+        return acumuladas[min(turnos, len(acumuladas) - 1)]
+
+    def evaluate(self, i, s1, s2):
+        """
+        Evalúa el movimiento de un turno de la asignatura i de la semana s2 a la s1.
+        Devuelve las nuevas cargas de las semanas min(s1, s2)..max(s1, s2) y la
+        variación del objetivo. La carga total no cambia, así que el promedio tampoco.
+        """
+        inicio, fin = min(s1, s2), max(s1, s2)
+        desplazamiento = 1 if s1 < s2 else -1
+        acumulados = self.turnos_acumulados[i]
+
+        anterior_viejo = acumulados[inicio - 1] if inicio > 0 else 0
+        anterior_nuevo = anterior_viejo
+        new_loads = []
+        delta = 0.0
+        for j in range(inicio, fin + 1):
+            actual_viejo = acumulados[j]
+            actual_nuevo = actual_viejo + desplazamiento if j < fin else actual_viejo
+            carga_vieja = self._horas(i, actual_viejo) - self._horas(i, anterior_viejo)
+            carga_nueva = self._horas(i, actual_nuevo) - self._horas(i, anterior_nuevo)
+            load = self.loads[j] + carga_nueva - carga_vieja
+            new_loads.append(load)
+            delta += (load - self.average) ** 2 - (self.loads[j] - self.average) ** 2
+            anterior_viejo, anterior_nuevo = actual_viejo, actual_nuevo
+        return new_loads, delta
+
+    def apply(self, i, s1, s2, new_loads, delta):
+        """Aplica sobre este estado un movimiento ya evaluado con `evaluate`."""
+        inicio, fin = min(s1, s2), max(s1, s2)
+        desplazamiento = 1 if s1 < s2 else -1
+        self.solution[i][s1] += 1
+        self.solution[i][s2] -= 1
+        acumulados = self.turnos_acumulados[i]
+        for j in range(inicio, fin):
+            acumulados[j] += desplazamiento
+        self.loads[inicio:fin + 1] = new_loads
+        self.value += delta
+
+    def copy(self):
+        estado = LoadState.__new__(LoadState)
+        estado.n, estado.m = self.n, self.m
+        estado.solution = [list(fila) for fila in self.solution]
+        estado.horas_acumuladas = self.horas_acumuladas  # No cambia entre estados
+        estado.turnos_acumulados = [list(fila) for fila in self.turnos_acumulados]
+        estado.loads = list(self.loads)
+        estado.average = self.average
+        estado.value = self.value
+        return estado
+
+
+# Motores disponibles para evaluar el vecindario de la búsqueda tabú
+TABU_ENGINES = ('python', 'numpy')
+
+# Métodos para distribuir los turnos por semana: búsqueda tabú o modelo MILP exacto
+SOLVERS = ('tabu', 'milp')
+
+
+def balance_milp(init_solution, n, m, p, Q, h, lbound=None, ubound=None, time_limit=10):
+    """
+    Distribuye los turnos por semana resolviendo un MILP con CBC:
+    x[i][j] entero entre lbound[i][j] y ubound[i][j], cada asignatura con sus p[i]
+    turnos, carga de cada semana <= Q[j], minimizando la mayor desviación de la
+    carga semanal respecto al promedio. Se parte de `init_solution` como solución inicial.
+
+    Devuelve (solucion, es_optima). `solucion` es None si el modelo no aplica (horas
+    distintas entre turnos de una asignatura), es infactible o CBC no encontró
+    ninguna solución dentro de `time_limit` segundos.
+    """
+    if not lbound: lbound = [[0] * m for _ in range(n)]
+    if not ubound: ubound = [[6] * m for _ in range(n)]
+
+    # La carga es lineal en x solo si todos los turnos de cada asignatura duran lo mismo
+    horas_turno = []
+    for i in range(n):
+        if len(set(h[i])) > 1:
+            print(f"MILP no aplicable: la asignatura {i} tiene turnos de distinta duración")
+            return None, False
+        horas_turno.append(h[i][0] if h[i] else 0)
+
+    promedio = sum(horas_turno[i] * p[i] for i in range(n)) / float(m)
+
+    # Las cargas son múltiplos de g: si el promedio no lo es, alguna semana queda por debajo
+    # del múltiplo inferior y otra por encima del superior. Esa cota deja a CBC probar la
+    # optimalidad en cuanto la alcanza, en lugar de agotar el tiempo por simetrías.
+    g = reduce(gcd, [int(horas) for horas in horas_turno if horas], 0) or 1
+    inferior = floor(promedio / g) * g
+    superior = ceil(promedio / g) * g
+    cota = max(promedio - inferior, superior - promedio) if inferior != superior else 0
+
+    modelo = LpProblem("balance_de_carga", LpMinimize)
+    x = [[LpVariable(f"x_{i}_{j}", lowBound=lbound[i][j], upBound=ubound[i][j], cat=LpInteger)
+          for j in range(m)] for i in range(n)]
+    desviacion = LpVariable("desviacion", lowBound=cota)
+    desviaciones = [LpVariable(f"d_{j}", lowBound=0) for j in range(m)]
+    modelo += desviacion
+
+    for i in range(n):
+        modelo += lpSum(x[i]) == p[i]
+    for j in range(m):
+        carga = lpSum(horas_turno[i] * x[i][j] for i in range(n))
+        modelo += carga <= Q[j]
+        modelo += carga - promedio <= desviaciones[j]
+        modelo += promedio - carga <= desviaciones[j]
+        modelo += desviaciones[j] <= desviacion
+
+    for i in range(n):
+        for j in range(m):
+            x[i][j].setInitialValue(init_solution[i][j])
+
+    inicio = time.monotonic()
+    modelo.solve(PULP_CBC_CMD(msg=False, timeLimit=time_limit, warmStart=True))
+    print(f"MILP: estado {LpStatus[modelo.status]}, desviación máxima {value(desviacion)}")
+
+    if modelo.sol_status not in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+        return None, False
+    es_optima = modelo.sol_status == LpSolutionOptimal
+    solucion = [[int(round(x[i][j].varValue)) for j in range(m)] for i in range(n)]
+
+    # Con la desviación máxima ya óptima, el tiempo restante se usa para repartir mejor el
+    # resto de las semanas (menor suma de desviaciones) sin empeorar la máxima.
+    # La suma mínima posible se da con todas las semanas en los múltiplos inferior/superior.
+    restante = min(time_limit - (time.monotonic() - inicio), time_limit / 4.0)
+    if es_optima and restante > 1:
+        modelo += desviacion <= value(desviacion) + 1e-6
+        modelo += lpSum(desviaciones) >= 2 * m * (promedio - inferior) * (superior - promedio) / g - 1e-6
+        modelo.setObjective(lpSum(desviaciones))
+        modelo.solve(PULP_CBC_CMD(msg=False, timeLimit=restante, warmStart=True))
+        if modelo.sol_status in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+            solucion = [[int(round(x[i][j].varValue)) for j in range(m)] for i in range(n)]
+    return solucion, es_optima
+
+
+def week_load(solution, j, n, h):
+    load = 0
+    for i in range(n):
+        sup = sum(solution[i][:j+1])
+        inf = sum(solution[i][:j])
+        for k in range(inf, sup):
+            load += h[i][k]
+    return load
+
+
+def initial_solution(n, m, p, Q, h, lbound=None, ubound=None):
+    """
+    Solución inicial golosa: parte de lbound y reparte los turnos restantes por rondas
+    (un turno por asignatura en cada ronda), poniendo cada turno en la semana con más
+    capacidad libre respecto a Q que aún admita la asignatura según ubound.
+
+    Las capacidades libres se guardan en un heap, así cada turno se ubica en O(log m)
+    en lugar de recalcular `week_load` para cada semana. La carga de cada turno se toma
+    de h en el orden en que se asignan los turnos de la asignatura.
+    """
+    if not lbound: lbound = [[0] * m] * n
+    if not ubound: ubound = [[6] * m] * n
+
+    #Esta linea inicializa x con los valores minimos requeridos por lbound
+    x = [[lbound[i][j] for j in range(m)] for i in range(n)]
+    meetings = [p[i] - sum(x[i]) for i in range(n)]
+    asignados = [sum(x[i]) for i in range(n)]
+    cargas = LoadState(x, h).loads
+
+    def horas_turno(i):
+        return h[i][asignados[i]] if asignados[i] < len(h[i]) else (h[i][-1] if h[i] else 0)
+
+    # Heap de (-capacidad libre, semana); las semanas sin capacidad salen del heap
+    heap = [(-(Q[j] - cargas[j]), j) for j in range(m) if cargas[j] < Q[j]]
+    heapq.heapify(heap)
+
+    pendientes = [i for i in range(n) if meetings[i] > 0]
+    while pendientes and heap:
+        siguientes = []
+        for i in pendientes:
+            descartadas = []
+            semana = None
+            while heap:
+                libre, j = heapq.heappop(heap)
+                if x[i][j] < ubound[i][j]:
+                    semana = j
+                    break
+                descartadas.append((libre, j))
+            for entrada in descartadas:
+                heapq.heappush(heap, entrada)
+            if semana is None:
+                continue  # La asignatura no cabe en ninguna semana
+
+            cargas[semana] += horas_turno(i)
+            x[i][semana] += 1
+            asignados[i] += 1
+            meetings[i] -= 1
+            if cargas[semana] < Q[semana]:
+                heapq.heappush(heap, (-(Q[semana] - cargas[semana]), semana))
+            if meetings[i] > 0:
+                siguientes.append(i)
+        pendientes = siguientes
+
+    total_meetings = sum(max(0, turnos) for turnos in meetings)
+    if total_meetings > 0:
+        print(f"No se pudieron asignar {total_meetings} turnos.")
+    return x
+
+
+class IndexedSet:
+    """Conjunto con alta, baja, pertenencia y elección aleatoria en O(1)."""
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        posicion = self.positions.pop(item, None)
+        if posicion is None:
+            return
+        ultimo = self.items.pop()
+        if posicion < len(self.items):
+            self.items[posicion] = ultimo
+            self.positions[ultimo] = posicion
+
+    def choice(self, rng, excluir=None):
+        """Elige un elemento al azar distinto de `excluir` (que debe estar en el conjunto)."""
+        if excluir is None:
+            return self.items[rng.randrange(len(self.items))]
+        k = rng.randrange(len(self.items) - 1)
+        return self.items[k + 1] if k >= self.positions[excluir] else self.items[k]
+
+
+class MoveIndex:
+    """
+    Índice de los movimientos (i, s1, s2) que hoy respetan lbound y ubound: para cada
+    asignatura guarda las semanas que pueden recibir un turno (x < ubound) y las que pueden
+    cederlo (x > lbound y x > 0). Tras aplicar un movimiento solo cambian dos celdas.
+    """
+
+    def __init__(self, solution, lbound, ubound):
+        self.n = len(solution)
+        self.m = len(solution[0]) if self.n else 0
+        self.lbound = lbound
+        self.ubound = ubound
+        self.puede_sumar = [IndexedSet() for _ in range(self.n)]
+        self.puede_restar = [IndexedSet() for _ in range(self.n)]
+        # Las mismas relaciones como matrices booleanas para el motor numpy
+        self.sumar_np = np.zeros((self.n, self.m), dtype=bool)
+        self.restar_np = np.zeros((self.n, self.m), dtype=bool)
+        self.activas = IndexedSet()
+        for i in range(self.n):
+            for j in range(self.m):
+                self._actualizar_celda(i, j, solution[i][j])
+            self._actualizar_asignatura(i)
+
+    def _actualizar_celda(self, i, j, turnos):
+        sumar = turnos < self.ubound[i][j]
+        restar = turnos > max(self.lbound[i][j], 0)
+        self.sumar_np[i, j] = sumar
+        self.restar_np[i, j] = restar
+        if sumar:
+            self.puede_sumar[i].add(j)
+        else:
+            self.puede_sumar[i].discard(j)
+        if restar:
+            self.puede_restar[i].add(j)
+        else:
+            self.puede_restar[i].discard(j)
+
+    def _actualizar_asignatura(self, i):
+        sumar, restar = self.puede_sumar[i], self.puede_restar[i]
+        # Hace falta al menos un par de semanas distintas
+        unica_igual = len(sumar) == 1 and len(restar) == 1 and sumar.items[0] == restar.items[0]
+        if len(sumar) and len(restar) and not unica_igual:
+            self.activas.add(i)
+        else:
+            self.activas.discard(i)
+
+    def update(self, solution, i, s1, s2):
+        self._actualizar_celda(i, s1, solution[i][s1])
+        self._actualizar_celda(i, s2, solution[i][s2])
+        self._actualizar_asignatura(i)
+
+    def sample(self, rng):
+        """Devuelve un movimiento legal al azar, o None si no queda ninguno."""
+        if not len(self.activas):
+            return None
+        i = self.activas.choice(rng)
+        sumar, restar = self.puede_sumar[i], self.puede_restar[i]
+        s2 = restar.choice(rng)
+        if s2 in sumar and len(sumar) == 1:
+            # La única semana que puede recibir es s2: se cede desde otra
+            s1 = s2
+            s2 = restar.choice(rng, excluir=s1)
+        else:
+            s1 = sumar.choice(rng, excluir=s2 if s2 in sumar else None)
+        return i, s1, s2
+
+
+class TabuSearch:
+    def __init__(self, init_solution, n, m, h, Q, lbound=None, ubound=None, engine='python', seed=None):
+        if engine not in TABU_ENGINES:
+            raise ValueError(f"Motor de búsqueda tabú desconocido: {engine}")
+        self.state = LoadState(init_solution, h)
+        # Mejor estado visitado (incumbente); `state` es el estado actual de la trayectoria
+        self.best_state = self.state
+        self.best_so_far = self.state.solution
+        self.iterations = 0
+        self.stop_reason = None
+        self.max_tabu = 20
+        # Lista tabú en orden (más reciente primero) y un conjunto para consultar en O(1)
+        self.tabu_list = deque()
+        self.tabu_set = set()
+        self.n = n
+        self.m = m
+        self.h = h
+        self.Q = Q
+        self.lbound = lbound if lbound else [[0] * m for _ in range(n)]
+        self.ubound = ubound if ubound else [[6] * m for _ in range(n)]
+        self.move_index = MoveIndex(self.state.solution, self.lbound, self.ubound)
+        self.engine = engine
+        # Con la misma semilla cada motor reproduce su propia trayectoria
+        self.random = random.Random(seed)
+        if engine == 'numpy':
+            self.rng = np.random.default_rng(seed)
+            # Horas acumuladas rellenadas con el último valor para poder indexar en bloque
+            largo = max(len(fila) for fila in self.state.horas_acumuladas) if n else 1
+            self.horas_acumuladas_np = np.array([
+                fila + [fila[-1]] * (largo - len(fila)) for fila in self.state.horas_acumuladas
+            ])
+            self.Q_np = np.array(self.Q[:m])
+
+
+    def neighborhood(self, state):
+        if self.engine == 'numpy':
+            return self.moves_numpy(state)
+        return self.moves(state)
+
+    def moves(self, state):
+        # Cada vecino es (movimiento, cargas nuevas de las semanas afectadas, delta del objetivo);
+        # el estado no se copia hasta que se acepta un movimiento en `learn`. Los movimientos
+        # salen del índice de movimientos legales, así que ya respetan lbound y ubound.
+        neighborhood = []
+        recent = set()
+        neighborhood_size, counter = 0, 0
+        N, M = 50, 100
+
+        while neighborhood_size != N and counter != M:
+            counter += 1
+            move = self.move_index.sample(self.random)
+            if move is None:
+                break
+            if move in recent or move in self.tabu_set:
+                continue
+            recent.add(move)
+
+            i, s1, s2 = move
+            new_loads, delta = state.evaluate(i, s1, s2)
+            inicio = min(s1, s2)
+            week_hour_constraint = all(
+                load <= self.Q[inicio + k] for k, load in enumerate(new_loads)
+            )
+
+            if week_hour_constraint:
+                neighborhood.append((move, new_loads, delta))
+                neighborhood_size += 1
+
+        return neighborhood
+
+    def objective(self, solution):
+        return LoadState(solution, self.h).value
+
+    def moves_numpy(self, state):
+        # Versión vectorizada de `moves`: se muestrean las M ternas (i, s1, s2) como arreglos
+        # de índices y se calculan de una vez las cargas semanales y la varianza de todos los
+        # candidatos a partir de la matriz de turnos acumulados.
+        N, M = 50, 100
+        m = self.m
+        if not len(self.move_index.activas):
+            return []
+        filas = np.arange(M)
+
+        # Se muestrea del índice de movimientos legales: s2 entre las semanas que pueden ceder
+        # un turno y s1 entre las que pueden recibirlo (distinta de s2). Una clave aleatoria
+        # por semana y argmax sobre las permitidas da una elección uniforme en bloque.
+        i = self.rng.choice(np.array(self.move_index.activas.items), M)
+        sumar = self.move_index.sumar_np[i]
+        restar = self.move_index.restar_np[i]
+        s2 = np.argmax(self.rng.random((M, m)) * restar, axis=1)
+        claves_s1 = self.rng.random((M, m)) * sumar
+        claves_s1[filas, s2] = 0
+        s1 = np.argmax(claves_s1, axis=1)
+        # Si s2 era la única semana que podía recibir, se invierte: s1 = s2 y s2 sale del resto
+        sin_s1 = claves_s1[filas, s1] == 0
+        if sin_s1.any():
+            s1[sin_s1] = s2[sin_s1]
+            claves_s2 = self.rng.random((int(sin_s1.sum()), m)) * restar[sin_s1]
+            claves_s2[np.arange(len(claves_s2)), s1[sin_s1]] = 0
+            s2[sin_s1] = np.argmax(claves_s2, axis=1)
+
+        # Descartar ternas repetidas (conservando el orden del muestreo) y las tabú
+        codigos = (i * m + s1) * m + s2
+        _, primeros = np.unique(codigos, return_index=True)
+        validos = np.zeros(M, dtype=bool)
+        validos[primeros] = True
+        if self.tabu_set:
+            tabu = np.array([(ti * m + t1) * m + t2 for ti, t1, t2 in self.tabu_set])
+            validos &= ~np.isin(codigos, tabu)
+
+        semanas = np.arange(m)
+        inicio = np.minimum(s1, s2)[:, None]
+        fin = np.maximum(s1, s2)[:, None]
+        desplazamiento = np.where(s1 < s2, 1, -1)[:, None]
+
+        acumulados = np.array(state.turnos_acumulados)[i]
+        nuevos = acumulados + desplazamiento * ((semanas >= inicio) & (semanas < fin))
+        anteriores = np.pad(acumulados[:, :-1], ((0, 0), (1, 0)))
+        nuevos_anteriores = np.pad(nuevos[:, :-1], ((0, 0), (1, 0)))
+
+        horas = self.horas_acumuladas_np[i]
+        largo = horas.shape[1] - 1
+        carga_vieja = (np.take_along_axis(horas, np.minimum(acumulados, largo), axis=1)
+                       - np.take_along_axis(horas, np.minimum(anteriores, largo), axis=1))
+        carga_nueva = (np.take_along_axis(horas, np.minimum(nuevos, largo), axis=1)
+                       - np.take_along_axis(horas, np.minimum(nuevos_anteriores, largo), axis=1))
+        loads = np.array(state.loads) + carga_nueva - carga_vieja
+
+        afectadas = (semanas >= inicio) & (semanas <= fin)
+        validos &= np.all(~afectadas | (loads <= self.Q_np), axis=1)
+        objetivos = ((loads - state.average) ** 2).sum(axis=1)
+
+        neighborhood = []
+        for k in np.flatnonzero(validos)[:N]:
+            a, b = int(inicio[k, 0]), int(fin[k, 0])
+            move = (int(i[k]), int(s1[k]), int(s2[k]))
+            neighborhood.append((move, loads[k, a:b + 1].tolist(), float(objetivos[k]) - state.value))
+        return neighborhood
+
+    def learn(self, num_iterations, time_budget_ms=None, max_no_improve=None, target=None, observador=None):
+        """
+        Ejecuta hasta `num_iterations` iteraciones. Se detiene antes si se agota el tiempo
+        `time_budget_ms` (milisegundos), si pasan `max_no_improve` iteraciones seguidas sin
+        mejorar el incumbente o si el objetivo llega a `target`. Al terminar, `best_so_far`
+        siempre es la mejor solución encontrada, aunque el estado actual sea peor.
+
+        Si se pasa `observador`, se llama tras cada iteración con un diccionario (iteración,
+        objetivo actual y mejor, cargas por semana y tiempo transcurrido); si devuelve un valor
+        verdadero la búsqueda se detiene. Sin observador no se construye ningún evento.
+        """
+        inicio = time.monotonic()
+        limite = inicio + time_budget_ms / 1000.0 if time_budget_ms is not None else None
+        sin_mejora = 0
+        self.stop_reason = 'iterations'
+
+        for _ in range(num_iterations):
+            if target is not None and self.best_state.value <= target:
+                self.stop_reason = 'target'
+                break
+            if limite is not None and time.monotonic() >= limite:
+                self.stop_reason = 'time_budget'
+                break
+            if max_no_improve is not None and sin_mejora >= max_no_improve:
+                self.stop_reason = 'no_improvement'
+                break
 
-    class TabuSearch:
-        def __init__(self, init_solution, n, m, h, Q, lbound=None, ubound=None):
-            self.best_so_far = init_solution
-            self.max_tabu = 20
-            self.tabu_list = []
-            self.n = n
-            self.m = m
-            self.h = h
-            self.Q = Q
-            self.lbound = lbound if lbound else [[0] * m for _ in range(n)]
-            self.ubound = ubound if ubound else [[6] * m for _ in range(n)]
+            self.iterations += 1
+            sin_mejora += 1
+            neighborhood = self.neighborhood(self.state)
+            if not neighborhood:
+                continue
+
+            best_move, new_loads, delta = min(neighborhood, key=lambda vecino: vecino[2])
+            state = self.state.copy()
+            state.apply(*best_move, new_loads, delta)
+            self.state = state
+            self.move_index.update(state.solution, *best_move)
+            if state.value < self.best_state.value - 1e-9:
+                self.best_state = state
+                self.best_so_far = state.solution
+                sin_mejora = 0
+            
+            self.tabu_list.appendleft(best_move)
+            self.tabu_set.add(best_move)
+
+            if len(self.tabu_list) > self.max_tabu:
+                self.tabu_set.discard(self.tabu_list.pop())
+
+            if observador is not None and observador({
+                'iteration': self.iterations,
+                'iterations': num_iterations,
+                'objective': float(state.value),
+                'best': float(self.best_state.value),
+                'loads': [float(carga) for carga in state.loads],
+                'elapsed_ms': round((time.monotonic() - inicio) * 1000, 1),
+            }):
+                self.stop_reason = 'stopped'
+                break
+        return self.iterations
+
+    def get_balance(self):
+        return list(self.best_state.loads)
+
+
+def _trayectoria_tabu(argumentos):
+    """Ejecuta una trayectoria de búsqueda tabú; corre en un proceso del pool de `multi_start_tabu`."""
+    (init_solution, n, m, h, Q, lbound, ubound, engine, seed, num_iterations,
+     time_budget_ms, max_no_improve, target) = argumentos
+    tabu = TabuSearch(init_solution, n, m, h, Q, lbound, ubound, engine=engine, seed=seed)
+    tabu.learn(num_iterations, time_budget_ms, max_no_improve, target)
+    return tabu.best_so_far, tabu.best_state.value, tabu.iterations
+
+
+def multi_start_tabu(init_solution, n, m, h, Q, lbound, ubound, num_iterations, starts,
+                     engine='python', seed=None, workers=None, time_budget_ms=None, max_no_improve=None,
+                     target=None):
+    """
+    Lanza `starts` trayectorias tabú independientes desde la misma solución inicial, cada una
+    con su semilla (seed, seed+1, ...), repartidas en un ProcessPoolExecutor. Devuelve la
+    solución con mejor objetivo y un resumen con la dispersión de los objetivos obtenidos.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    argumentos = [
+        (init_solution, n, m, h, Q, lbound, ubound, engine, seed + k, num_iterations,
+         time_budget_ms, max_no_improve, target)
+        for k in range(starts)
+    ]
+    workers = min(workers or os.cpu_count() or 1, starts)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(_trayectoria_tabu, argumentos))
+    else:
+        resultados = [_trayectoria_tabu(a) for a in argumentos]
+
+    objetivos = [valor for _, valor, _ in resultados]
+    mejor = objetivos.index(min(objetivos))
+    resumen = {
+        'starts': starts,
+        'seed': seed,
+        'best_start': mejor,
+        'objectives': objetivos,
+        'best': min(objetivos),
+        'worst': max(objetivos),
+        'mean': statistics.mean(objetivos),
+        'stdev': statistics.pstdev(objetivos),
+        'iterations': [iteraciones for _, _, iteraciones in resultados],
+    }
+    return resultados[mejor][0], resumen
+
+
+def balancear_semanas(n, m, p, Q, h, lbound, ubound, tabu_iterations=50, engine='python', seed=None,
+                      solver='tabu', milp_time_limit=10, tabu_starts=1, workers=None, time_budget_ms=None,
+                      max_no_improve=None, target_objective=None, observador=None):
+    """
+    Reparte los turnos de cada asignatura entre las semanas (matriz asignaturas x semanas).
+    Devuelve la solución y un resumen con el método usado, la varianza (`variance`, también en
+    `objective`) y la desviación máxima (`max_deviation`) de la carga semanal.
+    `observador` recibe el progreso de la búsqueda tabú (ver TabuSearch.learn); con varias
+    trayectorias en paralelo no se usa, porque cada una corre en otro proceso.
+    """
+    # Generar solución inicial y ejecutar búsqueda tabú
+    initial_sol = initial_solution(n, m, p, Q, h, lbound, ubound)
+
+    solucion = None
+    resumen = {'solver': solver}
+    if solver == 'milp':
+        # Con el MILP óptimo no hace falta la búsqueda tabú; si se agota el tiempo,
+        # la búsqueda tabú continúa desde la mejor solución que encontró CBC.
+        solucion_milp, es_optima = balance_milp(initial_sol, n, m, p, Q, h, lbound, ubound, milp_time_limit)
+        resumen['milp_optimal'] = es_optima
+        if es_optima:
+            solucion = solucion_milp
+        elif solucion_milp is not None:
+            initial_sol = solucion_milp
+
+    if solucion is None and tabu_starts > 1:
+        solucion, resumen_multi = multi_start_tabu(initial_sol, n, m, h, Q, lbound, ubound, tabu_iterations,
+                                                   tabu_starts, engine=engine, seed=seed, workers=workers,
+                                                   time_budget_ms=time_budget_ms, max_no_improve=max_no_improve,
+                                                   target=target_objective)
+        resumen.update(resumen_multi)
+        print(f"Multiarranque: {resumen_multi}")
+    elif solucion is None:
+        balance = TabuSearch(initial_sol, n, m, h, Q, lbound, ubound, engine=engine, seed=seed)
+
+        balance.learn(tabu_iterations, time_budget_ms, max_no_improve, target_objective, observador)
+        solucion = balance.best_so_far
+        resumen['iterations'] = balance.iterations
+        resumen['stop_reason'] = balance.stop_reason
+
+    # Las dos métricas se miden sobre la solución final, sea cual sea el método, para poder
+    # compararlos: la varianza de la carga semanal (suma de cuadrados respecto al promedio, lo
+    # que minimiza la búsqueda tabú) y la mayor desviación respecto al promedio (lo que minimiza
+    # el MILP). `objective` es la varianza.
+    estado = LoadState(solucion, h)
+    resumen['variance'] = estado.value
+    resumen['max_deviation'] = max((abs(carga - estado.average) for carga in estado.loads), default=0)
+    resumen['objective'] = resumen['variance']
+    return solucion, resumen
+
+
+# Último turno posible de un día (ClassTime.number admite de 1 a 6)
+MAX_TURNOS_DIA = 6
+
+
+def calcular_turnos_por_dia(turnos_asignaturas, num_semanas, dias_no_disponibles):
+    """
+    Menor cantidad de turnos por día (entre 1 y 6) cuya capacidad total en el período
+    alcanza para el fondo de horas de todas las asignaturas; 3 si ninguna alcanza.
+    """
+    opciones_turnos = [1, 2, 3, 4, 5, 6]
+    dias_por_semana = 5
+    horas_por_turno = 2
+
+    fondo_Total_asignaturas = sum(turnos_asignaturas)*2
+    for t in opciones_turnos:
+        capacidad= t*dias_por_semana*horas_por_turno*num_semanas - len(dias_no_disponibles)*2*t
+        print(f" Capacidad: {capacidad} Turnos: {t} fondo_Total_asignaturas: {fondo_Total_asignaturas}")
+        if capacidad >= fondo_Total_asignaturas:
+            return t
+    return 3
 
 
-        def moves(self, solution):
-            neighborhood = []
-            recent = []
-            neighborhood_size, counter = 0, 0
-            N, M = 50, 100
+def distribuir_dias(balance_carga, asignaturas, d, turnos_por_dia, rng=random, ocupacion=None):
+    """
+    Reparte los turnos de cada semana (balance_carga[semana][asignatura]) entre los días
+    hábiles. Devuelve (horario, sobrantes): horario[semana][día] es la lista de simbologías
+    en orden de turno y sobrantes lista los turnos que no cupieron en su semana.
 
-            while neighborhood_size != N and counter != M:
-                i = random.choice(range(self.n))
-                s1, s2 = random.sample(range(self.m), 2)
+    Con `ocupacion` (ver base/logic/occupancy.py) solo se eligen asignaturas cuyo profesor y
+    aula estén libres en ese turno según los demás horarios del período; si ninguna lo está,
+    el turno queda como hueco (None) y se prueba el siguiente, sin pasar de MAX_TURNOS_DIA.
 
-                if (i, s1, s2) not in recent and (i, s1, s2) not in self.tabu_list:
-                    candidate = copy.deepcopy(solution)
-                    candidate[i][s1] += 1
-                    candidate[i][s2] -= 1
+    Se recorre por rondas (un turno por día hábil en cada ronda) y como máximo hay
+    turnos_por_dia rondas, así que el trabajo está acotado por los huecos de la semana.
+    Cada día tiene su capacidad restante y un bitset con las asignaturas que ya tiene, para
+    no repetir una asignatura en el mismo día mientras haya otra disponible.
+    """
+    dias_semana = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+    num_dias = len(dias_semana)
+    num_semanas = len(balance_carga)
 
-                    # Verificación de restricciones
-                    if candidate[i][s2] < 0:  # Evita turnos negativos
-                        continue
+    horario = [[[] for _ in range(num_dias)] for _ in range(num_semanas)]
+    sobrantes = []
 
-                    # Verificar límites para la asignatura i en las semanas s1 y s2
-                    total_s1 = solution[i][s1] + 1  # Turnos actuales más el que se agrega
-                    total_s2 = solution[i][s2] - 1  # Turnos actuales menos el que se quita
+    dias_sin_clase_por_semana = {}
+    for semana_info in d:
+        dias_sin_clase_por_semana.setdefault(int(semana_info['numero_semana']), set()).add(int(semana_info['dia_semana']))
 
-                    if total_s1 > self.ubound[i][s1]:
+    for semana in range(num_semanas):
+        turnos_asignados = [int(turnos) for turnos in balance_carga[semana]]
+        dias_sin_clase = dias_sin_clase_por_semana.get(semana + 1, set())
+        capacidad = [0 if dia in dias_sin_clase else turnos_por_dia for dia in range(num_dias)]
+        en_dia = [0] * num_dias  # Bitset por día: bit i encendido si la asignatura i ya tiene turno ese día
+        pendientes = [i for i, turnos in enumerate(turnos_asignados) if turnos > 0]
+
+        for _ in range(turnos_por_dia):  # Una ronda por turno del día
+            if not pendientes:
+                break
+            for dia in range(num_dias):
+                if capacidad[dia] == 0:
+                    continue
+                if not pendientes:
+                    break
+                candidatas = pendientes
+                if ocupacion is not None:
+                    # Los turnos ocupados quedan como huecos y se prueba el siguiente, hasta el
+                    # último turno posible del día
+                    numero = len(horario[semana][dia]) + 1
+                    if numero > MAX_TURNOS_DIA:
+                        # Huecos y turnos ya llenaron el día: lo que falta queda en sobrantes
+                        capacidad[dia] = 0
                         continue
-
-                    week_hour_constraint = True
-                    for j in range(min(s1, s2), max(s1, s2) + 1):
-                        if week_load(candidate, j, self.n, self.h) > self.Q[j]:
-                            week_hour_constraint = False
-                            break
-                    
-                    if week_hour_constraint:
-                        neighborhood.append((candidate, (i, s1, s2)))
-                        neighborhood_size += 1
-
-                recent.append((i, s1, s2))
-                counter += 1
-
-            return neighborhood
-
-        def objective(self, solution):
-            loads = [week_load(solution, j, self.n, self.h) for j in range(self.m)]
-            average_load = sum(loads) / float(len(loads))
-            return sum((load - average_load) ** 2 for load in loads)
-
-        def learn(self, num_iterations):
-        
-            for _ in range(num_iterations):
-                neighborhood = self.moves(self.best_so_far)
-                if not neighborhood:
+                    candidatas = [i for i in pendientes if ocupacion.libre(semana, dia, numero, i)]
+                    while not candidatas and numero < MAX_TURNOS_DIA:
+                        horario[semana][dia].append(None)
+                        numero += 1
+                        candidatas = [i for i in pendientes if ocupacion.libre(semana, dia, numero, i)]
+                    if not candidatas:
+                        capacidad[dia] = 0
+                        continue
+                asignaturas_posibles = [i for i in candidatas if not en_dia[dia] >> i & 1]
+                if not asignaturas_posibles:
+                    asignaturas_posibles = candidatas
+
+                i = rng.choice(asignaturas_posibles)
+                if ocupacion is not None:
+                    ocupacion.ocupar(semana, dia, numero, i)
+                horario[semana][dia].append(asignaturas[i])
+                en_dia[dia] |= 1 << i
+                capacidad[dia] -= 1
+                turnos_asignados[i] -= 1
+                if turnos_asignados[i] == 0:
+                    pendientes.remove(i)
+
+        for i in pendientes:
+            sobrantes.append({'semana': semana + 1, 'asignatura': asignaturas[i], 'turnos': turnos_asignados[i]})
+    if sobrantes:
+        print(f"Turnos sin ubicar por falta de capacidad: {sobrantes}")
+    return horario, sobrantes
+
+
+def profesor_principal_por_asignatura(subject_ids):
+    """Profesor principal de cada asignatura (el primero según el orden de Teacher, por nombre), en una consulta."""
+    from base.models import Subject
+
+    teacher_by_subject = {}
+    subject_teachers = (
+        Subject.teachers.through.objects
+        .filter(subject_id__in=list(subject_ids))
+        .order_by('teacher__name', 'teacher_id')
+        .values_list('subject_id', 'teacher_id')
+    )
+    for subject_id, teacher_id in subject_teachers:
+        teacher_by_subject.setdefault(subject_id, teacher_id)
+    return teacher_by_subject
+
+
+def guardar_horario(horario, balance_carga, asignaturas, activ, schedule_id, period_id):
+    """
+    Guarda los turnos generados (ClassTime con sus actividades) y el LoadBalance del horario.
+
+    Asignaturas, profesores y actividades se cargan con una consulta cada uno y los turnos se
+    insertan con bulk_create, todo dentro de una única transacción: o se guarda el horario
+    completo o no se guarda nada. Devuelve la cantidad de turnos creados, o None si no
+    existen el horario o el período.
+    """
+    from django.db import transaction
+    from base.models import ClassTime, Schedule, Period, Activity
+    import datetime
+    # Agregar importación de LoadBalance
+    from base.models.load_balance import LoadBalance
+
+    try:
+        schedule = Schedule.objects.get(pk=schedule_id)
+        period = Period.objects.get(pk=period_id)
+    except Exception as e:
+        print(f"Error obteniendo Schedule o Period: {e}")
+        return None
+
+    # Calendario del período: semanas lectivas y días no disponibles
+    calendario = period.calendar()
+    # Mapear simbología a id de asignatura
+    symb_to_id = {symbology: subject_id for subject_id, symbology in schedule.subjects.values_list('id', 'symbology')}
+
+    teacher_by_subject = profesor_principal_por_asignatura(symb_to_id.values())
+
+    # Actividades por simbología, todas las usadas en el horario en una consulta
+    simbolos_actividad = {
+        symb.strip()
+        for actividades in activ for activity_value in actividades
+        for symb in activity_value.split(',') if symb.strip()
+    }
+    activity_by_symbology = {}
+    simbolos_numericos = [int(symb) for symb in simbolos_actividad if symb.isdigit()]
+    for activity_id, symbology in Activity.objects.filter(symbology__in=simbolos_numericos).order_by('-id').values_list('id', 'symbology'):
+        activity_by_symbology[str(symbology)] = activity_id
+
+    # Crear diccionario de actividades por asignatura
+    activities_tracker = {}
+    for asignatura, actividades in zip(asignaturas, activ):
+        activities_tracker[asignatura] = {
+            'activities': actividades,  # Lista de strings, cada string puede ser '', '1', '1,3', etc.
+            'next_index': 0
+        }
+
+    # Recorrer el horario y preparar los turnos en memoria
+    turnos = []
+    actividades_por_turno = []
+    for week_start, semana in zip(calendario.lunes_de(len(horario)), horario):
+        for dia_idx, dia in enumerate(semana):
+            # Calcular la fecha real de este día (lunes+0, martes+1, ...)
+            fecha_dia = week_start + datetime.timedelta(days=dia_idx)
+            # Saltar sábados y domingos
+            if fecha_dia.weekday() > 4:
+                continue
+            # Saltar días no disponibles
+            if calendario.dia_no_disponible(fecha_dia):
+                continue
+            # Un turno por cada asignatura en el día
+            for turno_idx, simbologia in enumerate(dia):
+                if simbologia is None:
+                    continue  # Hueco: el profesor o el aula estaban ocupados en ese turno
+                subject_id = symb_to_id.get(simbologia)
+                if not subject_id:
+                    print(f"No se encontró asignatura con simbología {simbologia}")
                     continue
 
-                candidates, tabu_moves = zip(*neighborhood)
-                candidate_fitness = [self.objective(c) for c in candidates]
-                best_candidate_idx = candidate_fitness.index(min(candidate_fitness))
-                self.best_so_far = candidates[best_candidate_idx]
-                
-                self.tabu_list.insert(0, tabu_moves[best_candidate_idx])
-
-                if len(self.tabu_list) > self.max_tabu:
-                    self.tabu_list.pop()
-
-        def get_balance(self):
-
-            balance = [week_load(self.best_so_far, j, self.n, self.h) for j in range(self.m)]
-            return balance
-
-    def week_load(solution, j, n, h):
-        load = 0
-        for i in range(n):
-            sup = sum(solution[i][:j+1])
-            inf = sum(solution[i][:j])
-            for k in range(inf, sup):
-                load += h[i][k]
-        return load
-
-    # Función inicial para generar solución inicial
-    def initial_solution(n, m, p, Q, h, lbound=None, ubound=None):
-        if not lbound: lbound = [[0] * m] * n
-        if not ubound: ubound = [[6] * m] * n
-
-        #Se inicializa la matriz solucion
-        x = [[0 for _ in range(m)] for _ in range(n)]
-        meetings = p.copy()
-
-        #Esta linea inicializa x con los valores minimos requeridos por lbound
-        for i in range(n):
-            for j in range(m):
-                x[i][j] = lbound[i][j]
-                meetings[i] -= lbound[i][j]
-        
-        total_meetings = sum(meetings)
-        a=1
-        while total_meetings > 0:
-            print(f"x: {x}")
-            flag = total_meetings
-            for i in range(n):
-                for j in range(m):
-                    if meetings[i] > 0 and x[i][j] < ubound[i][j]:
-                        print(f"{week_load(x, j, n, h)}, {Q[j]}")
-                        if week_load(x, j, n, h) < Q[j]:
-                            x[i][j] += 1
-                            meetings[i] -= 1
-                            total_meetings -= 1
-                            print("total meetings", total_meetings)
-                            
-                        if meetings[i] == 0:
-                            print(f"Se asignaron todos los turnos para la asignatura {i}")
-                            break
-            if a==1 and flag==total_meetings:
-                print("entre")
-                flag="ultima iteracion"
-                a=0
-            if flag==total_meetings:
-                print(meetings, total_meetings, flag)
-                print(f"No se pudieron asignar {total_meetings} turnos.")
-                break
-        return x
+                # Obtener la(s) actividad(es) para este turno
+                subject_activities = activities_tracker[simbologia]
+                activity_ids = []
+                if subject_activities['next_index'] < len(subject_activities['activities']):
+                    activity_value = subject_activities['activities'][subject_activities['next_index']]
+                    for symb in activity_value.split(','):
+                        symb = symb.strip()
+                        if not symb:
+                            continue
+                        if symb in activity_by_symbology:
+                            activity_ids.append(activity_by_symbology[symb])
+                        else:
+                            print(f"No se encontró la actividad con simbología {symb}")
+                    subject_activities['next_index'] += 1
+
+                turnos.append(ClassTime(
+                    day=fecha_dia,
+                    number=turno_idx + 1,
+                    schedule=schedule,
+                    subject_id=subject_id,
+                    teacher_id=teacher_by_subject.get(subject_id),
+                ))
+                actividades_por_turno.append(activity_ids)
+
+    # Turnos, actividades (tabla intermedia) y balance de carga en una sola transacción
+    ClassTimeActivity = ClassTime.activities.through
+    with transaction.atomic():
+        creados = ClassTime.objects.bulk_create(turnos, batch_size=500)
+        ClassTimeActivity.objects.bulk_create(
+            [
+                ClassTimeActivity(classtime_id=classtime.id, activity_id=activity_id)
+                for classtime, activity_ids in zip(creados, actividades_por_turno)
+                for activity_id in dict.fromkeys(activity_ids)
+            ],
+            batch_size=1000,
+        )
+        LoadBalance.objects.create(
+            balance=balance_carga,
+            subjects=[symb_to_id.get(simbologia) for simbologia in asignaturas],
+            schedule=schedule
+        )
+        Schedule.touch_class_times([schedule.pk])
+    print(f"{len(creados)} turnos y balance de carga guardados en la base de datos correctamente.")
+    return len(creados)
 
 
+def generar_horario(a,f,s,bs,enc,ub,lb,d,activ, schedule_id=None, period_id=None, tabu_iterations=50,
+                    engine='python', seed=None, solver='tabu', milp_time_limit=10, tabu_starts=1, workers=None,
+                    time_budget_ms=None, max_no_improve=None, target_objective=None, use_cache=False,
+                    progreso=None, observador=None):
+    # progreso(porcentaje, etapa) se llama al empezar cada etapa; lo usan los trabajos en segundo plano
+    if progreso is None:
+        progreso = lambda porcentaje, etapa: None
 
   #Recibimos el id del horario creado
     asignaturas=a
@@ -155,190 +917,95 @@ def generar_horario(a,f,s,bs,enc,ub,lb,d,activ, schedule_id=None, period_id=None
     lbound = lb
     ubound = ub
     print(f"lbound: {lbound}, ubound: {ubound}")
-    opciones_turnos = [1, 2, 3, 4, 5, 6]
-    turnos_por_dia = 3
-    dias_por_semana = 5
     horas_por_turno = 2
-
-    fondo_Total_asignaturas = sum(turnos_asignaturas)*2
-    for t in opciones_turnos:
-        capacidad= t*dias_por_semana*horas_por_turno*num_semanas - len(d)*2*t
-        print(f" Capacidad: {capacidad} Turnos: {t} fondo_Total_asignaturas: {fondo_Total_asignaturas}")
-        if capacidad >= fondo_Total_asignaturas:
-            turnos_por_dia = t
-            break
+    turnos_por_dia = calcular_turnos_por_dia(turnos_asignaturas, num_semanas, d)
 
     turnos_por_semana = bs
     print(f"Turnos por semana: {turnos_por_semana}, turnos por dia: {turnos_por_dia}, horas por turno: {horas_por_turno}")
-    # Generar solución inicial y ejecutar búsqueda tabú
-    initial_sol = initial_solution(len(asignaturas), num_semanas, turnos_asignaturas, turnos_por_semana, horas, lbound, ubound)
-
-    balance = TabuSearch(initial_sol, len(asignaturas), num_semanas, horas, turnos_por_semana, lbound, ubound)
-    
-    balance.learn(tabu_iterations)
-    balance_carga = [list(fila) for fila in zip(*balance.best_so_far)]#Traspuesta para compaibilidad con el 3er codigo
-
-    print(f'Balance: {balance_carga}')
-    # Generar horario final
-    dias_semana = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
-    num_dias = len(dias_semana)
-    num_asignaturas = len(asignaturas)
-    num_semanas = len(balance_carga)
-    
-    horario = [[[] for _ in range(num_dias)] for _ in range(num_semanas)]
 
-    def asignatura_en_dia(horario_semana, dia, asignatura):
-        return asignatura in horario_semana[dia]
-
-    for semana in range(num_semanas):
-        turnos_asignados = {asignatura: balance_carga[semana][i] for i, asignatura in enumerate(asignaturas)}
-        dias_sin_clase = [semana_info['dia_semana'] for semana_info in d if semana_info['numero_semana'] == (semana+1)]
-        print(dias_sin_clase, semana)
-        turno_actual = 1  # Iniciamos con el primer turno
-        while sum(turnos_asignados.values()) > 0:  # Mientras queden turnos por asignar
-            for dia in range(num_dias):  # Iteramos por los días de la semana
-                if dia in dias_sin_clase:  # Si el día no tiene clases, pasamos al siguiente día    
-                    continue
-                if turno_actual > turnos_por_dia:  # Si hemos completado todos los turnos posibles, pasamos a la siguiente iteración
-                    break
-            
-                asignaturas_posibles = [asignatura for asignatura, turnos in turnos_asignados.items()
-                                        if turnos > 0 and not asignatura_en_dia(horario[semana], dia, asignatura)]
-                
-                if not asignaturas_posibles:
-                    asignaturas_posibles = [asignatura for asignatura, turnos in turnos_asignados.items() if turnos > 0]
-
-                if asignaturas_posibles:
-                    asignatura_seleccionada = random.choice(asignaturas_posibles)
-                    horario[semana][dia].append(asignatura_seleccionada)
-                    turnos_asignados[asignatura_seleccionada] -= 1
-            
-            turno_actual += 1  # Avanzamos al siguiente turno después de procesar todos los días
-    
-    print(f"Horario: {horario}")
-
-    # --- GUARDAR EN BASE DE DATOS LOS TURNOS GENERADOS ---
-    # Solo si se recibió schedule_id y period_id
-    if schedule_id and period_id:
-        from base.models import ClassTime, Schedule, Period, Subject, DayNotAvailable, WeekNotAvailable
-        import datetime
-        # Agregar importación de LoadBalance
-        from base.models.load_balance import LoadBalance
-
-        try:
-            schedule = Schedule.objects.get(pk=schedule_id)
-            period = Period.objects.get(pk=period_id)
-        except Exception as e:
-            print(f"Error obteniendo Schedule o Period: {e}")
-            return
-
-        # Obtener fechas de inicio y fin del periodo
-        start_date = period.get_start()
-        # Mapear simbología a id de asignatura
-        subject_objs = schedule.subjects.all()
-        symb_to_id = {subj.symbology: subj.id for subj in subject_objs}
-        # NUEVO: Mapear id de asignatura a su objeto Subject
-        id_to_subject = {subj.id: subj for subj in subject_objs}
-
-        # Obtener días y semanas no disponibles
-        days_not_available = set(
-            DayNotAvailable.objects.filter(period=period).values_list('day', flat=True)
+    # Caché de resultados: con las mismas entradas y la misma semilla se reutiliza el balance
+    # y la distribución por días en lugar de volver a resolver.
+    clave = None
+    resultado = None
+    if use_cache:
+        from .solver_cache import instance_key, get_cached_result, store_result
+        opciones = {
+            'engine': engine, 'solver': solver, 'milp_time_limit': milp_time_limit,
+            'tabu_starts': tabu_starts, 'time_budget_ms': time_budget_ms,
+            'max_no_improve': max_no_improve, 'target_objective': target_objective,
+        }
+        if seed is None:
+            # Sin semilla explícita se deriva una de la instancia: mismas entradas, mismo resultado
+            seed = int(instance_key(asignaturas, turnos_asignaturas, lbound, ubound, turnos_por_semana,
+                                    d, activ, tabu_iterations, None, opciones)[:8], 16)
+        clave = instance_key(asignaturas, turnos_asignaturas, lbound, ubound, turnos_por_semana,
+                             d, activ, tabu_iterations, seed, opciones)
+        resultado = get_cached_result(clave)
+
+    if resultado is not None:
+        balance_carga, horario, resumen = resultado
+        resumen['cache'] = 'hit'
+        print(f"Resultado reutilizado de la caché ({clave})")
+    else:
+        progreso(5, 'balance')
+        solucion, resumen = balancear_semanas(
+            len(asignaturas), num_semanas, turnos_asignaturas, turnos_por_semana, horas, lbound, ubound,
+            tabu_iterations, engine=engine, seed=seed, solver=solver, milp_time_limit=milp_time_limit,
+            tabu_starts=tabu_starts, workers=workers, time_budget_ms=time_budget_ms,
+            max_no_improve=max_no_improve, target_objective=target_objective, observador=observador,
         )
-        weeks_not_available = WeekNotAvailable.objects.filter(period=period)
-        weeks_ranges = []
-        for w in weeks_not_available:
-            weeks_ranges.append((w.start_date, w.end_date))
-
-        # Función para saber si una fecha está en una semana no disponible
-        def is_in_unavailable_week(date):
-            for start, end in weeks_ranges:
-                if start <= date <= end:
-                    return True
-            return False
-
-        # NUEVO: Crear diccionario de actividades por asignatura
-        activities_tracker = {}
-        for idx, (asignatura, actividades) in enumerate(zip(asignaturas, activ)):
-            activities_tracker[asignatura] = {
-                'activities': actividades,  # Lista de strings, cada string puede ser '', '1', '1,3', etc.
-                'next_index': 0
-            }
-
-        # Recorrer el horario y crear los turnos
-        current_date = start_date
-        semana_idx = 0
-        dias_semana = 5  # Lunes a Viernes
-        dias_a_sumar = [0, 1, 2, 3, 4]  # Lunes a Viernes
-
-        for semana in horario:
-            # Calcular el lunes de la semana actual
-            week_start = start_date + datetime.timedelta(weeks=semana_idx)
-            # Saltar semanas no disponibles
-            while is_in_unavailable_week(week_start):
-                semana_idx += 1
-                week_start = start_date + datetime.timedelta(weeks=semana_idx)
-            for dia_idx, dia in enumerate(semana):
-                # Calcular la fecha real de este día (lunes+0, martes+1, ...)
-                fecha_dia = week_start + datetime.timedelta(days=dia_idx)
-                # Saltar sábados y domingos
-                if fecha_dia.weekday() > 4:
-                    continue
-                # Saltar días no disponibles
-                if fecha_dia in days_not_available:
-                    continue
-                # Si el día está vacío, no crear turnos
-                if not dia:
-                    continue
-                # Crear un turno por cada asignatura en el día
-                for turno_idx, simbologia in enumerate(dia):
-                    subject_id = symb_to_id.get(simbologia)
-                    if not subject_id:
-                        print(f"No se encontró asignatura con simbología {simbologia}")
-                        continue
-
-                    # NUEVO: Obtener la(s) actividad(es) para este turno
-                    subject_activities = activities_tracker[simbologia]
-                    activity_ids = []
-                    if subject_activities['next_index'] < len(subject_activities['activities']):
-                        activity_value = subject_activities['activities'][subject_activities['next_index']]
-                        if activity_value != '':
-                            from base.models import Activity
-                            for symb in activity_value.split(','):
-                                symb = symb.strip()
-                                if symb:
-                                    try:
-                                        act = Activity.objects.get(symbology=symb)
-                                        activity_ids.append(act.id)
-                                    except Activity.DoesNotExist:
-                                        print(f"No se encontró la actividad con simbología {symb}")
-                        subject_activities['next_index'] += 1
-
-                    # NUEVO: Obtener el id del profesor principal de la asignatura
-                    teacher_id = None
-                    subject_obj = id_to_subject.get(subject_id)
-                    if subject_obj:
-                        teachers_qs = subject_obj.teachers.all()
-                        if teachers_qs.exists():
-                            teacher_id = teachers_qs.first().id
-                    # Crear el turno y asociar las actividades (ManyToMany)
-                    classtime = ClassTime.objects.create(
-                        day=fecha_dia,
-                        number=turno_idx + 1,
-                        schedule=schedule,
-                        subject_id=subject_id,
-                        teacher_id=teacher_id
-                    )
-                    if activity_ids:
-                        classtime.activities.set(activity_ids)
-            semana_idx += 1
-        print("Turnos guardados en la base de datos correctamente.")
-
-        # Guardar el balance de carga en LoadBalance
-        try:
-            LoadBalance.objects.create(
-                balance=balance_carga,
-                schedule=schedule
-            )
-            print("Balance de carga guardado correctamente.")
-        except Exception as e:
-            print(f"Error guardando el balance de carga: {e}")
+        balance_carga = [list(fila) for fila in zip(*solucion)]#Traspuesta para compaibilidad con el 3er codigo
+        print(f'Balance: {balance_carga}')
+        horario = None
+    resumen.setdefault('seed', seed)
+
+    def distribuir(ocupacion):
+        rng = random.Random(seed) if seed is not None else random
+        horario, sobrantes = distribuir_dias(balance_carga, asignaturas, d, turnos_por_dia, rng, ocupacion)
+        resumen['unplaced_turns'] = sum(sobrante['turnos'] for sobrante in sobrantes)
+        resumen['overflow'] = sobrantes
+        return horario
+
+    if not (schedule_id and period_id):
+        progreso(70, 'dias')
+        if horario is None:
+            horario = distribuir(None)
+    else:
+        from django.db import transaction
+        from .occupancy import OcupacionHorario, bloquear_periodo
+
+        progreso(70, 'dias')
+        progreso(85, 'guardado')
+        # Ocupación, reparto por días y guardado van juntos y de a un horario por período (el
+        # bloqueo de la fila del Period lo respetan también los trabajos en paralelo y el lote):
+        # así cada horario ve los turnos que los demás acaban de guardar y no se duplican
+        # profesores ni aulas. El balance semanal, que es lo caro, queda fuera del bloqueo.
+        with transaction.atomic():
+            bloquear_periodo(period_id)
+            try:
+                ocupacion = OcupacionHorario.para_horario(schedule_id, period_id, asignaturas, num_semanas)
+            except Exception as e:
+                print(f"No se pudo cargar la ocupación de profesores y aulas: {e}")
+                ocupacion = None
+
+            if horario is not None and ocupacion is not None and ocupacion.conflictos(horario, asignaturas):
+                # El horario guardado choca con turnos creados después: se reutiliza el balance
+                # semanal y solo se vuelve a repartir por días
+                horario = distribuir(ocupacion)
+                resumen['cache'] = 'hit-balance'
+                print(f"Balance reutilizado de la caché ({clave}); días redistribuidos por ocupación")
+            elif horario is None:
+                horario = distribuir(ocupacion)
+
+            print(f"Horario: {horario}")
+            # --- GUARDAR EN BASE DE DATOS LOS TURNOS GENERADOS ---
+            if guardar_horario(horario, balance_carga, asignaturas, activ, schedule_id, period_id) is None:
+                return
+
+    if use_cache and resultado is None:
+        # Un resultado detenido a pedido del usuario no es el de la instancia: no se guarda
+        if resumen.get('stop_reason') != 'stopped':
+            store_result(clave, balance_carga, horario, resumen)
+        resumen['cache'] = 'miss'
+
+    return resumen
@@ -0,0 +1,109 @@
+def bloquear_periodo(period_id):
+    """
+    Bloquea el período hasta el fin de la transacción en curso, para que los horarios del mismo
+    período se repartan y guarden de a uno (cada uno ve los turnos del anterior).
+    """
+    from django.db import connection
+    from django.db.models import F
+    from base.models import Period
+
+    if connection.features.has_select_for_update:
+        list(Period.objects.select_for_update().filter(pk=period_id).values_list('pk', flat=True))
+    else:
+        # SQLite no tiene SELECT ... FOR UPDATE: una escritura sin cambios toma el bloqueo de
+        # escritura de la base antes de leer la ocupación
+        Period.objects.filter(pk=period_id).update(calendar_version=F('calendar_version'))
+
+
+class OccupancyIndex:
+    """
+    Ocupación de profesores y aulas en un período: para cada (profesor, fecha) y (aula, fecha)
+    guarda un bitmap de turnos ocupados (bit n encendido = turno n ocupado). Consultar o marcar
+    un turno es O(1).
+    """
+
+    def __init__(self):
+        self.profesores = {}
+        self.aulas = {}
+
+    @classmethod
+    def cargar(cls, period_id, excluir_schedule=None):
+        """Carga los turnos ya guardados de todos los horarios del período en una sola consulta."""
+        from base.models import ClassTime
+
+        indice = cls()
+        turnos = ClassTime.objects.filter(schedule__period_id=period_id)
+        if excluir_schedule is not None:
+            turnos = turnos.exclude(schedule_id=excluir_schedule)
+        for teacher_id, class_room_id, day, number in turnos.values_list(
+                'teacher_id', 'schedule__class_room_id', 'day', 'number'):
+            indice.ocupar(teacher_id, class_room_id, day, number)
+        return indice
+
+    def ocupar(self, teacher_id, class_room_id, fecha, numero):
+        bit = 1 << numero
+        if teacher_id is not None:
+            self.profesores[(teacher_id, fecha)] = self.profesores.get((teacher_id, fecha), 0) | bit
+        if class_room_id is not None:
+            self.aulas[(class_room_id, fecha)] = self.aulas.get((class_room_id, fecha), 0) | bit
+
+    def libre(self, teacher_id, class_room_id, fecha, numero):
+        bit = 1 << numero
+        if teacher_id is not None and self.profesores.get((teacher_id, fecha), 0) & bit:
+            return False
+        if class_room_id is not None and self.aulas.get((class_room_id, fecha), 0) & bit:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.profesores) + len(self.aulas)
+
+
+class OcupacionHorario:
+    """
+    Adapta un OccupancyIndex a la distribución por días de un horario concreto: traduce
+    (semana, día) a la fecha real y cada asignatura a su profesor principal, y usa el aula
+    del horario. Es lo que recibe distribuir_dias en `ocupacion`.
+    """
+
+    def __init__(self, indice, fechas, profesores, class_room_id):
+        self.indice = indice
+        self.fechas = fechas  # fechas[semana][día]
+        self.profesores = profesores  # profesores[i] = profesor de la asignatura i (o None)
+        self.class_room_id = class_room_id
+
+    @classmethod
+    def para_horario(cls, schedule_id, period_id, asignaturas, num_semanas):
+        """Construye la ocupación del período (sin el propio horario) para generar `schedule_id`."""
+        import datetime
+        from base.models import Schedule, Period
+        from .logicaHorario import profesor_principal_por_asignatura
+
+        schedule = Schedule.objects.get(pk=schedule_id)
+        period = Period.objects.get(pk=period_id)
+        lunes = period.calendar().lunes_de(num_semanas)
+        fechas = [[inicio + datetime.timedelta(days=dia) for dia in range(5)] for inicio in lunes]
+
+        symb_to_id = dict(schedule.subjects.values_list('symbology', 'id'))
+        teacher_by_subject = profesor_principal_por_asignatura(symb_to_id.values())
+        profesores = [teacher_by_subject.get(symb_to_id.get(asignatura)) for asignatura in asignaturas]
+
+        indice = OccupancyIndex.cargar(period_id, excluir_schedule=schedule_id)
+        return cls(indice, fechas, profesores, schedule.class_room_id)
+
+    def libre(self, semana, dia, numero, i):
+        return self.indice.libre(self.profesores[i], self.class_room_id, self.fechas[semana][dia], numero)
+
+    def ocupar(self, semana, dia, numero, i):
+        self.indice.ocupar(self.profesores[i], self.class_room_id, self.fechas[semana][dia], numero)
+
+    def conflictos(self, horario, asignaturas):
+        """Cantidad de turnos de `horario` que chocan con la ocupación (para validar un resultado en caché)."""
+        posicion = {asignatura: i for i, asignatura in enumerate(asignaturas)}
+        total = 0
+        for semana, dias in enumerate(horario):
+            for dia, turnos in enumerate(dias):
+                for turno_idx, simbologia in enumerate(turnos):
+                    if simbologia is not None and not self.libre(semana, dia, turno_idx + 1, posicion[simbologia]):
+                        total += 1
+        return total
@@ -0,0 +1,154 @@
+import datetime
+
+
+def _lunes(fecha):
+    return fecha - datetime.timedelta(days=fecha.weekday())
+
+
+def reparar_periodo(period_id, schedule_ids=None, dry_run=False):
+    """
+    Repara los horarios de un período después de agregar días o semanas no disponibles, sin
+    regenerarlos: solo se mueven los turnos que caen en fechas bloqueadas.
+
+    Cada turno afectado va al mejor hueco libre de su misma semana (sin repetir la asignatura
+    en el día y dentro de los turnos que ya usa el horario, si se puede). Si la semana entera
+    quedó bloqueada, va a la semana con menos carga según el LoadBalance guardado. En ambos
+    casos el profesor y el aula deben estar libres (OccupancyIndex del período). Los turnos que
+    no caben en ninguna parte se informan y no se tocan. Solo se escriben las filas movidas
+    (bulk_update) y los LoadBalance que cambian, en una transacción con el período bloqueado.
+    """
+    from django.db import transaction
+    from base.models import ClassTime, Period, Schedule, LoadBalance
+    from .logicaHorario import MAX_TURNOS_DIA
+    from .occupancy import OccupancyIndex, bloquear_periodo
+
+    # Se lee la ocupación y se escriben los turnos movidos con el período bloqueado, para que
+    # una generación o reparación concurrente no ocupe los mismos huecos. La simulación no
+    # escribe nada y no bloquea.
+    with transaction.atomic():
+        if not dry_run:
+            bloquear_periodo(period_id)
+        period = Period.objects.get(pk=period_id)
+        calendario = period.calendar()
+        # Los sábados son válidos (el modelo solo prohíbe el domingo): solo se mueven los turnos
+        # en días o semanas no disponibles
+        bloqueada = calendario.no_disponible
+
+        schedules = Schedule.objects.filter(period=period)
+        if schedule_ids:
+            schedules = schedules.filter(pk__in=schedule_ids)
+        aulas = dict(schedules.values_list('id', 'class_room_id'))
+
+        turnos_por_horario = {schedule_id: [] for schedule_id in aulas}
+        for turno in ClassTime.objects.filter(schedule_id__in=aulas).only(
+                'id', 'day', 'number', 'schedule_id', 'subject_id', 'teacher_id'):
+            turnos_por_horario[turno.schedule_id].append(turno)
+
+        balances = {}
+        for load_balance in LoadBalance.objects.filter(schedule_id__in=aulas).order_by('schedule_id', '-id'):
+            balances.setdefault(load_balance.schedule_id, load_balance)
+
+        indice = OccupancyIndex.cargar(period_id)
+        semanas_periodo = calendario.lunes
+
+        movidos = []
+        balances_cambiados = []
+        resultados = []
+        for schedule_id, class_room_id in aulas.items():
+            turnos = turnos_por_horario[schedule_id]
+            afectados = sorted((t for t in turnos if bloqueada(t.day)), key=lambda t: (t.day, t.number))
+            resultado = {
+                'schedule_id': schedule_id, 'affected': len(afectados), 'moved_same_week': 0,
+                'moved_other_week': 0, 'unplaced': [], 'balance_updated': False,
+            }
+            resultados.append(resultado)
+            if not afectados:
+                continue
+
+            ocupados = {(t.day, t.number) for t in turnos}
+            asignatura_en_dia = {(t.subject_id, t.day) for t in turnos if not bloqueada(t.day)}
+            turnos_por_dia = max(t.number for t in turnos)
+
+            # Las filas del LoadBalance son las semanas del horario al generarlo: las semanas
+            # bloqueadas que no tienen turnos del horario ya estaban bloqueadas entonces
+            load_balance = balances.get(schedule_id)
+            balance = [list(fila) for fila in load_balance.balance] if load_balance and load_balance.balance else None
+            fila_de_lunes = {}
+            columnas = None
+            if balance:
+                rangos_nuevos = [
+                    (inicio, fin) for inicio, fin in calendario.rangos
+                    if any(inicio <= t.day <= fin for t in turnos)
+                ]
+                lunes_generacion = calendario.lunes_de(len(balance), ignorar=rangos_nuevos)
+                fila_de_lunes = {inicio: k for k, inicio in enumerate(lunes_generacion)}
+                # Cada columna es una asignatura, en el orden guardado al generar el horario; los
+                # balances anteriores a LoadBalance.subjects no se pueden relacionar y no se tocan
+                if load_balance.subjects:
+                    columnas = {subject_id: j for j, subject_id in enumerate(load_balance.subjects) if subject_id}
+            carga = {}
+            if balance:
+                for inicio, k in fila_de_lunes.items():
+                    carga[inicio] = sum(balance[k])
+            else:
+                for t in turnos:
+                    carga[_lunes(t.day)] = carga.get(_lunes(t.day), 0) + 1
+
+            def buscar_hueco(inicio_semana, turno):
+                mejor = None
+                for dia in range(5):
+                    fecha = inicio_semana + datetime.timedelta(days=dia)
+                    if fecha < period.start or fecha > period.end or bloqueada(fecha):
+                        continue
+                    for numero in range(1, MAX_TURNOS_DIA + 1):
+                        if (fecha, numero) in ocupados:
+                            continue
+                        if not indice.libre(turno.teacher_id, class_room_id, fecha, numero):
+                            continue
+                        clave = (numero > turnos_por_dia, (turno.subject_id, fecha) in asignatura_en_dia, numero, fecha)
+                        if mejor is None or clave < mejor[0]:
+                            mejor = (clave, fecha, numero)
+                return mejor
+
+            for turno in afectados:
+                semana_original = _lunes(turno.day)
+                hueco = buscar_hueco(semana_original, turno)
+                misma_semana = hueco is not None
+                if hueco is None:
+                    for inicio_semana in sorted(
+                            (s for s in semanas_periodo if s != semana_original),
+                            key=lambda s: (carga.get(s, 0), abs((s - semana_original).days))):
+                        hueco = buscar_hueco(inicio_semana, turno)
+                        if hueco is not None:
+                            break
+                if hueco is None:
+                    resultado['unplaced'].append(turno.id)
+                    continue
+
+                _, fecha, numero = hueco
+                semana_nueva = _lunes(fecha)
+                ocupados.add((fecha, numero))
+                asignatura_en_dia.add((turno.subject_id, fecha))
+                indice.ocupar(turno.teacher_id, class_room_id, fecha, numero)
+                carga[semana_original] = carga.get(semana_original, 0) - 1
+                carga[semana_nueva] = carga.get(semana_nueva, 0) + 1
+                if columnas is not None and turno.subject_id in columnas and semana_nueva != semana_original:
+                    j = columnas[turno.subject_id]
+                    if semana_original in fila_de_lunes and semana_nueva in fila_de_lunes:
+                        balance[fila_de_lunes[semana_original]][j] -= 1
+                        balance[fila_de_lunes[semana_nueva]][j] += 1
+                        resultado['balance_updated'] = True
+                turno.day = fecha
+                turno.number = numero
+                movidos.append(turno)
+                resultado['moved_same_week' if misma_semana else 'moved_other_week'] += 1
+
+            if resultado['balance_updated']:
+                load_balance.balance = balance
+                balances_cambiados.append(load_balance)
+
+        if not dry_run and (movidos or balances_cambiados):
+            ClassTime.objects.bulk_update(movidos, ['day', 'number'], batch_size=500)
+            LoadBalance.objects.bulk_update(balances_cambiados, ['balance'])
+            Schedule.touch_class_times({turno.schedule_id for turno in movidos})
+    return resultados
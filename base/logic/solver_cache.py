@@ -0,0 +1,56 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from base.models import SolverCacheEntry
+
+
+def instance_key(asignaturas, encuentros, lbound, ubound, balance_below, dias_no_disponibles, actividades,
+                 iteraciones, seed, opciones=None):
+    """
+    Hash canónico (SHA-256) de una instancia del generador. Los datos se serializan como JSON
+    con claves ordenadas, así dos peticiones con las mismas entradas producen la misma clave.
+    """
+    dias = sorted(
+        (int(dia['numero_semana']), int(dia['dia_semana'])) for dia in (dias_no_disponibles or [])
+    )
+    instancia = {
+        'asignaturas': list(asignaturas),
+        'encuentros': [int(e) for e in encuentros],
+        'lbound': lbound,
+        'ubound': ubound,
+        'balance_below': balance_below,
+        'dias_no_disponibles': dias,
+        'actividades': actividades,
+        'iteraciones': iteraciones,
+        'seed': seed,
+        'opciones': opciones or {},
+    }
+    texto = json.dumps(instancia, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def get_cached_result(key):
+    """Devuelve (balance, horario, resumen) si la clave está en caché y marca el uso; si no, None."""
+    entry = SolverCacheEntry.objects.filter(key=key).first()
+    if entry is None:
+        return None
+    SolverCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used=timezone.now())
+    return entry.balance, entry.horario, dict(entry.summary)
+
+
+def store_result(key, balance, horario, resumen):
+    """Guarda un resultado y expulsa los menos usados recientemente si se supera el máximo."""
+    SolverCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={'balance': balance, 'horario': horario, 'summary': resumen, 'last_used': timezone.now()},
+    )
+    max_entries = getattr(settings, 'SOLVER_CACHE_MAX_ENTRIES', 500)
+    sobrantes = list(
+        SolverCacheEntry.objects.order_by('-last_used').values_list('pk', flat=True)[max_entries:]
+    )
+    if sobrantes:
+        SolverCacheEntry.objects.filter(pk__in=sobrantes).delete()
@@ -0,0 +1,227 @@
+import contextlib
+import csv
+import datetime
+import io
+import itertools
+import json
+import platform
+import random
+import time
+import tracemalloc
+from math import ceil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.logic.logicaHorario import (
+    SOLVERS, TABU_ENGINES, balancear_semanas, calcular_turnos_por_dia, distribuir_dias,
+)
+
+
+CAMPOS = [
+    'instance', 'subjects', 'weeks', 'encounters_ratio', 'tightness', 'unavailable_density',
+    'repeat', 'seed', 'solver', 'engine', 'starts', 'iterations_requested', 'total_turns',
+    'unavailable_days', 'turns_per_day', 'balance_ms', 'days_ms', 'wall_ms', 'iterations',
+    'iterations_per_sec', 'peak_kib', 'variance', 'max_deviation', 'stop_reason', 'unplaced_turns',
+]
+
+
+def generar_instancia(rng, num_asignaturas, num_semanas, ratio_encuentros, holgura, densidad):
+    """
+    Instancia sintética con el mismo formato que recibe generar_horario:
+    - encuentros por asignatura alrededor de ratio_encuentros * semanas,
+    - ubound = ceil(holgura * encuentros / semanas) (1.0 es la cota más ajustada posible),
+    - una fracción `densidad` de los días hábiles marcada como no disponible,
+    - Q por semana igual a las horas que caben en los días disponibles de esa semana.
+    """
+    asignaturas = [f'A{i + 1}' for i in range(num_asignaturas)]
+    encuentros = [
+        max(1, round(ratio_encuentros * num_semanas * rng.uniform(0.5, 1.5)))
+        for _ in range(num_asignaturas)
+    ]
+    ubound = [
+        [max(1, ceil(holgura * e / num_semanas))] * num_semanas
+        for e in encuentros
+    ]
+    lbound = [[0] * num_semanas for _ in range(num_asignaturas)]
+
+    dias_habiles = [(semana, dia) for semana in range(1, num_semanas + 1) for dia in range(5)]
+    bloqueados = rng.sample(dias_habiles, int(round(densidad * len(dias_habiles))))
+    dias_no_disponibles = [
+        {'numero_semana': semana, 'dia_semana': dia} for semana, dia in sorted(bloqueados)
+    ]
+
+    turnos_por_dia = calcular_turnos_por_dia(encuentros, num_semanas, dias_no_disponibles)
+    bloqueados_por_semana = [0] * num_semanas
+    for semana, _ in bloqueados:
+        bloqueados_por_semana[semana - 1] += 1
+    Q = [2 * turnos_por_dia * (5 - b) for b in bloqueados_por_semana]
+
+    return {
+        'asignaturas': asignaturas,
+        'encuentros': encuentros,
+        'lbound': lbound,
+        'ubound': ubound,
+        'Q': Q,
+        'horas': [[2] * e for e in encuentros],
+        'dias_no_disponibles': dias_no_disponibles,
+        'turnos_por_dia': turnos_por_dia,
+    }
+
+
+def resolver(instancia, opciones):
+    """Ejecuta las etapas de balance semanal y distribución por días, sin tocar la base de datos."""
+    n = len(instancia['asignaturas'])
+    m = len(instancia['Q'])
+    inicio = time.perf_counter()
+    solucion, resumen = balancear_semanas(
+        n, m, instancia['encuentros'], instancia['Q'], instancia['horas'],
+        instancia['lbound'], instancia['ubound'], opciones['iterations'],
+        engine=opciones['engine'], seed=opciones['seed'], solver=opciones['solver'],
+        milp_time_limit=opciones['milp_time_limit'], tabu_starts=opciones['starts'],
+        workers=opciones['workers'], time_budget_ms=opciones['time_budget_ms'],
+    )
+    fin_balance = time.perf_counter()
+    balance_carga = [list(fila) for fila in zip(*solucion)]
+    horario, _ = distribuir_dias(balance_carga, instancia['asignaturas'], instancia['dias_no_disponibles'],
+                                 instancia['turnos_por_dia'], random.Random(opciones['seed']))
+    fin = time.perf_counter()
+    return horario, resumen, (fin_balance - inicio) * 1000, (fin - fin_balance) * 1000
+
+
+class Command(BaseCommand):
+    help = ('Mide el generador de horarios (balance semanal y distribución por días) sobre '
+            'instancias sintéticas reproducibles y guarda los resultados en JSON o CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subjects', nargs='+', type=int, default=[5, 15, 30, 60],
+                            help='Cantidades de asignaturas a probar')
+        parser.add_argument('--weeks', nargs='+', type=int, default=[3, 8, 16, 24],
+                            help='Cantidades de semanas a probar')
+        parser.add_argument('--encounters', nargs='+', type=float, default=[1.0, 2.0],
+                            help='Encuentros por asignatura como múltiplo de la cantidad de semanas')
+        parser.add_argument('--tightness', nargs='+', type=float, default=[1.0, 1.5, 2.5],
+                            help='Holgura de ubound respecto a encuentros/semanas (1.0 = la más ajustada)')
+        parser.add_argument('--unavailable', nargs='+', type=float, default=[0.0, 0.1],
+                            help='Fracción de días hábiles no disponibles')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Instancias distintas por cada combinación de parámetros')
+        parser.add_argument('--seed', type=int, default=2025,
+                            help='Semilla para generar las instancias y para el solver')
+        parser.add_argument('--solver', choices=SOLVERS, default='tabu')
+        parser.add_argument('--engine', choices=TABU_ENGINES, default='python')
+        parser.add_argument('--iterations', type=int, default=50, help='Iteraciones de la búsqueda tabú')
+        parser.add_argument('--starts', type=int, default=1, help='Trayectorias tabú independientes')
+        parser.add_argument('--workers', type=int, default=None, help='Procesos para el multiarranque')
+        parser.add_argument('--time-budget-ms', type=int, default=None,
+                            help='Tiempo máximo de la búsqueda tabú por instancia')
+        parser.add_argument('--milp-time-limit', type=int, default=10, help='Segundos máximos para CBC')
+        parser.add_argument('--no-memory', action='store_true',
+                            help='No medir el pico de memoria (evita la segunda corrida con tracemalloc)')
+        parser.add_argument('--output', type=str, default=None,
+                            help='Archivo de resultados; .csv escribe CSV, cualquier otra extensión JSON')
+
+    def handle(self, *args, **options):
+        for nombre in ('subjects', 'weeks'):
+            if any(valor < 1 for valor in options[nombre]):
+                raise CommandError(f'--{nombre} solo admite valores positivos')
+        if any(not 0 <= valor < 1 for valor in options['unavailable']):
+            raise CommandError('--unavailable debe estar en el intervalo [0, 1)')
+
+        opciones_solver = {
+            'seed': options['seed'],
+            'solver': options['solver'],
+            'engine': options['engine'],
+            'iterations': options['iterations'],
+            'starts': options['starts'],
+            'workers': options['workers'],
+            'time_budget_ms': options['time_budget_ms'],
+            'milp_time_limit': options['milp_time_limit'],
+        }
+        combinaciones = list(itertools.product(
+            options['subjects'], options['weeks'], options['encounters'],
+            options['tightness'], options['unavailable'], range(options['repeat']),
+        ))
+        self.stdout.write(f'Ejecutando {len(combinaciones)} instancias...')
+
+        resultados = []
+        for indice, (n, m, ratio, holgura, densidad, repeticion) in enumerate(combinaciones, start=1):
+            # Cada instancia tiene su propio generador: agregar valores a un barrido no cambia las demás
+            rng = random.Random(f"{options['seed']}:{n}:{m}:{ratio}:{holgura}:{densidad}:{repeticion}")
+
+            # El solver imprime su traza; se descarta para no distorsionar los tiempos en consola
+            with contextlib.redirect_stdout(io.StringIO()):
+                instancia = generar_instancia(rng, n, m, ratio, holgura, densidad)
+                horario, resumen, balance_ms, dias_ms = resolver(instancia, opciones_solver)
+                pico_kib = None
+                if not options['no_memory']:
+                    # Segunda corrida con la misma semilla: tracemalloc ralentiza el código Python
+                    tracemalloc.start()
+                    resolver(instancia, opciones_solver)
+                    _, pico = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    pico_kib = round(pico / 1024, 1)
+
+            iteraciones = resumen.get('iterations')
+            if isinstance(iteraciones, list):
+                iteraciones = sum(iteraciones)
+            total_turnos = sum(instancia['encuentros'])
+            colocados = sum(len(dia) for semana in horario for dia in semana)
+            fila = {
+                'instance': indice,
+                'subjects': n,
+                'weeks': m,
+                'encounters_ratio': ratio,
+                'tightness': holgura,
+                'unavailable_density': densidad,
+                'repeat': repeticion,
+                'seed': options['seed'],
+                'solver': options['solver'],
+                'engine': options['engine'],
+                'starts': options['starts'],
+                'iterations_requested': options['iterations'],
+                'total_turns': total_turnos,
+                'unavailable_days': len(instancia['dias_no_disponibles']),
+                'turns_per_day': instancia['turnos_por_dia'],
+                'balance_ms': round(balance_ms, 3),
+                'days_ms': round(dias_ms, 3),
+                'wall_ms': round(balance_ms + dias_ms, 3),
+                'iterations': iteraciones,
+                'iterations_per_sec': round(iteraciones / (balance_ms / 1000), 1) if iteraciones and balance_ms else None,
+                'peak_kib': pico_kib,
+                'variance': round(resumen['variance'], 6),
+                'max_deviation': round(resumen['max_deviation'], 6),
+                'stop_reason': resumen.get('stop_reason'),
+                'unplaced_turns': total_turnos - colocados,
+            }
+            resultados.append(fila)
+            self.stdout.write(
+                f"[{indice}/{len(combinaciones)}] asignaturas={n} semanas={m} encuentros={ratio} "
+                f"holgura={holgura} no_disponibles={densidad}: {fila['wall_ms']} ms, "
+                f"varianza={fila['variance']}, desviación máx.={fila['max_deviation']}, "
+                f"iter/s={fila['iterations_per_sec']}, pico={pico_kib} KiB"
+            )
+
+        if options['output']:
+            self.guardar(options['output'], resultados, options)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(resultados, indent=2))
+
+    def guardar(self, ruta, resultados, options):
+        if ruta.lower().endswith('.csv'):
+            with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+                writer = csv.DictWriter(archivo, fieldnames=CAMPOS)
+                writer.writeheader()
+                writer.writerows(resultados)
+            return
+        meta = {
+            'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'options': {clave: options[clave] for clave in (
+                'subjects', 'weeks', 'encounters', 'tightness', 'unavailable', 'repeat', 'seed',
+                'solver', 'engine', 'iterations', 'starts', 'workers', 'time_budget_ms', 'milp_time_limit',
+            )},
+        }
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump({'meta': meta, 'results': resultados}, archivo, indent=2)
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from base.logic.jobs import ejecutar_trabajo, inicializar_proceso, marcar_fallido, reclamar_trabajos, reencolar_en_curso
+
+
+class Command(BaseCommand):
+    help = ('Ejecuta los trabajos de generación de horarios encolados por calculate-balance, '
+            'varios a la vez hasta el límite de concurrencia')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Trabajos simultáneos (por defecto GENERATION_WORKER_CONCURRENCY)')
+        parser.add_argument('--poll', type=float, default=None,
+                            help='Segundos entre consultas a la cola (por defecto GENERATION_WORKER_POLL_SECONDS)')
+        parser.add_argument('--once', action='store_true',
+                            help='Procesar los trabajos pendientes y terminar cuando la cola quede vacía')
+        parser.add_argument('--requeue-running', action='store_true',
+                            help='Al iniciar, devolver a pendientes los trabajos que quedaron en curso '
+                                 'en un worker de este host que ya no está corriendo')
+
+    def handle(self, *args, **options):
+        concurrencia = options['concurrency'] or settings.GENERATION_WORKER_CONCURRENCY
+        espera = options['poll'] if options['poll'] is not None else settings.GENERATION_WORKER_POLL_SECONDS
+        if concurrencia < 1:
+            raise CommandError('--concurrency debe ser al menos 1')
+        host = socket.gethostname()
+        worker = f'{host}:{os.getpid()}'
+
+        if options['requeue_running']:
+            cantidad = reencolar_en_curso(host)
+            if cantidad:
+                self.stdout.write(self.style.WARNING(f'{cantidad} trabajos en curso devueltos a la cola'))
+
+        self.stdout.write(f'Worker {worker} iniciado con {concurrencia} procesos')
+        # spawn: cada proceso abre sus propias conexiones en lugar de heredar las del padre
+        contexto = multiprocessing.get_context('spawn')
+        en_curso = {}
+        with ProcessPoolExecutor(max_workers=concurrencia, mp_context=contexto,
+                                 initializer=inicializar_proceso) as pool:
+            try:
+                while True:
+                    for futuro in [f for f in en_curso if f.done()]:
+                        job_id = en_curso.pop(futuro)
+                        try:
+                            estado = futuro.result()
+                            self.stdout.write(f'Trabajo {job_id}: {estado}')
+                        except Exception as e:
+                            # El proceso murió sin poder registrar el error (p. ej. sin memoria)
+                            marcar_fallido(job_id, f'El proceso del worker terminó inesperadamente: {e!r}')
+                            self.stdout.write(self.style.ERROR(f'Trabajo {job_id}: fallido ({e!r})'))
+
+                    nuevos = reclamar_trabajos(concurrencia - len(en_curso), worker)
+                    for job_id in nuevos:
+                        en_curso[pool.submit(ejecutar_trabajo, job_id)] = job_id
+                        self.stdout.write(f'Trabajo {job_id}: iniciado')
+
+                    if options['once'] and not en_curso:
+                        break
+                    if en_curso:
+                        wait(list(en_curso), timeout=espera, return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(espera)
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING(
+                    f'Deteniendo el worker; esperando {len(en_curso)} trabajos en curso'
+                ))
+        self.stdout.write(self.style.SUCCESS('Worker detenido'))
@@ -0,0 +1,32 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_alter_schedule_class_room_alter_schedule_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolverCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Hash SHA-256 de las entradas del generador', max_length=64, unique=True, verbose_name='clave')),
+                ('balance', models.JSONField(default=list, verbose_name='balance')),
+                ('horario', models.JSONField(default=list, verbose_name='horario')),
+                ('summary', models.JSONField(blank=True, default=dict, verbose_name='resumen')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='usos')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='creado')),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='último uso')),
+            ],
+            options={
+                'verbose_name': 'Resultado en caché del generador',
+                'verbose_name_plural': 'Resultados en caché del generador',
+            },
+        ),
+    ]
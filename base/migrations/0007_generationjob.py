@@ -0,0 +1,40 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_solvercacheentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En curso'), ('done', 'Terminado'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=10, verbose_name='estado')),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Porcentaje completado (0-100)', verbose_name='progreso')),
+                ('stage', models.CharField(blank=True, default='', max_length=40, verbose_name='etapa')),
+                ('payload', models.JSONField(default=dict, verbose_name='datos de entrada')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='resultado')),
+                ('error', models.TextField(blank=True, default='', verbose_name='error')),
+                ('worker', models.CharField(blank=True, default='', max_length=100, verbose_name='proceso')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='creado')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='iniciado')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='terminado')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='creado por')),
+                ('schedule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='base.schedule', verbose_name='horario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de generación',
+                'verbose_name_plural': 'Trabajos de generación',
+                'ordering': ('created',),
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_generationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='live',
+            field=models.JSONField(blank=True, default=dict, help_text='Último evento de la búsqueda tabú: iteración, objetivos y cargas por semana', verbose_name='último progreso'),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='stop_requested',
+            field=models.BooleanField(default=False, verbose_name='detención solicitada'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_generationjob_live_stop_requested'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classtime',
+            index=models.Index(fields=['teacher', 'day', 'number'], name='classtime_teacher_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_classtime_teacher_slot_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='period',
+            name='calendar_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Aumenta cuando cambian sus días o semanas no disponibles', verbose_name='versión del calendario'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_period_calendar_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='class_times_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Aumenta con cada cambio en sus turnos', verbose_name='versión de los turnos'),
+        ),
+    ]
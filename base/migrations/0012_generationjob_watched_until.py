@@ -0,0 +1,19 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_schedule_class_times_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='watched_until',
+            field=models.DateTimeField(blank=True, help_text='Lo renueva el endpoint de eventos mientras hay un cliente conectado; hasta entonces el worker guarda `live`', null=True, verbose_name='observado hasta'),
+        ),
+    ]
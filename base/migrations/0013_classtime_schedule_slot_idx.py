@@ -0,0 +1,22 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_generationjob_watched_until'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='classtime',
+            name='classtime_teacher_slot_idx',
+        ),
+        migrations.AddIndex(
+            model_name='classtime',
+            index=models.Index(fields=['schedule', 'teacher', 'day', 'number'], name='classtime_schedule_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Escrita a mano: makemigrations no puede reconstruir el estado de la app porque la 0002
+# quita Year.course, que la 0001 regenerada ya no crea (KeyError 'course').
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_classtime_schedule_slot_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loadbalance',
+            name='subjects',
+            field=models.JSONField(blank=True, default=list, verbose_name='Asignaturas'),
+        ),
+    ]
@@ -13,6 +13,8 @@ from .year import Year
 from .week_not_available import WeekNotAvailable
 from .load_balance import LoadBalance
 from .class_room import ClassRoom
+from .solver_cache import SolverCacheEntry
+from .generation_job import GenerationJob
 __all__ = [
 
     "Task",
@@ -29,7 +31,9 @@ __all__ = [
     "Year",
     "WeekNotAvailable",
     "LoadBalance",
-    "ClassRoom"
+    "ClassRoom",
+    "SolverCacheEntry",
+    "GenerationJob",
 
 ]
 
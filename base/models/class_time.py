@@ -5,6 +5,19 @@ from django.utils.translation import gettext_lazy as _
 import datetime
 
 
+class ClassTimeQuerySet(models.QuerySet):
+
+    def delete(self):
+        """Borra los turnos y aumenta una sola vez la versión de sus horarios."""
+        from django.db import transaction
+        from base.models import Schedule
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            schedule_ids = set(self.values_list('schedule_id', flat=True))
+            resultado = super().delete()
+            Schedule.touch_class_times(schedule_ids)
+        return resultado
+
 
 class ClassTime(models.Model):
 
@@ -74,8 +87,30 @@ class ClassTime(models.Model):
                 violation_error_message='El día no puede ser domingo'
             ),
         ]
+        indexes = [
+            # OccupancyIndex.cargar (base/logic/occupancy.py) recorre los turnos de cada horario
+            # del período (join por schedule) y solo lee profesor, día y número: con este índice
+            # la lectura sale entera del índice, sin tocar la tabla
+            models.Index(fields=['schedule', 'teacher', 'day', 'number'], name='classtime_schedule_slot_idx'),
+        ]
+
+
+    objects = ClassTimeQuerySet.as_manager()
+
+    def delete(self, using=None, keep_parents=False):
+        """
+        Borra el turno y aumenta la versión de su horario. No hay receptores de borrado de
+        ClassTime: los turnos que se borran en cascada se marcan desde base/signals.py, una
+        vez por borrado y no por turno.
+        """
+        from django.db import router, transaction
+        from base.models import Schedule
 
+        using = using or router.db_for_write(ClassTime, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            resultado = super().delete(using=using, keep_parents=keep_parents)
+            Schedule.touch_class_times([self.schedule_id])
+        return resultado
 
-    
     def __str__(self):
         return f"Turno {self.number} del dia {self.day} {f'de la asignatura {self.subject}' if self.subject else ''}{f' con {self.teacher}' if self.teacher else ''}"
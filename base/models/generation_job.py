@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class GenerationJob(models.Model):
+    class State(models.TextChoices):
+        PENDING = 'pending', _('Pendiente')
+        RUNNING = 'running', _('En curso')
+        DONE = 'done', _('Terminado')
+        FAILED = 'failed', _('Fallido')
+
+    state = models.CharField(verbose_name=_('estado'),
+                             max_length=10,
+                             choices=State.choices,
+                             default=State.PENDING,
+                             db_index=True,
+                             )
+
+    progress = models.PositiveSmallIntegerField(verbose_name=_('progreso'),
+                                                default=0,
+                                                help_text=_('Porcentaje completado (0-100)'),
+                                                )
+
+    stage = models.CharField(verbose_name=_('etapa'), max_length=40, blank=True, default='')
+
+    live = models.JSONField(verbose_name=_('último progreso'),
+                            default=dict,
+                            blank=True,
+                            help_text=_('Último evento de la búsqueda tabú: iteración, objetivos y cargas por semana'),
+                            )
+
+    stop_requested = models.BooleanField(verbose_name=_('detención solicitada'), default=False)
+
+    watched_until = models.DateTimeField(verbose_name=_('observado hasta'),
+                                         null=True,
+                                         blank=True,
+                                         help_text=_('Lo renueva el endpoint de eventos mientras hay un cliente '
+                                                     'conectado; hasta entonces el worker guarda `live`'),
+                                         )
+
+    payload = models.JSONField(verbose_name=_('datos de entrada'), default=dict)
+
+    result = models.JSONField(verbose_name=_('resultado'), default=dict, blank=True)
+
+    error = models.TextField(verbose_name=_('error'), blank=True, default='')
+
+    schedule = models.ForeignKey("base.Schedule",
+                                 verbose_name=_("horario"),
+                                 null=True,
+                                 blank=True,
+                                 on_delete=models.SET_NULL,
+                                 )
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                   verbose_name=_('creado por'),
+                                   null=True,
+                                   blank=True,
+                                   on_delete=models.SET_NULL,
+                                   )
+
+    worker = models.CharField(verbose_name=_('proceso'), max_length=100, blank=True, default='')
+
+    created = models.DateTimeField(verbose_name=_('creado'), auto_now_add=True)
+
+    started = models.DateTimeField(verbose_name=_('iniciado'), null=True, blank=True)
+
+    finished = models.DateTimeField(verbose_name=_('terminado'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Trabajo de generación")
+        verbose_name_plural = _("Trabajos de generación")
+        ordering = ('created',)
+
+    def __str__(self):
+        return f"Trabajo {self.pk} ({self.get_state_display()}, {self.progress}%)"
@@ -4,6 +4,8 @@ from django.utils.translation import gettext_lazy as _
 
 class LoadBalance(models.Model):
     balance = models.JSONField(default=list, blank=True, verbose_name="Balance")
+    # Id de la asignatura de cada columna de balance, en el mismo orden
+    subjects = models.JSONField(default=list, blank=True, verbose_name="Asignaturas")
     schedule = models.ForeignKey(
         "base.Schedule",
         verbose_name=_("horario"),
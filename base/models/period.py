@@ -30,6 +30,12 @@ class Period(models.Model):
                            auto_now_add=False,
                            )
 
+    calendar_version = models.PositiveIntegerField(verbose_name=_('versión del calendario'),
+                                                   default=0,
+                                                   editable=False,
+                                                   help_text=_('Aumenta cuando cambian sus días o semanas no disponibles'),
+                                                   )
+
     class Meta:
         verbose_name = _("Período")
         verbose_name_plural = _("Períodos")
@@ -103,29 +109,18 @@ class Period(models.Model):
 
         return super().clean()
 
+    def calendar(self):
+        """Calendario precalculado del período (PeriodCalendar), compartido mientras no cambie."""
+        # Importar aquí para evitar import circular
+        from base.logic.calendario import PeriodCalendar
+        return PeriodCalendar.para(self)
+
     def number_of_weeks_excluding_unavailable(self):
         """
         Calcula la cantidad de semanas del período, considerando desde el lunes anterior a la fecha de inicio
         hasta el domingo posterior a la fecha de fin, y restando las semanas completas no disponibles.
         """
-        start_monday = self.get_start()
-        end_sunday = self.get_end()
-        
-        # Total de semanas en el rango (usando la misma lógica que number_of_weeks)
-        total_weeks = ceil(((end_sunday - start_monday).days + 2) / 7)
-        
-        # Importar aquí para evitar import circular
-        from .week_not_available import WeekNotAvailable
-        
-        unavailable_weeks = WeekNotAvailable.objects.filter(period=self)
-        
-        weeks_to_subtract = 0
-        for unavailable_week in unavailable_weeks:
-            days_unavailable = (unavailable_week.end_date - unavailable_week.start_date).days + 1
-            
-            weeks_to_subtract += days_unavailable // 7
-        
-        return total_weeks - weeks_to_subtract
+        return self.calendar().semanas_excluyendo_no_disponibles()
 
     def days_not_available_by_week(self):
         """
@@ -136,35 +131,7 @@ class Period(models.Model):
         }
         para cada DayNotAvailable asociado al período.
         """
-        from .week_not_available import WeekNotAvailable
-        from .day_not_available import DayNotAvailable
-
-        start_date = self.get_start()
-        
-        unavailable_weeks = WeekNotAvailable.objects.filter(period=self).order_by('start_date')
-        
-        days_not_available = DayNotAvailable.objects.filter(period=self)
-        
-        result = []
-        for day in days_not_available:
-            day_date = day.day
-            
-            days_since_start = (day_date - start_date).days
-            absolute_week = days_since_start // 7 + 1
-            
-            weeks_to_subtract = 0
-            for unavailable_week in unavailable_weeks:
-                if unavailable_week.end_date < day_date:
-                    weeks_to_subtract += 1
-            
-            adjusted_week = absolute_week - weeks_to_subtract
-            
-            result.append({
-                'numero_semana': adjusted_week,
-                'dia_semana': day_date.weekday()
-            })
-        
-        return result
+        return self.calendar().dias_no_disponibles_por_semana()
 
     
     def __str__(self):
@@ -42,6 +42,12 @@ class Schedule(models.Model):
                              max_length=50,
                              )
 
+    class_times_version = models.PositiveIntegerField(verbose_name=_('versión de los turnos'),
+                                                      default=0,
+                                                      editable=False,
+                                                      help_text=_('Aumenta con cada cambio en sus turnos'),
+                                                      )
+
 
 
     class Meta:
@@ -49,5 +55,28 @@ class Schedule(models.Model):
         verbose_name_plural = _("Horarios")
         ordering = ('period',)
 
+    @classmethod
+    def touch_class_times(cls, schedule_ids):
+        """
+        Marca que cambiaron los turnos de los horarios: aumenta class_times_version y actualiza
+        `updated` (update() no aplica auto_now). De aquí salen los ETag de horarios y turnos.
+        """
+        from django.db.models import F
+        from django.utils import timezone
+        return cls.objects.filter(pk__in=schedule_ids).update(
+            class_times_version=F('class_times_version') + 1, updated=timezone.now(),
+        )
+
+    @classmethod
+    def touch(cls, **filtros):
+        """
+        Actualiza `updated` de los horarios que cumplen `filtros` porque cambió algo que se
+        muestra en ellos (nombre de un profesor, aula, período...), así cambian sus ETag y la
+        clave de sus exportaciones en caché. Una sola consulta UPDATE.
+        """
+        from django.utils import timezone
+        ids = cls.objects.filter(**filtros).values('pk')
+        return cls.objects.filter(pk__in=ids).update(updated=timezone.now())
+
     def __str__(self):
         return f'Horario de {self.career} {self.group}'
\ No newline at end of file
@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class SolverCacheEntry(models.Model):
+    key = models.CharField(verbose_name=_('clave'),
+                           max_length=64,
+                           unique=True,
+                           help_text=_('Hash SHA-256 de las entradas del generador'),
+                           )
+
+    balance = models.JSONField(verbose_name=_('balance'), default=list)
+
+    horario = models.JSONField(verbose_name=_('horario'), default=list)
+
+    summary = models.JSONField(verbose_name=_('resumen'), default=dict, blank=True)
+
+    hits = models.PositiveIntegerField(verbose_name=_('usos'), default=0)
+
+    created = models.DateTimeField(verbose_name=_('creado'), auto_now_add=True)
+
+    last_used = models.DateTimeField(verbose_name=_('último uso'),
+                                     default=timezone.now,
+                                     db_index=True,
+                                     )
+
+    class Meta:
+        verbose_name = _("Resultado en caché del generador")
+        verbose_name_plural = _("Resultados en caché del generador")
+
+    def __str__(self):
+        return f"Caché {self.key[:12]} ({self.hits} usos)"
@@ -0,0 +1,24 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Paginación de GenericModelViewSet. Los modelos con page_size en su plan (los que crecen
+    con cada horario, como los turnos) se paginan siempre, para que un listado no devuelva la
+    tabla entera. El resto solo se pagina si la petición trae ?page o ?page_size, y si no sigue
+    devolviendo una lista simple, como espera el frontend.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        por_defecto = getattr(view, 'page_size', None)
+        if not por_defecto and self.page_query_param not in request.query_params \
+                and self.page_size_query_param not in request.query_params:
+            return None
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_page_size(self, request):
+        self.page_size = getattr(self.view, 'page_size', None) or 100
+        return super().get_page_size(request)
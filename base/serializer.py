@@ -1,3 +1,6 @@
+import copy
+import threading
+
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
@@ -5,35 +8,26 @@ from .models import Task, Activity, Career, Course, Faculty, Period, ClassTime,
 from django.contrib.auth.models import User
 
 class GenericModelSerializer(serializers.ModelSerializer):
+    """
+    Base de los serializers de GenericModelViewSet. No se usa directamente: serializer_for_model
+    crea (una sola vez) una subclase por modelo con su Meta.model y sus campos extra.
+    """
     class Meta:
-        model = None  # Se asignará dinámicamente
+        model = None  # Lo define cada subclase
         fields = '__all__'  # Serializar todos los campos
 
-    def __init__(self, *args, **kwargs):
+    def get_fields(self):
         """
-        Permite definir dinámicamente el modelo en cada instancia del serializer.
+        Los campos se calculan una vez por clase y cada instancia recibe una copia, como hace
+        DRF con los campos declarados, en lugar de inspeccionar el modelo en cada petición.
         """
-        model = kwargs.pop('model', None)  # Recibe el modelo como parámetro
-        super().__init__(*args, **kwargs)
-        if model:
-            self.Meta.model = model 
-
-            if model == Year:
-                self.fields['number_choice'] = serializers.CharField(read_only=True)
-            
-            if model == Period:
-                self.fields['number_of_weeks_excluding_unavailable'] = serializers.SerializerMethodField(read_only=True)
-                self.fields['days_not_available_by_week'] = serializers.SerializerMethodField(read_only=True)
-
-            if model == Schedule:
-                self.fields['to_string'] = serializers.SerializerMethodField(read_only=True)
-
-            rel_fields = [
-                name for name, field in self.fields.items()
-                if getattr(field, 'source', None) and field.source.endswith('_set')
-            ]
-            for rel_field in rel_fields:
-                self.fields.pop(rel_field)
+        campos = type(self).__dict__.get('_campos')
+        if campos is None:
+            campos = super().get_fields()
+            for nombre in [n for n, f in campos.items() if getattr(f, 'source', None) and f.source.endswith('_set')]:
+                campos.pop(nombre)
+            type(self)._campos = campos
+        return copy.deepcopy(campos)
 
     def get_number_of_weeks_excluding_unavailable(self, obj):
         if isinstance(obj, Period):
@@ -50,6 +44,40 @@ class GenericModelSerializer(serializers.ModelSerializer):
             return str(obj)
         return None
 
+
+_serializers_por_modelo = {}
+_serializers_lock = threading.Lock()
+
+
+def serializer_for_model(model):
+    """
+    Serializer de `model` para GenericModelViewSet. Se construye la primera vez que se pide,
+    bajo un lock, y después se reutiliza: ninguna petición modifica una clase compartida.
+    """
+    serializer_class = _serializers_por_modelo.get(model)
+    if serializer_class is not None:
+        return serializer_class
+    with _serializers_lock:
+        serializer_class = _serializers_por_modelo.get(model)
+        if serializer_class is None:
+            attrs = {
+                'Meta': type('Meta', (GenericModelSerializer.Meta,), {'model': model, 'fields': '__all__'}),
+                '__module__': __name__,
+            }
+            if model == Year:
+                attrs['number_choice'] = serializers.CharField(read_only=True)
+            if model == Period:
+                attrs['number_of_weeks_excluding_unavailable'] = serializers.SerializerMethodField(read_only=True)
+                attrs['days_not_available_by_week'] = serializers.SerializerMethodField(read_only=True)
+            if model == Schedule:
+                attrs['to_string'] = serializers.SerializerMethodField(read_only=True)
+            serializer_class = type(GenericModelSerializer)(
+                f'{model.__name__}Serializer', (GenericModelSerializer,), attrs,
+            )
+            serializer_class().get_fields()  # Calcular los campos una vez, dentro del lock
+            _serializers_por_modelo[model] = serializer_class
+    return serializer_class
+
 class RegisterSerializer(serializers.ModelSerializer):
     groups = serializers.SlugRelatedField(
         many=True,
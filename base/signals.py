@@ -0,0 +1,90 @@
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    Activity, Career, ClassRoom, ClassTime, Course, DayNotAvailable, Faculty, Period, Schedule, Subject, Teacher,
+    WeekNotAvailable, Year,
+)
+
+
+@receiver(post_save, sender=DayNotAvailable)
+@receiver(post_delete, sender=DayNotAvailable)
+@receiver(post_save, sender=WeekNotAvailable)
+@receiver(post_delete, sender=WeekNotAvailable)
+def invalidar_calendario(sender, instance, **kwargs):
+    """Invalida el PeriodCalendar del período en todos los procesos (cambia su calendar_version)."""
+    Period.objects.filter(pk=instance.period_id).update(calendar_version=F('calendar_version') + 1)
+
+
+@receiver(post_save, sender=ClassTime)
+def marcar_turnos_modificados(sender, instance, **kwargs):
+    """
+    Un turno creado o editado de a uno cambia la versión de su horario. Las escrituras en
+    bloque (guardar_horario, reparar_periodo) llaman a Schedule.touch_class_times una vez y los
+    borrados lo hacen en ClassTime.delete y ClassTimeQuerySet.delete: un receptor de borrado
+    en ClassTime haría una consulta por turno al borrar un período o un profesor.
+    """
+    Schedule.touch_class_times([instance.schedule_id])
+
+
+# Borrar cualquiera de estos modelos borra en cascada los horarios, y con ellos sus turnos
+BORRAN_HORARIOS = (Schedule, Period, Course, Career, Faculty, Year, ClassRoom)
+
+
+@receiver(pre_delete, sender=Subject)
+@receiver(pre_delete, sender=Teacher)
+def marcar_turnos_borrados(sender, instance, origin=None, **kwargs):
+    """
+    Borrar una asignatura o un profesor borra sus turnos en cascada: se aumenta la versión de
+    los horarios afectados con un solo UPDATE, salvo que la cascada borre también los horarios.
+    """
+    modelo_origen = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(modelo_origen, BORRAN_HORARIOS):
+        return
+    campo = 'classtime__subject' if sender is Subject else 'classtime__teacher'
+    Schedule.touch_class_times(Schedule.objects.filter(**{campo: instance}).values('pk'))
+
+
+@receiver(m2m_changed, sender=ClassTime.activities.through)
+def marcar_actividades_modificadas(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        Schedule.touch_class_times([instance.schedule_id])
+
+
+@receiver(m2m_changed, sender=Schedule.subjects.through)
+def marcar_asignaturas_modificadas(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        Schedule.objects.filter(pk=instance.pk).update(updated=timezone.now())
+
+
+# Datos que se muestran en un horario (y en sus exportaciones) sin ser parte de él: al
+# cambiarlos se actualiza `updated` de los horarios afectados. Al borrarlos los horarios o sus
+# turnos se borran en cascada, salvo las actividades, que solo salen de la tabla intermedia.
+HORARIOS_QUE_MUESTRAN = {
+    Teacher: 'classtime__teacher',
+    Subject: 'subjects',
+    Activity: 'classtime__activities',
+    ClassRoom: 'class_room',
+    Period: 'period',
+    Course: 'period__course',
+    Career: 'career',
+    Faculty: 'career__faculty',
+    Year: 'year',
+}
+
+
+def marcar_horarios_que_muestran(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return  # Un objeto nuevo todavía no aparece en ningún horario
+    Schedule.touch(**{HORARIOS_QUE_MUESTRAN[sender]: instance})
+
+
+for modelo in HORARIOS_QUE_MUESTRAN:
+    post_save.connect(marcar_horarios_que_muestran, sender=modelo, dispatch_uid=f'marcar_horarios_{modelo.__name__}')
+
+
+@receiver(pre_delete, sender=Activity)
+def marcar_horarios_sin_actividad(sender, instance, **kwargs):
+    Schedule.touch(classtime__activities=instance)
@@ -1 +1,1464 @@
-from django.test import TestCase
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from html.parser import HTMLParser
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.template.loader import render_to_string
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from base.models import (
+    Activity, Career, ClassRoom, ClassTime, Course, DayNotAvailable, Faculty, GenerationJob, LoadBalance, Period,
+    Schedule, Subject, Teacher, WeekNotAvailable, Year,
+)
+
+from base.logic.logicaHorario import (
+    MAX_TURNOS_DIA, SOLVERS, LoadState, MoveIndex, TabuSearch, balance_milp, balancear_semanas, distribuir_dias,
+    guardar_horario, initial_solution, multi_start_tabu, week_load,
+)
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+class _CeldasHorario(HTMLParser):
+    """Texto de cada <td> de la grilla de semanas de plantilla_horario.html, en orden."""
+
+    def __init__(self):
+        super().__init__()
+        self.celdas = []
+        self._texto = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'td' and 'h-[13pt]' in (dict(attrs).get('class') or ''):
+            self._texto = []
+
+    def handle_data(self, data):
+        if self._texto is not None:
+            self._texto.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'td' and self._texto is not None:
+            self.celdas.append(''.join(self._texto).strip())
+            self._texto = None
+
+
+def _contexto_de_prueba():
+    simbolos = ['MAT', 'FIS/3', 'QUI', 'PRO/1/2', 'Año', '']
+    weeks = []
+    for semana in range(24):
+        rows = [
+            [simbolos[(semana + turno + dia) % len(simbolos)] if semana < 15 and turno < 4 and dia < 5 else ''
+             for dia in range(6)]
+            for turno in range(6)
+        ]
+        weeks.append({'title': f'{semana + 1:02d}/09/2025 al {semana + 5:02d}/09/2025' if semana < 15 else '', 'rows': rows})
+    return {
+        'schedule': {
+            'career': 'Ingeniería Informática', 'year': 'Primer año', 'period': 'Primer período',
+            'course': '2025-2026', 'updated': '01/09/2025', 'faculty': 'Ingeniería', 'group': 'G1',
+            'class_room': 'Aula 5',
+        },
+        'weeks': weeks,
+        'subjects_activities': [
+            {'subject_symb': 'MAT', 'subject_name': 'Matemática', 'teacher_name': 'Núñez'},
+        ] + [{'subject_symb': '', 'subject_name': '', 'teacher_name': ''}] * 9,
+        'activities_list': [{'activity_name': 'Conferencia', 'symb': '1'}] + [{'activity_name': '', 'symb': ''}] * 9,
+        'max_turnos': 6,
+    }
+
+
+@skipUnless(fitz is not None, 'PyMuPDF no está instalado')
+class PyMuPDFRenderTests(SimpleTestCase):
+    """El motor PyMuPDF debe poner en cada celda lo mismo que la plantilla HTML que usa Chromium."""
+
+    def test_celdas_iguales_a_la_plantilla(self):
+        from base.exports import pymupdf_render
+
+        context = _contexto_de_prueba()
+        parser = _CeldasHorario()
+        parser.feed(render_to_string('plantilla_horario.html', context))
+        self.assertEqual(len(parser.celdas), 24 * 6 * 6)
+
+        doc = fitz.open(stream=pymupdf_render.renderizar_pdf(context), filetype='pdf')
+        palabras = doc.load_page(0).get_text('words')
+        doc.close()
+        celdas = iter(parser.celdas)
+        for semana in range(24):
+            for turno in range(6):
+                for dia in range(6):
+                    # Palabras del PDF cuyo centro cae dentro del rectángulo de la celda
+                    x0, y0, x1, y1 = pymupdf_render.rect_celda(semana, turno, dia)
+                    texto = ' '.join(
+                        p[4] for p in palabras
+                        if x0 < (p[0] + p[2]) / 2 < x1 and y0 < (p[1] + p[3]) / 2 < y1
+                    )
+                    self.assertEqual(texto, next(celdas), (semana, turno, dia))
+
+    def test_png(self):
+        from base.exports import pymupdf_render
+
+        png = pymupdf_render.renderizar_png(_contexto_de_prueba(), dpi=72)
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        pix = fitz.Pixmap(png)
+        self.assertEqual((pix.width, pix.height), (pymupdf_render.ANCHO, pymupdf_render.ALTO))
+
+
+class _AulaOcupada:
+    """Ocupación de prueba: el aula está ocupada en los turnos `ocupados` de todos los días."""
+
+    def __init__(self, ocupados):
+        self.ocupados = set(ocupados)
+
+    def libre(self, semana, dia, numero, i):
+        return numero not in self.ocupados
+
+    def ocupar(self, semana, dia, numero, i):
+        pass
+
+
+class DistribuirDiasTests(SimpleTestCase):
+
+    def test_todo_cabe(self):
+        horario, sobrantes = distribuir_dias([[3, 2, 4], [1, 1, 1]], ['A', 'B', 'C'], [], 2, random.Random(1))
+        self.assertEqual(sobrantes, [])
+        for semana, balance in zip(horario, [[3, 2, 4], [1, 1, 1]]):
+            dias = semana[:5]
+            self.assertTrue(all(len(dia) <= 2 for dia in dias))
+            self.assertEqual([sum(dia.count(a) for dia in dias) for a in 'ABC'], balance)
+            # Sobran asignaturas distintas: ninguna se repite en un mismo día
+            self.assertTrue(all(len(set(dia)) == len(dia) for dia in dias))
+
+    def test_semana_sin_lugar_informa_sobrantes(self):
+        # Semana 1 con tres días no disponibles: 2 días x 2 turnos = 4 huecos para 9 turnos
+        no_disponibles = [{'numero_semana': 1, 'dia_semana': dia} for dia in (0, 2, 4)]
+        horario, sobrantes = distribuir_dias([[3, 2, 4]], ['A', 'B', 'C'], no_disponibles, 2, random.Random(1))
+        self.assertEqual([horario[0][dia] for dia in (0, 2, 4)], [[], [], []])
+        ubicados = sum(len(dia) for dia in horario[0])
+        self.assertEqual(ubicados, 4)
+        self.assertEqual(sum(sobrante['turnos'] for sobrante in sobrantes), 5)
+        self.assertTrue(all(sobrante['semana'] == 1 for sobrante in sobrantes))
+
+    def test_huecos_no_pasan_del_ultimo_turno(self):
+        # Con los turnos 1-4 ocupados solo quedan el 5 y el 6: lo demás no se ubica
+        horario, sobrantes = distribuir_dias(
+            [[5, 5, 5]], ['A', 'B', 'C'], [], 3, random.Random(1), _AulaOcupada(range(1, 5)),
+        )
+        for dia in horario[0]:
+            self.assertLessEqual(len(dia), MAX_TURNOS_DIA)
+            self.assertEqual(dia[:4], [None] * 4)
+        ubicados = sum(1 for dia in horario[0] for turno in dia if turno is not None)
+        self.assertEqual(ubicados, 10)
+        self.assertEqual(sum(sobrante['turnos'] for sobrante in sobrantes), 15 - ubicados)
+
+
+def _crear_horario(simbologias=('MAT', 'FIS')):
+    """Período de septiembre a diciembre de 2025 con un horario vacío y una asignatura por simbología."""
+    from base.logic.calendario import PeriodCalendar
+    carrera = Career.objects.create(name='Informática', faculty=Faculty.objects.create(name='Ingeniería'))
+    año = Year.objects.create(number=1, career=carrera)
+    periodo = Period.objects.create(
+        name='P1', course=Course.objects.create(name='2025-2026'),
+        start=datetime.date(2025, 9, 1), end=datetime.date(2025, 12, 20),
+    )
+    # Cada test vuelve atrás la base y reusa los ids: el calendario en memoria sería de otro período
+    PeriodCalendar.olvidar(periodo.pk)
+    profesor = Teacher.objects.create(name='Profesor')
+    schedule = Schedule.objects.create(
+        career=carrera, year=año, period=periodo, class_room=ClassRoom.objects.create(name='A1'), group='G1',
+    )
+    for simbologia in simbologias:
+        asignatura = Subject.objects.create(name=simbologia, symbology=simbologia, career=carrera, year=año, hours_found=40)
+        asignatura.teachers.set([profesor])
+        schedule.subjects.add(asignatura)
+    return schedule
+
+
+class RepararPeriodoTests(TestCase):
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        asignatura = self.schedule.subjects.first()
+        profesor = asignatura.teachers.first()
+        # Semana del 8/9: lunes, miércoles y sábado en el turno 1
+        self.turnos = {
+            dia: ClassTime.objects.create(
+                day=datetime.date(2025, 9, dia), number=1, schedule=self.schedule, subject=asignatura, teacher=profesor,
+            )
+            for dia in (8, 10, 13)
+        }
+        DayNotAvailable.objects.create(period=self.schedule.period, day=datetime.date(2025, 9, 10), reason='Feriado')
+        usuario = User.objects.create_user('planificador', password='x')
+        usuario.groups.add(Group.objects.get_or_create(name='planificador')[0])
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def reparar(self, datos):
+        return self.client.post(f'/tasks/api/v1/periods/{self.schedule.period_id}/repair/', datos, format='json')
+
+    def dia(self, dia):
+        self.turnos[dia].refresh_from_db()
+        return self.turnos[dia].day, self.turnos[dia].number
+
+    def test_mueve_solo_turnos_en_dias_no_disponibles(self):
+        response = self.reparar({'dryRun': 'false'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['dry_run'])
+        self.assertEqual(response.data['moved'], 1)
+        nuevo_dia, _ = self.dia(10)
+        self.assertNotEqual(nuevo_dia, datetime.date(2025, 9, 10))
+        self.assertEqual(nuevo_dia - datetime.timedelta(days=nuevo_dia.weekday()), datetime.date(2025, 9, 8))
+        # El sábado es un día válido
+        self.assertEqual(self.dia(13), (datetime.date(2025, 9, 13), 1))
+        self.assertEqual(self.dia(8), (datetime.date(2025, 9, 8), 1))
+
+    def test_dry_run_no_guarda(self):
+        for valor in (True, 'true', '1'):
+            response = self.reparar({'dryRun': valor})
+            self.assertTrue(response.data['dry_run'])
+            self.assertEqual(response.data['moved'], 1)
+            self.assertEqual(self.dia(10), (datetime.date(2025, 9, 10), 1))
+
+    def balance(self, subjects):
+        """Balance de las 16 semanas del período; la segunda columna es la de los turnos de setUp."""
+        balance = [[1, 1] for _ in range(16)]
+        balance[0] = [0, 0]
+        balance[1] = [0, 3]
+        return LoadBalance.objects.create(schedule=self.schedule, balance=balance, subjects=subjects)
+
+    def test_actualiza_la_columna_de_la_asignatura(self):
+        movida = self.turnos[8].subject_id
+        otra = self.schedule.subjects.exclude(pk=movida).get()
+        load_balance = self.balance([otra.pk, movida])
+        WeekNotAvailable.objects.create(
+            period=self.schedule.period, start_date=datetime.date(2025, 9, 8), end_date=datetime.date(2025, 9, 12),
+            reason='Receso',
+        )
+        response = self.reparar({})
+        self.assertEqual(response.data['schedules'][0]['moved_other_week'], 2)
+        self.assertTrue(response.data['schedules'][0]['balance_updated'])
+        # Los dos turnos van a la semana con menos carga (1/9)
+        self.assertEqual(self.dia(8)[0] - datetime.timedelta(days=self.dia(8)[0].weekday()), datetime.date(2025, 9, 1))
+        load_balance.refresh_from_db()
+        self.assertEqual(load_balance.balance[0], [0, 2])
+        self.assertEqual(load_balance.balance[1], [0, 1])
+
+    def test_balance_sin_asignaturas_no_se_toca(self):
+        load_balance = self.balance([])
+        WeekNotAvailable.objects.create(
+            period=self.schedule.period, start_date=datetime.date(2025, 9, 8), end_date=datetime.date(2025, 9, 12),
+            reason='Receso',
+        )
+        response = self.reparar({})
+        self.assertEqual(response.data['schedules'][0]['moved_other_week'], 2)
+        self.assertFalse(response.data['schedules'][0]['balance_updated'])
+        load_balance.refresh_from_db()
+        self.assertEqual(load_balance.balance[1], [0, 3])
+
+
+def _lunes_de_semanas_anterior(start_date, num_semanas, weeks_ranges):
+    """lunes_de_semanas de logicaHorario, antes de pasar al calendario del período."""
+    lunes = []
+    semana_idx = 0
+    for _ in range(num_semanas):
+        week_start = start_date + datetime.timedelta(weeks=semana_idx)
+        while any(start <= week_start <= end for start, end in weeks_ranges):
+            semana_idx += 1
+            week_start = start_date + datetime.timedelta(weeks=semana_idx)
+        lunes.append(week_start)
+        semana_idx += 1
+    return lunes
+
+
+class CalendarioPeriodoTests(SimpleTestCase):
+    """PeriodCalendar debe dar lo mismo que los cálculos que hacía Period recorriendo las semanas."""
+
+    def test_igual_a_los_metodos_de_period(self):
+        from base.logic.calendario import PeriodCalendar
+        rng = random.Random(5)
+        for _ in range(200):
+            inicio = datetime.date(2025, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+            if inicio.weekday() == 6:
+                inicio += datetime.timedelta(days=1)
+            fin = inicio + datetime.timedelta(weeks=rng.randint(3, 23), days=rng.randrange(6))
+            if fin.weekday() == 6:
+                fin -= datetime.timedelta(days=1)
+            period = Period(start=inicio, end=fin)
+            rangos = []
+            for _ in range(rng.randrange(4)):
+                desde = inicio + datetime.timedelta(days=rng.randrange((fin - inicio).days))
+                rangos.append((desde, desde + datetime.timedelta(days=rng.randint(4, 15))))
+            dias = sorted({
+                inicio + datetime.timedelta(days=rng.randrange((fin - inicio).days + 1)) for _ in range(rng.randrange(6))
+            })
+            calendario = PeriodCalendar(period, [(dia, 'Feriado') for dia in dias], rangos)
+
+            def en_rango(fecha, rangos=rangos):
+                return any(desde <= fecha <= hasta for desde, hasta in rangos)
+
+            with self.subTest(inicio=inicio, fin=fin, rangos=rangos, dias=dias):
+                semanas = [period.start_week(k) for k in range(period.number_of_weeks)]
+                self.assertEqual(calendario.lunes, [lunes for lunes in semanas if not en_rango(lunes)])
+                for k, lunes in enumerate(semanas):
+                    self.assertEqual(period.end_week(k), lunes + datetime.timedelta(days=5))
+                for num_semanas in (1, len(calendario.lunes), period.number_of_weeks + 3):
+                    self.assertEqual(
+                        calendario.lunes_de(num_semanas),
+                        _lunes_de_semanas_anterior(period.get_start(), num_semanas, rangos),
+                    )
+                    if rangos:
+                        self.assertEqual(
+                            calendario.lunes_de(num_semanas, ignorar=rangos[:1]),
+                            _lunes_de_semanas_anterior(period.get_start(), num_semanas, rangos[1:]),
+                        )
+
+                # Period.number_of_weeks_excluding_unavailable
+                self.assertEqual(
+                    calendario.semanas_excluyendo_no_disponibles(),
+                    period.number_of_weeks - sum(((hasta - desde).days + 1) // 7 for desde, hasta in rangos),
+                )
+                # Period.days_not_available_by_week
+                self.assertEqual(calendario.dias_no_disponibles_por_semana(), [
+                    {
+                        'numero_semana': (dia - period.get_start()).days // 7 + 1 - sum(hasta < dia for _, hasta in rangos),
+                        'dia_semana': dia.weekday(),
+                    }
+                    for dia in dias
+                ])
+                fecha = period.get_start()
+                while fecha <= period.get_end() + datetime.timedelta(days=7):
+                    self.assertEqual(calendario.bloqueado(fecha), fecha.weekday() > 4 or fecha in dias or en_rango(fecha))
+                    self.assertEqual(calendario.no_disponible(fecha), fecha in dias or en_rango(fecha))
+                    fecha += datetime.timedelta(days=1)
+
+
+def _instancia():
+    """Instancia chica del balance semanal: 3 asignaturas, 6 semanas, turnos de distinta duración."""
+    n, m = 3, 6
+    p = [6, 4, 5]
+    h = [[2, 3, 2, 1, 2, 2], [2, 2, 2, 2], [1, 2, 3, 2, 1]]
+    Q = [10] * m
+    lbound = [[0] * m for _ in range(n)]
+    ubound = [[3] * m for _ in range(n)]
+    return n, m, p, Q, h, lbound, ubound
+
+
+def _varianza(solucion, n, m, h):
+    cargas = [week_load(solucion, j, n, h) for j in range(m)]
+    promedio = sum(cargas) / m
+    return cargas, sum((carga - promedio) ** 2 for carga in cargas)
+
+
+class LoadStateTests(SimpleTestCase):
+    """evaluate/apply deben dar las mismas cargas y objetivo que recalcular con week_load."""
+
+    def test_deltas_iguales_a_recalcular(self):
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        rng = random.Random(3)
+        solucion = initial_solution(n, m, p, Q, h, lbound, ubound)
+        estado = LoadState(solucion, h)
+        for _ in range(200):
+            i = rng.randrange(n)
+            s2 = rng.choice([j for j in range(m) if estado.solution[i][j] > 0])
+            s1 = rng.choice([j for j in range(m) if j != s2])
+            _, antes = _varianza(estado.solution, n, m, h)
+            nuevas, delta = estado.evaluate(i, s1, s2)
+
+            movida = [list(fila) for fila in estado.solution]
+            movida[i][s1] += 1
+            movida[i][s2] -= 1
+            cargas, despues = _varianza(movida, n, m, h)
+            self.assertEqual(nuevas, cargas[min(s1, s2):max(s1, s2) + 1])
+            self.assertAlmostEqual(delta, despues - antes)
+
+            estado.apply(i, s1, s2, nuevas, delta)
+            self.assertEqual(estado.solution, movida)
+            self.assertEqual(estado.loads, cargas)
+            self.assertAlmostEqual(estado.value, despues)
+
+
+class MotoresTabuTests(SimpleTestCase):
+
+    def test_vecindario_numpy_igual_a_evaluate(self):
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        tabu = TabuSearch(initial_solution(n, m, p, Q, h, lbound, ubound), n, m, h, Q, lbound, ubound,
+                          engine='numpy', seed=1)
+        for _ in range(20):
+            vecindario = tabu.moves_numpy(tabu.state)
+            self.assertTrue(vecindario)
+            for movimiento, cargas, delta in vecindario:
+                esperadas, esperado = tabu.state.evaluate(*movimiento)
+                self.assertEqual(cargas, esperadas)
+                self.assertAlmostEqual(delta, esperado)
+            tabu.learn(1)
+
+    def test_motores_dan_soluciones_validas_y_comparables(self):
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        objetivos = {}
+        for engine in ('python', 'numpy'):
+            solucion, resumen = balancear_semanas(n, m, p, Q, h, lbound, ubound, 200, engine=engine, seed=7)
+            self.assertEqual([sum(fila) for fila in solucion], p)
+            cargas, varianza = _varianza(solucion, n, m, h)
+            self.assertTrue(all(carga <= limite for carga, limite in zip(cargas, Q)))
+            self.assertAlmostEqual(resumen['objective'], varianza)
+            objetivos[engine] = varianza
+        self.assertLessEqual(abs(objetivos['python'] - objetivos['numpy']), 2)
+
+    def test_misma_semilla_misma_trayectoria(self):
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        for engine in ('python', 'numpy'):
+            a, _ = balancear_semanas(n, m, p, Q, h, lbound, ubound, 50, engine=engine, seed=11)
+            b, _ = balancear_semanas(n, m, p, Q, h, lbound, ubound, 50, engine=engine, seed=11)
+            self.assertEqual(a, b)
+
+
+class MilpTests(SimpleTestCase):
+
+    def test_milp_optimo(self):
+        n, m, p, Q, _, lbound, ubound = _instancia()
+        h = [[2] * turnos for turnos in p]
+        solucion, resumen = balancear_semanas(n, m, p, Q, h, lbound, ubound, solver='milp', milp_time_limit=5)
+        self.assertTrue(resumen['milp_optimal'])
+        self.assertNotIn('iterations', resumen)
+        self.assertEqual([sum(fila) for fila in solucion], p)
+        for i in range(n):
+            for j in range(m):
+                self.assertLessEqual(lbound[i][j], solucion[i][j])
+                self.assertLessEqual(solucion[i][j], ubound[i][j])
+        # 30 horas en 6 semanas: todas pueden quedar en 5 (± la paridad de los turnos de 2 horas)
+        cargas, _ = _varianza(solucion, n, m, h)
+        self.assertLessEqual(max(cargas) - min(cargas), 2)
+
+    def test_metricas_comparables_entre_metodos(self):
+        n, m, p, Q, _, lbound, ubound = _instancia()
+        h = [[2] * turnos for turnos in p]
+        for solver in SOLVERS:
+            with self.subTest(solver=solver):
+                solucion, resumen = balancear_semanas(n, m, p, Q, h, lbound, ubound, 100, solver=solver, seed=3)
+                cargas, varianza = _varianza(solucion, n, m, h)
+                promedio = sum(cargas) / m
+                self.assertAlmostEqual(resumen['variance'], varianza)
+                self.assertAlmostEqual(resumen['max_deviation'], max(abs(carga - promedio) for carga in cargas))
+                self.assertEqual(resumen['objective'], resumen['variance'])
+
+    def test_sin_milp_aplicable_sigue_con_tabu(self):
+        # Turnos de distinta duración: la carga no es lineal y el MILP no aplica
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        self.assertEqual(balance_milp(initial_solution(n, m, p, Q, h), n, m, p, Q, h), (None, False))
+        solucion, resumen = balancear_semanas(n, m, p, Q, h, lbound, ubound, 30, solver='milp', seed=1)
+        self.assertFalse(resumen['milp_optimal'])
+        self.assertEqual(resumen['iterations'], 30)
+        self.assertEqual([sum(fila) for fila in solucion], p)
+
+
+class MultiStartTests(SimpleTestCase):
+
+    def test_resumen(self):
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        inicial = initial_solution(n, m, p, Q, h, lbound, ubound)
+        solucion, resumen = multi_start_tabu(inicial, n, m, h, Q, lbound, ubound, 40, 3, seed=10, workers=1)
+        self.assertEqual(resumen['starts'], 3)
+        self.assertEqual(resumen['seed'], 10)
+        self.assertEqual(len(resumen['objectives']), 3)
+        self.assertEqual(resumen['best'], min(resumen['objectives']))
+        self.assertEqual(resumen['worst'], max(resumen['objectives']))
+        self.assertEqual(resumen['objectives'][resumen['best_start']], resumen['best'])
+        self.assertAlmostEqual(LoadState(solucion, h).value, resumen['best'])
+        self.assertEqual(resumen['iterations'], [40] * 3)
+        # Cada trayectoria usa la semilla seed + k
+        tabu = TabuSearch(inicial, n, m, h, Q, lbound, ubound, seed=11)
+        tabu.learn(40)
+        self.assertAlmostEqual(tabu.best_state.value, resumen['objectives'][1])
+
+
+class CriteriosDeParadaTests(SimpleTestCase):
+
+    def tabu(self):
+        n, m, p, Q, h, lbound, ubound = _instancia()
+        return TabuSearch(initial_solution(n, m, p, Q, h, lbound, ubound), n, m, h, Q, lbound, ubound, seed=2)
+
+    def test_sin_tiempo(self):
+        tabu = self.tabu()
+        self.assertEqual(tabu.learn(1000, time_budget_ms=0), 0)
+        self.assertEqual(tabu.stop_reason, 'time_budget')
+
+    def test_sin_mejora(self):
+        tabu = self.tabu()
+        tabu.learn(10000, max_no_improve=5)
+        self.assertEqual(tabu.stop_reason, 'no_improvement')
+        self.assertLess(tabu.iterations, 10000)
+
+    def test_objetivo_alcanzado(self):
+        tabu = self.tabu()
+        inicial = tabu.state.value
+        self.assertEqual(tabu.learn(1000, target=inicial), 0)
+        self.assertEqual(tabu.stop_reason, 'target')
+        tabu = self.tabu()
+        tabu.learn(1000, target=inicial - 1)
+        self.assertIn(tabu.stop_reason, ('target', 'iterations'))
+        if tabu.stop_reason == 'target':
+            self.assertLessEqual(tabu.best_state.value, inicial - 1)
+
+    def test_incumbente_nunca_empeora(self):
+        tabu = self.tabu()
+        inicial = tabu.state.value
+        tabu.learn(100)
+        self.assertEqual(tabu.stop_reason, 'iterations')
+        self.assertLessEqual(tabu.best_state.value, inicial)
+        self.assertEqual(tabu.best_so_far, tabu.best_state.solution)
+
+
+class InitialSolutionTests(SimpleTestCase):
+
+    def test_respeta_cotas_y_capacidad(self):
+        n, m, p, Q, h, _, ubound = _instancia()
+        lbound = [[1] + [0] * (m - 1), [0] * m, [0, 0, 1, 0, 0, 0]]
+        x = initial_solution(n, m, p, Q, h, lbound, ubound)
+        self.assertEqual([sum(fila) for fila in x], p)
+        for i in range(n):
+            for j in range(m):
+                self.assertLessEqual(lbound[i][j], x[i][j])
+                self.assertLessEqual(x[i][j], ubound[i][j])
+        cargas, _ = _varianza(x, n, m, h)
+        self.assertTrue(all(carga <= limite for carga, limite in zip(cargas, Q)))
+
+    def test_sin_capacidad_deja_turnos_sin_asignar(self):
+        n, m, p, _, h, lbound, ubound = _instancia()
+        x = initial_solution(n, m, p, [4] * m, h, lbound, ubound)
+        self.assertLess(sum(map(sum, x)), sum(p))
+        self.assertTrue(all(sum(x[i]) <= p[i] for i in range(n)))
+        self.assertTrue(all(x[i][j] <= ubound[i][j] for i in range(n) for j in range(m)))
+
+
+class MoveIndexTests(SimpleTestCase):
+
+    def test_solo_movimientos_legales(self):
+        n, m, p, Q, h, _, ubound = _instancia()
+        lbound = [[1] + [0] * (m - 1), [0] * m, [0, 0, 1, 0, 0, 0]]
+        solucion = initial_solution(n, m, p, Q, h, lbound, ubound)
+        indice = MoveIndex(solucion, lbound, ubound)
+        rng = random.Random(5)
+        for _ in range(500):
+            legales = {
+                (i, s1, s2)
+                for i in range(n) for s1 in range(m) for s2 in range(m)
+                if s1 != s2 and solucion[i][s1] < ubound[i][s1] and solucion[i][s2] > max(lbound[i][s2], 0)
+            }
+            self.assertEqual(set(indice.activas.items), {i for i, _, _ in legales})
+            movimiento = indice.sample(rng)
+            self.assertIn(movimiento, legales)
+            i, s1, s2 = movimiento
+            solucion[i][s1] += 1
+            solucion[i][s2] -= 1
+            indice.update(solucion, i, s1, s2)
+
+
+class SolverCacheTests(TestCase):
+
+    def argumentos(self, **cambios):
+        argumentos = dict(
+            asignaturas=['MAT', 'FIS'], encuentros=[4, 2], lbound=[[0, 0]] * 2, ubound=[[3, 3]] * 2,
+            balance_below=[10, 10], dias_no_disponibles=[{'numero_semana': 2, 'dia_semana': 1},
+                                                         {'numero_semana': 1, 'dia_semana': 3}],
+            actividades=[['1'] * 4, [''] * 2], iteraciones=50, seed=3, opciones={'engine': 'python'},
+        )
+        argumentos.update(cambios)
+        return argumentos
+
+    def test_clave_estable(self):
+        from base.logic.solver_cache import instance_key
+
+        clave = instance_key(**self.argumentos())
+        self.assertEqual(clave, instance_key(**self.argumentos()))
+        # El orden de los días no disponibles no cambia la instancia
+        dias = list(reversed(self.argumentos()['dias_no_disponibles']))
+        self.assertEqual(clave, instance_key(**self.argumentos(dias_no_disponibles=dias)))
+        self.assertNotEqual(clave, instance_key(**self.argumentos(seed=4)))
+        self.assertNotEqual(clave, instance_key(**self.argumentos(encuentros=[4, 3])))
+        self.assertNotEqual(clave, instance_key(**self.argumentos(opciones={'engine': 'numpy'})))
+
+    def test_hit_y_miss(self):
+        from base.logic.solver_cache import get_cached_result, instance_key, store_result
+        from base.models import SolverCacheEntry
+
+        clave = instance_key(**self.argumentos())
+        self.assertIsNone(get_cached_result(clave))
+        store_result(clave, [[2, 1], [2, 1]], [[['MAT'], ['FIS']]], {'objective': 0.5})
+        self.assertEqual(get_cached_result(clave), ([[2, 1], [2, 1]], [[['MAT'], ['FIS']]], {'objective': 0.5}))
+        self.assertEqual(SolverCacheEntry.objects.get(key=clave).hits, 1)
+        self.assertIsNone(get_cached_result(instance_key(**self.argumentos(seed=4))))
+
+
+class BenchSolverTests(SimpleTestCase):
+
+    def correr(self, *argumentos):
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'bench.json')
+            call_command('bench_solver', '--subjects', '3', '--weeks', '4', '--encounters', '1', '2',
+                         '--tightness', '1.5', '--unavailable', '0.1', '--iterations', '20', '--no-memory',
+                         '--output', ruta, *argumentos, stdout=io.StringIO())
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+
+    def test_resultados(self):
+        from base.management.commands.bench_solver import CAMPOS
+
+        datos = self.correr()
+        self.assertEqual(datos['meta']['options']['subjects'], [3])
+        self.assertEqual(len(datos['results']), 2)
+        for fila in datos['results']:
+            self.assertEqual(list(fila), CAMPOS)
+            # Encuentros alrededor de ratio * semanas (entre la mitad y una vez y media)
+            self.assertLessEqual(3 * 4 * fila['encounters_ratio'] / 2, fila['total_turns'])
+            self.assertLessEqual(fila['total_turns'], 3 * 4 * fila['encounters_ratio'] * 1.5 + 3)
+            self.assertEqual(fila['unavailable_days'], 2)
+            self.assertLessEqual(fila['unplaced_turns'], fila['total_turns'])
+            self.assertEqual(fila['iterations'], 20)
+
+    def test_instancias_reproducibles(self):
+        from base.management.commands.bench_solver import generar_instancia
+
+        a = generar_instancia(random.Random(5), 4, 6, 2.0, 1.5, 0.1)
+        self.assertEqual(a, generar_instancia(random.Random(5), 4, 6, 2.0, 1.5, 0.1))
+        self.assertTrue(all(6 <= e <= 18 for e in a['encuentros']))
+        self.assertEqual(len(a['dias_no_disponibles']), 3)
+        self.assertTrue(all(len(fila) == 6 for fila in a['ubound']))
+
+    def test_parametros_invalidos(self):
+        from django.core.management import CommandError, call_command
+
+        with self.assertRaises(CommandError):
+            call_command('bench_solver', '--subjects', '0', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('bench_solver', '--unavailable', '1', stdout=io.StringIO())
+
+
+class GuardarHorarioTests(TestCase):
+
+    def test_cantidad_de_filas(self):
+        schedule = _crear_horario()
+        Activity.objects.create(name='Conferencia', symbology=1)
+        Activity.objects.create(name='Clase práctica', symbology=2)
+        # Viernes 5/9 no disponible: su turno no se guarda
+        DayNotAvailable.objects.create(period=schedule.period, day=datetime.date(2025, 9, 5), reason='Feriado')
+        horario = [[['MAT', 'FIS'], [None, 'MAT'], [], [], ['FIS']]]
+        actividades = [['1', '1,2', ''], ['2', '']]
+
+        creados = guardar_horario(horario, [[2], [2]], ['MAT', 'FIS'], actividades, schedule.pk, schedule.period_id)
+
+        self.assertEqual(creados, 3)
+        turnos = ClassTime.objects.filter(schedule=schedule)
+        self.assertEqual(
+            sorted((t.day.day, t.number, t.subject.symbology) for t in turnos),
+            [(1, 1, 'MAT'), (1, 2, 'FIS'), (2, 2, 'MAT')],
+        )
+        self.assertEqual(ClassTime.activities.through.objects.filter(classtime__schedule=schedule).count(), 4)
+        self.assertEqual(list(LoadBalance.objects.filter(schedule=schedule).values_list('balance', flat=True)), [[[2], [2]]])
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.class_times_version, 1)
+
+    def test_horario_inexistente(self):
+        schedule = _crear_horario()
+        self.assertIsNone(guardar_horario([[[]] * 5], [[0]], ['MAT'], [[]], schedule.pk + 1, schedule.period_id))
+        self.assertFalse(ClassTime.objects.exists())
+
+
+def _cliente_planificador():
+    usuario = User.objects.create_user('planificador', password='x')
+    usuario.groups.add(Group.objects.get_or_create(name='planificador')[0])
+    cliente = APIClient()
+    cliente.force_authenticate(usuario)
+    return cliente
+
+
+def _datos_generacion(schedule, **cambios):
+    """Petición de calculate-balance para las asignaturas de un horario de _crear_horario."""
+    semanas = schedule.period.number_of_weeks_excluding_unavailable()
+    asignaturas = list(schedule.subjects.order_by('pk'))
+    encuentros = [8, 6][:len(asignaturas)]
+    datos = {
+        'subjectsSymbology': [asignatura.symbology for asignatura in asignaturas],
+        'weeksCount': semanas,
+        'encountersList': encuentros,
+        'timeBaseList': [2 * e for e in encuentros],
+        'activitiesList': [[''] * e for e in encuentros],
+        'aboveList': [[2] * semanas for _ in encuentros],
+        'belowList': [[0] * semanas for _ in encuentros],
+        'balanceBelowList': [12] * semanas,
+        'tabuIterations': 20,
+        'seed': 1,
+        'periodId': schedule.period_id,
+        'careerId': schedule.career_id,
+        'yearId': schedule.year_id,
+        'subjectIds': [asignatura.pk for asignatura in asignaturas],
+        'group': 'G2',
+        'classRoom': schedule.class_room_id,
+    }
+    datos.update(cambios)
+    return datos
+
+
+class _EjecutorEnLinea:
+    """Reemplazo de ProcessPoolExecutor para las pruebas: ejecuta cada tarea en el acto."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        try:
+            futuro.set_result(funcion(*args))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+
+class TrabajosGeneracionTests(TestCase):
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        self.client = _cliente_planificador()
+
+    def trabajo(self, **campos):
+        from base.logic.jobs import encolar_generacion
+        from base.views import _opciones_generacion, _payload_generacion
+
+        datos = _datos_generacion(self.schedule)
+        payload = _payload_generacion(datos, self.schedule.period.days_not_available_by_week(), _opciones_generacion(datos))
+        job = encolar_generacion(self.schedule, payload)
+        if campos:
+            GenerationJob.objects.filter(pk=job.pk).update(**campos)
+            job.refresh_from_db()
+        return job
+
+    def test_reclamar_los_mas_antiguos(self):
+        from base.logic.jobs import reclamar_trabajos
+
+        jobs = [self.trabajo() for _ in range(3)]
+        self.assertEqual(reclamar_trabajos(2, 'host:1'), [jobs[0].pk, jobs[1].pk])
+        self.assertEqual(reclamar_trabajos(5, 'host:2'), [jobs[2].pk])
+        self.assertEqual(reclamar_trabajos(5, 'host:3'), [])
+        self.assertEqual(
+            list(GenerationJob.objects.order_by('pk').values_list('state', 'worker')),
+            [(GenerationJob.State.RUNNING, 'host:1')] * 2 + [(GenerationJob.State.RUNNING, 'host:2')],
+        )
+
+    def test_reencolar_solo_workers_muertos_de_este_host(self):
+        from base.logic.jobs import reencolar_en_curso
+
+        terminado = subprocess.Popen([sys.executable, '-c', 'pass'])
+        terminado.wait()
+        en_curso = GenerationJob.State.RUNNING
+        muerto = self.trabajo(state=en_curso, worker=f'host:{terminado.pid}')
+        otros = [
+            self.trabajo(state=en_curso, worker=worker)
+            for worker in (f'host:{os.getppid()}', 'otro-host:1', 'lote', '')
+        ]
+        self.assertEqual(reencolar_en_curso('host'), 1)
+        muerto.refresh_from_db()
+        self.assertEqual((muerto.state, muerto.worker, muerto.started), (GenerationJob.State.PENDING, '', None))
+        for job in otros:
+            job.refresh_from_db()
+            self.assertEqual(job.state, en_curso)
+
+    def test_worker_ejecuta_la_cola(self):
+        from django.core.management import call_command
+
+        jobs = [self.trabajo() for _ in range(2)]
+        GenerationJob.objects.filter(pk=jobs[1].pk).update(schedule=None)
+        with mock.patch('base.management.commands.run_generation_worker.ProcessPoolExecutor', _EjecutorEnLinea), \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            call_command('run_generation_worker', '--once', '--concurrency', '2', '--poll', '0', stdout=io.StringIO())
+        for job in jobs:
+            job.refresh_from_db()
+        self.assertEqual(jobs[0].state, GenerationJob.State.DONE)
+        self.assertEqual(jobs[0].progress, 100)
+        self.assertIn('objective', jobs[0].result)
+        self.assertTrue(ClassTime.objects.filter(schedule=self.schedule).exists())
+        self.assertEqual(jobs[1].state, GenerationJob.State.FAILED)
+        self.assertIn('ya no existe', jobs[1].error)
+
+    def test_estado_y_detencion(self):
+        job = self.trabajo()
+        response = self.client.get(f'/tasks/api/v1/jobs/{job.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['state'], response.data['schedule_id']), ('pending', self.schedule.pk))
+        self.assertEqual(self.client.get(f'/tasks/api/v1/jobs/{job.pk + 1}/').status_code, 404)
+
+        self.assertEqual(self.client.post(f'/tasks/api/v1/jobs/{job.pk}/stop/').status_code, 202)
+        job.refresh_from_db()
+        self.assertTrue(job.stop_requested)
+        GenerationJob.objects.filter(pk=job.pk).update(state=GenerationJob.State.DONE)
+        self.assertEqual(self.client.post(f'/tasks/api/v1/jobs/{job.pk}/stop/').status_code, 409)
+
+        lector = APIClient()
+        lector.force_authenticate(User.objects.create_user('lector', password='x'))
+        self.assertEqual(lector.get(f'/tasks/api/v1/jobs/{job.pk}/').status_code, 403)
+
+    def test_sin_worker_el_trabajo_nace_en_curso(self):
+        estados = []
+
+        def registrar(sender, instance, created, **kwargs):
+            if created:
+                estados.append(instance.state)
+
+        post_save.connect(registrar, sender=GenerationJob)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = self.client.post('/tasks/api/v1/calculate-balance/', _datos_generacion(self.schedule),
+                                            format='json')
+        finally:
+            post_save.disconnect(registrar, sender=GenerationJob)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(estados, [GenerationJob.State.RUNNING])
+        self.assertEqual(response.data['state'], GenerationJob.State.DONE)
+
+    def test_parametros_invalidos_no_crean_nada(self):
+        horarios = Schedule.objects.count()
+        for cambio in ({'tabuIterations': 'abc'}, {'tabuIterations': 0}, {'seed': 'x'}, {'seed': 1.5},
+                       {'milpTimeLimit': 10 ** 9}, {'tabuStarts': 0}, {'timeBudgetMs': -1},
+                       {'maxNoImprove': True}, {'targetObjective': 'nan'}, {'targetObjective': -1},
+                       {'tabuEngine': 'gpu'}, {'solver': 'otro'}):
+            with self.subTest(cambio=cambio), contextlib.redirect_stdout(io.StringIO()):
+                response = self.client.post('/tasks/api/v1/calculate-balance/',
+                                            _datos_generacion(self.schedule, **cambio), format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(cambio)), response.data['error'])
+        self.assertEqual(Schedule.objects.count(), horarios)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_opciones_validas(self):
+        from base.views import _opciones_generacion
+
+        opciones = _opciones_generacion({'tabuIterations': '30', 'seed': 7.0, 'targetObjective': '2.5', 'timeBudgetMs': ''})
+        self.assertEqual(opciones, {
+            'tabu_iterations': 30, 'seed': 7, 'milp_time_limit': 10, 'tabu_starts': 1, 'time_budget_ms': None,
+            'max_no_improve': None, 'target_objective': 2.5, 'engine': 'python', 'solver': 'tabu',
+        })
+
+
+class LoteTests(TestCase):
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        self.aula = ClassRoom.objects.create(name='A2')
+        self.client = _cliente_planificador()
+
+    def lote(self, items, workers=1):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.client.post('/tasks/api/v1/calculate-balance/batch/', {'items': items, 'workers': workers},
+                                    format='json')
+
+    def test_un_horario_por_grupo(self):
+        item = _datos_generacion(self.schedule, seed=5, groups=[
+            {'group': 'G2', 'classRoom': self.schedule.class_room_id}, {'group': 'G3', 'classRoom': self.aula.pk},
+        ])
+        response = self.lote([item])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (2, 0))
+        self.assertEqual([r['group'] for r in response.data['results']], ['G2', 'G3'])
+        self.assertEqual([r['seed'] for r in response.data['results']], [5, 6])
+        jobs = GenerationJob.objects.filter(pk__in=[r['job_id'] for r in response.data['results']])
+        self.assertEqual({(job.state, job.worker) for job in jobs}, {(GenerationJob.State.DONE, 'lote')})
+        # El mismo profesor da clase en los dos grupos: nunca en el mismo turno
+        turnos = ClassTime.objects.filter(schedule__in=[r['schedule_id'] for r in response.data['results']])
+        self.assertEqual(turnos.count(), 2 * (8 + 6))
+        ocupados = list(turnos.values_list('teacher_id', 'day', 'number'))
+        self.assertEqual(len(ocupados), len(set(ocupados)))
+
+    def test_item_invalido_no_crea_nada(self):
+        horarios = Schedule.objects.count()
+        valido = _datos_generacion(self.schedule)
+        for item, mensaje in ((_datos_generacion(self.schedule, seed='x'), "'seed'"),
+                              (_datos_generacion(self.schedule, classRoom=None), "'classRoom'"),
+                              (_datos_generacion(self.schedule, subjectIds=[]), 'asignatura')):
+            with self.subTest(mensaje=mensaje):
+                response = self.lote([valido, item])
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Item 1', response.data['error'])
+                self.assertIn(mensaje, response.data['error'])
+        self.assertEqual(Schedule.objects.count(), horarios)
+        self.assertFalse(GenerationJob.objects.exists())
+        self.assertEqual(self.lote([]).status_code, 400)
+
+
+class EventosTrabajoTests(TestCase):
+
+    def setUp(self):
+        from base.logic.jobs import encolar_generacion
+
+        self.schedule = _crear_horario()
+        self.client = _cliente_planificador()
+        self.job = encolar_generacion(self.schedule, {})
+        GenerationJob.objects.filter(pk=self.job.pk).update(
+            state=GenerationJob.State.RUNNING, stage='balance', progress=30,
+            live={'iteration': 10, 'iterations': 50, 'best': 4.0},
+        )
+
+    def ticket(self, job_id=None):
+        response = self.client.post(f'/tasks/api/v1/jobs/{job_id or self.job.pk}/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def eventos(self, url):
+        response = Client().get(url)
+        return response.status_code, b''.join(response).decode() if response.status_code == 200 else ''
+
+    def test_wsgi_envia_el_estado_actual_y_reintenta(self):
+        estado, cuerpo = self.eventos(self.ticket()['url'])
+        self.assertEqual(estado, 200)
+        self.assertTrue(cuerpo.startswith('retry: '))
+        self.assertIn('event: state\ndata: {"state": "running", "stage": "balance", "progress": 30', cuerpo)
+        self.assertIn('event: progress\ndata: {"iteration": 10', cuerpo)
+        self.assertNotIn('event: end', cuerpo)
+        # Hay alguien mirando: el worker pasa a guardar el progreso en vivo
+        self.job.refresh_from_db()
+        self.assertGreater(self.job.watched_until, timezone.now())
+
+        GenerationJob.objects.filter(pk=self.job.pk).update(state=GenerationJob.State.DONE, stage='terminado')
+        _, cuerpo = self.eventos(self.ticket()['url'])
+        self.assertIn(f'event: end\ndata: {{"state": "done", "schedule_id": {self.schedule.pk}', cuerpo)
+
+    async def test_asgi_transmite_hasta_el_final(self):
+        await GenerationJob.objects.filter(pk=self.job.pk).aupdate(state=GenerationJob.State.FAILED, error='x')
+        ticket = await sync_to_async(self.ticket)()
+        response = await self.async_client.get(ticket['url'])
+        cuerpo = b''.join([parte async for parte in response.streaming_content]).decode()
+        self.assertFalse(cuerpo.startswith('retry: '))
+        self.assertTrue(cuerpo.endswith('event: end\ndata: {"state": "failed", "schedule_id": %d, "error": "x"}\n\n'
+                                        % self.schedule.pk))
+
+    def test_solo_con_ticket_del_trabajo(self):
+        from django.core import signing
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        url = f'/tasks/api/v1/jobs/{self.job.pk}/events/'
+        self.assertEqual(self.eventos(url)[0], 401)
+        otro = GenerationJob.objects.create(schedule=self.schedule)
+        self.assertEqual(self.eventos(f"{url}?ticket={self.ticket(otro.pk)['ticket']}")[0], 401)
+        # El JWT ya no se acepta en la URL
+        usuario = User.objects.get(username='planificador')
+        self.assertEqual(self.eventos(f'{url}?token={AccessToken.for_user(usuario)}')[0], 401)
+        ticket = self.ticket()['ticket']
+        self.assertEqual(self.eventos(f'{url}?ticket={ticket}')[0], 200)
+        with mock.patch.object(signing, 'time', mock.Mock(time=lambda: time.time() + 3600)):
+            self.assertEqual(self.eventos(f'{url}?ticket={ticket}')[0], 401)
+        self.assertEqual(self.client.post(f'/tasks/api/v1/jobs/{self.job.pk + 10}/events/ticket/').status_code, 404)
+        usuario.groups.clear()
+        self.assertEqual(self.eventos(f'{url}?ticket={ticket}')[0], 401)
+
+    def test_observador_sin_clientes_no_guarda_live(self):
+        from base.logic.jobs import ObservadorTrabajo, marcar_observado
+
+        GenerationJob.objects.filter(pk=self.job.pk).update(live={})
+        observador = ObservadorTrabajo(self.job.pk)
+        observador.intervalo = 0
+        with CaptureQueriesContext(connection) as consultas:
+            for iteracion in range(1, 101):
+                self.assertFalse(observador({'iteration': iteracion, 'iterations': 1000}))
+        escrituras = [q for q in consultas.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(escrituras), 7)  # Solo cuando cambia el porcentaje (5% a 11%)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.live, self.job.progress), ({}, 11))
+
+        marcar_observado(self.job.pk)
+        GenerationJob.objects.filter(pk=self.job.pk).update(stop_requested=True)
+        self.assertTrue(observador({'iteration': 101, 'iterations': 1000}))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.live, {'iteration': 101, 'iterations': 1000})
+
+
+class OccupancyIndexTests(TestCase):
+
+    def test_carga_los_turnos_del_periodo_desde_el_indice(self):
+        from base.logic.occupancy import OccupancyIndex
+
+        schedule = _crear_horario()
+        asignatura = schedule.subjects.first()
+        profesor = asignatura.teachers.first()
+        lunes = datetime.date(2025, 9, 8)
+        ClassTime.objects.create(day=lunes, number=2, schedule=schedule, subject=asignatura, teacher=profesor)
+        indice = OccupancyIndex.cargar(schedule.period_id)
+        self.assertFalse(indice.libre(profesor.pk, None, lunes, 2))
+        self.assertFalse(indice.libre(None, schedule.class_room_id, lunes, 2))
+        self.assertTrue(indice.libre(profesor.pk, schedule.class_room_id, lunes, 3))
+        self.assertEqual(len(OccupancyIndex.cargar(schedule.period_id, excluir_schedule=schedule.pk)), 0)
+
+        if connection.vendor == 'sqlite':
+            plan = ClassTime.objects.filter(schedule__period_id=schedule.period_id).values_list(
+                'teacher_id', 'schedule__class_room_id', 'day', 'number').explain()
+            self.assertIn('COVERING INDEX classtime_schedule_slot_idx', plan)
+
+
+class ValidadoresHorarioTests(TestCase):
+    """El ETag (y la clave de la caché de exportaciones) cambia con todo lo que se muestra en el horario."""
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        self.asignatura = self.schedule.subjects.first()
+        self.profesor = self.asignatura.teachers.first()
+        self.actividad = Activity.objects.create(name='Conferencia', symbology=1)
+        turno = ClassTime.objects.create(
+            day=datetime.date(2025, 9, 8), number=1, schedule=self.schedule, subject=self.asignatura, teacher=self.profesor,
+        )
+        turno.activities.add(self.actividad)
+
+    def etag(self):
+        from base.views import _validadores_horario
+        return _validadores_horario(self.schedule.pk, 'exportar', 'pdf')[0]
+
+    def test_cambia_con_los_datos_mostrados(self):
+        schedule = self.schedule
+        for objeto in (self.profesor, self.asignatura, self.actividad, schedule.class_room, schedule.period,
+                       schedule.period.course, schedule.career, schedule.career.faculty):
+            with self.subTest(objeto=type(objeto).__name__):
+                antes = self.etag()
+                objeto.name = f'{objeto.name} (nuevo)'
+                objeto.save()
+                self.assertNotEqual(self.etag(), antes)
+        antes = self.etag()
+        schedule.year.number = 2
+        schedule.year.save()
+        self.assertNotEqual(self.etag(), antes)
+
+    def test_cambia_al_borrar_una_actividad(self):
+        antes = self.etag()
+        self.actividad.delete()
+        self.assertNotEqual(self.etag(), antes)
+
+    def test_cache_de_exportaciones_no_sirve_nombres_viejos(self):
+        import tempfile
+        from unittest import mock
+        from django.http import HttpResponse
+        from base.exports.cache import RenderCache
+        from base.views import _exportar_con_cache, _validadores_horario
+
+        def exportar():
+            validadores = _validadores_horario(self.schedule.pk, 'exportar', 'pdf', 'pymupdf')
+            return _exportar_con_cache(validadores, 'pdf', None, lambda: HttpResponse(self.profesor.name.encode()))
+
+        with tempfile.TemporaryDirectory() as directorio, \
+                mock.patch('base.views.render_cache', return_value=RenderCache(directorio, 1 << 20)):
+            self.assertEqual(exportar()['X-Export-Cache'], 'miss')
+            self.assertEqual(exportar()['X-Export-Cache'], 'hit')
+            self.profesor.name = 'Nombre corregido'
+            self.profesor.save()
+            response = exportar()
+            self.assertEqual(response['X-Export-Cache'], 'miss')
+            self.assertEqual(response.content, b'Nombre corregido')
+
+    def test_otros_horarios_no_cambian(self):
+        otro = Schedule.objects.create(
+            career=self.schedule.career, year=self.schedule.year, period=self.schedule.period,
+            class_room=ClassRoom.objects.create(name='A2'), group='G2',
+        )
+        antes = Schedule.objects.get(pk=otro.pk).updated
+        self.profesor.name = 'Otro nombre'
+        self.profesor.save()
+        self.assertEqual(Schedule.objects.get(pk=otro.pk).updated, antes)
+
+
+class PaginacionTests(TestCase):
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        asignatura = self.schedule.subjects.first()
+        ClassTime.objects.bulk_create(
+            ClassTime(day=datetime.date(2025, 9, 8) + datetime.timedelta(days=k // 6), number=k % 6 + 1,
+                      schedule=self.schedule, subject=asignatura, teacher=asignatura.teachers.first())
+            for k in range(12)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('lector', password='x'))
+
+    def test_turnos_paginados_por_defecto(self):
+        datos = self.client.get('/tasks/api/v1/class_times/', {'schedule': self.schedule.pk}).json()
+        self.assertEqual(datos['count'], 12)
+        self.assertEqual(len(datos['results']), 12)
+        datos = self.client.get('/tasks/api/v1/class_times/', {'page_size': 5, 'page': 3}).json()
+        self.assertEqual(len(datos['results']), 2)
+        self.assertIsNone(datos['next'])
+
+    def test_modelos_sin_page_size_siguen_como_lista(self):
+        datos = self.client.get('/tasks/api/v1/schedules/').json()
+        self.assertIsInstance(datos, list)
+        datos = self.client.get('/tasks/api/v1/schedules/', {'page': 1}).json()
+        self.assertEqual(datos['count'], 1)
+
+
+class ConsultasListadoTests(TestCase):
+    """Los listados del viewset genérico hacen la misma cantidad de consultas con 1 fila o con varias."""
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('lector', password='x'))
+
+    def get(self, url, consultas=None):
+        # Sin calendarios en memoria: se cuentan las consultas de un proceso recién iniciado
+        from base.logic.calendario import PeriodCalendar
+        for period_id in Period.objects.values_list('pk', flat=True):
+            PeriodCalendar.olvidar(period_id)
+        contexto = CaptureQueriesContext(connection) if consultas is None else self.assertNumQueries(consultas)
+        with contexto as capturadas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(capturadas), response.json()
+
+    def assertListadoConstante(self, url, agregar_filas, filas):
+        cantidad, _ = self.get(url)
+        agregar_filas()
+        _, datos = self.get(url, consultas=cantidad)
+        self.assertEqual(len(datos['results'] if isinstance(datos, dict) else datos), filas)
+
+    def test_periodos(self):
+        periodo = self.schedule.period
+        DayNotAvailable.objects.create(period=periodo, day=datetime.date(2025, 9, 10), reason='Feriado')
+
+        def agregar_filas():
+            for k in range(2, 5):
+                otro = Period.objects.create(
+                    name=f'P{k}', course=Course.objects.create(name=f'20{k + 20}-20{k + 21}'),
+                    start=datetime.date(2025, 9, 1), end=datetime.date(2025, 12, 20),
+                )
+                DayNotAvailable.objects.create(period=otro, day=datetime.date(2025, 10, k), reason='Feriado')
+                WeekNotAvailable.objects.create(
+                    period=otro, start_date=datetime.date(2025, 11, 3), end_date=datetime.date(2025, 11, 8), reason='Receso',
+                )
+
+        self.assertListadoConstante('/tasks/api/v1/periods/', agregar_filas, 4)
+
+    def test_turnos(self):
+        asignatura = self.schedule.subjects.first()
+        actividad = Activity.objects.create(name='Conferencia', symbology=1)
+
+        def crear_turno(dia):
+            turno = ClassTime.objects.create(
+                day=datetime.date(2025, 9, dia), number=1, schedule=self.schedule, subject=asignatura,
+                teacher=asignatura.teachers.first(),
+            )
+            turno.activities.add(actividad)
+
+        crear_turno(8)
+        self.assertListadoConstante(
+            f'/tasks/api/v1/class_times/?schedule={self.schedule.pk}', lambda: [crear_turno(dia) for dia in (9, 10, 11)], 4,
+        )
+
+    def test_asignaturas(self):
+        def agregar_filas():
+            for simbologia in ('QUI', 'BIO'):
+                asignatura = Subject.objects.create(
+                    name=simbologia, symbology=simbologia, career=self.schedule.career, year=self.schedule.year,
+                    hours_found=40,
+                )
+                asignatura.teachers.set([Teacher.objects.create(name=f'Profesor {simbologia}')])
+
+        self.assertListadoConstante('/tasks/api/v1/subjects/', agregar_filas, 4)
+
+    def test_horarios(self):
+        def agregar_filas():
+            for grupo in ('G2', 'G3'):
+                schedule = Schedule.objects.create(
+                    career=self.schedule.career, year=self.schedule.year, period=self.schedule.period,
+                    class_room=ClassRoom.objects.create(name=f'A{grupo}'), group=grupo,
+                )
+                schedule.subjects.set(self.schedule.subjects.all())
+
+        self.assertListadoConstante('/tasks/api/v1/schedules/', agregar_filas, 3)
+
+
+class SerializersPorModeloTests(TestCase):
+
+    def test_una_clase_por_modelo(self):
+        from base.serializer import GenericModelSerializer, serializer_for_model
+        from base.views import MODEL_MAP
+        clases = {}
+        for model in MODEL_MAP.values():
+            serializer_class = serializer_for_model(model)
+            self.assertIs(serializer_for_model(model), serializer_class)
+            self.assertIs(serializer_class.Meta.model, model)
+            clases[model] = serializer_class
+        self.assertEqual(len(set(clases.values())), len(clases))
+        self.assertIsNone(GenericModelSerializer.Meta.model)
+
+    def test_hilos_concurrentes_reciben_la_misma_clase(self):
+        import threading
+        from base import serializer as modulo
+        modulo._serializers_por_modelo.pop(Teacher, None)
+        barrera = threading.Barrier(8)
+        clases = []
+
+        def pedir():
+            barrera.wait()
+            clases.append(modulo.serializer_for_model(Teacher))
+
+        hilos = [threading.Thread(target=pedir) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(len(clases), 8)
+        self.assertEqual(len(set(clases)), 1)
+
+    def test_campos_extra(self):
+        from base.serializer import serializer_for_model
+        schedule = _crear_horario()
+        DayNotAvailable.objects.create(period=schedule.period, day=datetime.date(2025, 9, 10), reason='Feriado')
+        datos = serializer_for_model(Schedule)(schedule).data
+        self.assertEqual(datos['to_string'], str(schedule))
+        self.assertEqual(sorted(datos['subjects']), sorted(schedule.subjects.values_list('pk', flat=True)))
+        datos = serializer_for_model(Period)(schedule.period).data
+        self.assertEqual(datos['number_of_weeks_excluding_unavailable'], 16)
+        self.assertEqual(datos['days_not_available_by_week'], [{'numero_semana': 2, 'dia_semana': 2}])
+        self.assertEqual(serializer_for_model(Year)(schedule.year).data['number_choice'], schedule.year.number_choice)
+        self.assertNotIn('to_string', serializer_for_model(Teacher)(Teacher.objects.get()).data)
+
+
+class BorradoTurnosTests(TestCase):
+    """Borrar turnos, en cascada o no, aumenta class_times_version una vez por borrado y no por turno."""
+
+    def setUp(self):
+        self.schedule = _crear_horario()
+        self.asignatura = self.schedule.subjects.first()
+        self.agregar_turnos(1)
+
+    def agregar_turnos(self, cantidad):
+        desde = ClassTime.objects.count()
+        ClassTime.objects.bulk_create(
+            ClassTime(day=datetime.date(2025, 9, 1) + datetime.timedelta(weeks=k // 30, days=k % 30 // 6), number=k % 6 + 1,
+                      schedule=self.schedule, subject=self.asignatura, teacher=self.asignatura.teachers.first())
+            for k in range(desde, desde + cantidad)
+        )
+
+    def consultas_al_borrar(self, obtener):
+        """Consultas de obtener().delete(), que se deshace al terminar."""
+        from django.db import transaction
+        with transaction.atomic():
+            objeto = obtener()
+            with CaptureQueriesContext(connection) as consultas:
+                objeto.delete()
+            transaction.set_rollback(True)
+        return len(consultas)
+
+    def assertBorradoConstante(self, obtener):
+        cantidad = self.consultas_al_borrar(obtener)
+        self.agregar_turnos(59)
+        objeto = obtener()
+        with self.assertNumQueries(cantidad):
+            objeto.delete()
+
+    def test_borrar_periodo(self):
+        self.assertBorradoConstante(lambda: Period.objects.get(pk=self.schedule.period_id))
+        self.assertFalse(ClassTime.objects.exists())
+
+    def test_borrar_horario(self):
+        self.assertBorradoConstante(lambda: Schedule.objects.get(pk=self.schedule.pk))
+        self.assertFalse(ClassTime.objects.exists())
+
+    def test_borrar_profesor_marca_el_horario_una_vez(self):
+        self.assertBorradoConstante(lambda: Teacher.objects.get())
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.class_times_version, 1)
+        self.assertFalse(ClassTime.objects.exists())
+
+    def test_borrar_turnos_marca_el_horario(self):
+        self.agregar_turnos(3)
+        ClassTime.objects.first().delete()
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.class_times_version, 1)
+        ClassTime.objects.filter(schedule=self.schedule).delete()
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.class_times_version, 2)
+        self.assertFalse(ClassTime.objects.exists())
+
+
+class _NavegadorFalso:
+    """Lo que BrowserPool usa de Playwright: new_context().new_page(), is_connected() y close()."""
+
+    def __init__(self):
+        self.conectado = True
+        self.cerrado = False
+
+    def new_context(self):
+        return mock.Mock(new_page=mock.Mock(return_value='pagina'))
+
+    def is_connected(self):
+        return self.conectado
+
+    def close(self):
+        self.cerrado = True
+
+
+class BrowserPoolTests(SimpleTestCase):
+
+    def pool(self, **opciones):
+        from base.exports import BrowserPool
+        self.navegadores = []
+
+        def lanzar():
+            self.navegadores.append(_NavegadorFalso())
+            return mock.Mock(), self.navegadores[-1]
+
+        pool = BrowserPool(1, lanzar=lanzar, **opciones)
+        self.addCleanup(pool.cerrar)
+        return pool
+
+    def test_reusa_el_navegador_y_lo_relanza(self):
+        pool = self.pool(max_renders=2)
+        self.assertEqual([pool.ejecutar(lambda page: page) for _ in range(3)], ['pagina'] * 3)
+        self.assertEqual(len(self.navegadores), 2)
+        self.assertTrue(self.navegadores[0].cerrado)
+
+        self.navegadores[-1].conectado = False
+        pool.ejecutar(lambda page: page)
+        self.assertEqual(len(self.navegadores), 3)
+
+        def fallar(page):
+            raise ValueError('render')
+
+        with self.assertRaises(ValueError):
+            pool.ejecutar(fallar)
+        self.assertTrue(self.navegadores[2].cerrado)
+        pool.ejecutar(lambda page: page)
+        self.assertEqual(len(self.navegadores), 4)
+
+    def test_la_espera_en_cola_vence_y_cancela_el_render(self):
+        import threading
+        pool = self.pool(espera_max=0.2)
+        empezado, liberar = threading.Event(), threading.Event()
+        llamadas = []
+
+        def bloquear(page):
+            empezado.set()
+            liberar.wait(5)
+            return 'primero'
+
+        hilo = threading.Thread(target=lambda: llamadas.append(pool.ejecutar(bloquear)))
+        hilo.start()
+        self.assertTrue(empezado.wait(5))
+        with self.assertRaises(TimeoutError):
+            pool.ejecutar(lambda page: llamadas.append('cancelado'))
+        liberar.set()
+        hilo.join(5)
+        self.assertEqual(pool.ejecutar(lambda page: 'despues'), 'despues')
+        self.assertEqual(llamadas, ['primero'])
+
+    def test_un_render_en_curso_no_se_corta(self):
+        pool = self.pool(espera_max=0.1)
+
+        def lento(page):
+            time.sleep(0.3)
+            return 'listo'
+
+        self.assertEqual(pool.ejecutar(lento), 'listo')
+
+
+class ZipEnParaleloTests(SimpleTestCase):
+
+    def test_miembros_nombres_repetidos_y_errores(self):
+        import threading
+        import zipfile
+        from base.exports.bulk import zip_en_paralelo
+        lock = threading.Lock()
+        en_curso = [0, 0]  # Renders en curso y máximo simultáneo
+
+        def renderizar(tarea):
+            nombre, contenido = tarea
+            with lock:
+                en_curso[0] += 1
+                en_curso[1] = max(en_curso[1], en_curso[0])
+            time.sleep(0.01)
+            with lock:
+                en_curso[0] -= 1
+            return nombre, contenido
+
+        tareas = [
+            ('Informática/1_G1.pdf', b'uno'), ('Informática/1_G1.pdf', b'dos'), ('Informática/1_G2.pdf', None),
+            ('Civil/2_G1.pdf', b'tres'), ('LEEME', b'cuatro'), ('LEEME', b'cinco'),
+        ]
+        trozos = list(zip_en_paralelo(tareas, renderizar, workers=2))
+        self.assertLessEqual(en_curso[1], 2)
+        self.assertGreater(len(trozos), 2)  # Un trozo por miembro, no todo el ZIP al final
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(trozos))) as archivo:
+            contenidos = {nombre: archivo.read(nombre) for nombre in archivo.namelist()}
+        errores = contenidos.pop('ERRORES.txt').decode()
+        self.assertEqual(errores, 'No se pudieron exportar:\nInformática/1_G2.pdf\n')
+        self.assertEqual(sorted(contenidos), [
+            'Civil/2_G1.pdf', 'Informática/1_G1 (2).pdf', 'Informática/1_G1.pdf', 'LEEME', 'LEEME (2)',
+        ])
+        self.assertEqual({contenidos['Informática/1_G1.pdf'], contenidos['Informática/1_G1 (2).pdf']}, {b'uno', b'dos'})
+        self.assertEqual(contenidos['Civil/2_G1.pdf'], b'tres')
+
+    def test_cortar_la_descarga_deja_de_renderizar(self):
+        from base.exports.bulk import zip_en_paralelo
+        renderizados = []
+
+        def renderizar(tarea):
+            renderizados.append(tarea)
+            return f'{tarea}.pdf', b'pdf'
+
+        trozos = zip_en_paralelo(range(100), renderizar, workers=2)
+        next(trozos)
+        trozos.close()
+        self.assertLess(len(renderizados), 10)
+
+
+class ExportarPeriodoZipTests(TransactionTestCase):
+    """Los renders corren en otros hilos, con su propia conexión: los datos tienen que estar guardados."""
+
+    def setUp(self):
+        from base.logic.calendario import PeriodCalendar
+        self.schedule = _crear_horario()
+        PeriodCalendar.olvidar(self.schedule.period_id)
+        asignatura = self.schedule.subjects.first()
+        ClassTime.objects.create(day=datetime.date(2025, 9, 8), number=1, schedule=self.schedule, subject=asignatura,
+                                 teacher=asignatura.teachers.first())
+        Schedule.objects.create(
+            career=self.schedule.career, year=self.schedule.year, period=self.schedule.period,
+            class_room=self.schedule.class_room, group='G2',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('lector', password='x'))
+
+    def test_un_pdf_por_horario(self):
+        import zipfile
+        url = f'/tasks/api/v1/periods/{self.schedule.period_id}/export/'
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.get(url, {'engine': 'pymupdf'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/zip')
+            datos = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(datos)) as archivo:
+            self.assertEqual(sorted(archivo.namelist()), ['Informática/1_G1.pdf', 'Informática/1_G2.pdf'])
+            self.assertTrue(archivo.read('Informática/1_G1.pdf').startswith(b'%PDF'))
+
+        self.assertEqual(self.client.get(url, {'engine': 'otro'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'career': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'career': self.schedule.career_id + 1}).status_code, 404)
+        self.assertEqual(self.client.get('/tasks/api/v1/periods/999/export/').status_code, 404)
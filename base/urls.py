@@ -15,6 +15,13 @@ admin_router.register(r'users', UserViewSet, basename='user-admin')
 urlpatterns = [
     path('api/v1/whoami/', views.whoami, name='whoami'),
     path('api/v1/calculate-balance/', views.calculate_balance, name='calculate_balance'),  # DEBE ir antes del router genérico
+    path('api/v1/calculate-balance/batch/', views.calculate_balance_batch, name='calculate_balance_batch'),
+    path('api/v1/periods/<int:period_id>/repair/', views.repair_period_schedules, name='repair_period_schedules'),
+    path('api/v1/periods/<int:period_id>/export/', views.exportar_periodo_zip, name='exportar_periodo_zip'),
+    path('api/v1/jobs/<int:job_id>/', views.generation_job_status, name='generation_job_status'),  # DEBE ir antes del router genérico
+    path('api/v1/jobs/<int:job_id>/events/', views.generation_job_events, name='generation_job_events'),
+    path('api/v1/jobs/<int:job_id>/events/ticket/', views.generation_job_events_ticket, name='generation_job_events_ticket'),
+    path('api/v1/jobs/<int:job_id>/stop/', views.stop_generation_job, name='stop_generation_job'),
     path('api/v1/admin/', include(admin_router.urls)),  # Primero admin_router
     path('api/v1/', include(router.urls)),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -1,12 +1,22 @@
 from django.shortcuts import render
+from django.conf import settings
+from django.utils import timezone
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch
+import time
 from rest_framework import viewsets
-from .serializer import GenericModelSerializer, RegisterSerializer
-from .models import Task, Activity, Career, Course, Faculty, Period, ClassTime, DayNotAvailable, Teacher, Subject, Schedule, Year, WeekNotAvailable, LoadBalance, ClassRoom
+from rest_framework.exceptions import ValidationError
+from .serializer import GenericModelSerializer, RegisterSerializer, serializer_for_model
+from .pagination import OptionalPageNumberPagination
+from .models import Task, Activity, Career, Course, Faculty, Period, ClassTime, DayNotAvailable, Teacher, Subject, Schedule, Year, WeekNotAvailable, LoadBalance, ClassRoom, GenerationJob
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from .logic.logicaHorario import generar_horario
+from .logic.logicaHorario import TABU_ENGINES, SOLVERS
+from .logic.jobs import (
+    encolar_generacion, ejecutar_trabajo, ejecutar_lote, job_to_dict, marcar_observado, solicitar_detencion,
+)
 
 from django.contrib.auth.models import User
 from rest_framework import generics
@@ -37,30 +47,231 @@ MODEL_MAP = {
     'class_rooms': ClassRoom, 
 }
 
+# Plan de consultas de cada modelo de MODEL_MAP para GenericModelViewSet:
+# - select_related / prefetch_related: relaciones que el serializer o __str__ recorren, para
+#   que un listado haga siempre la misma cantidad de consultas sin importar cuántas filas tenga
+# - filters: parámetro de la URL -> campo por el que se filtra (?schedule=3)
+# - page_size: tamaño de página por defecto. Con él, el listado se pagina aunque no se pida
+#   (?page); sin él, solo se pagina si se pide (ver OptionalPageNumberPagination)
+QUERYSET_PLANS = {
+    'activities': {},
+    'careers': {'filters': {'faculty': 'faculty_id'}},
+    'courses': {},
+    'faculties': {},
+    'periods': {
+        # El calendario de cada período se arma con estos datos (ver PeriodCalendar.construir)
+        'select_related': ('course',),
+        'prefetch_related': (
+            Prefetch('daynotavailable_set', queryset=DayNotAvailable.objects.order_by('pk')),
+            'weeknotavailable_set',
+        ),
+        'filters': {'course': 'course_id'},
+    },
+    'class_times': {
+        'prefetch_related': ('activities',),
+        'filters': {'schedule': 'schedule_id', 'subject': 'subject_id', 'teacher': 'teacher_id', 'day': 'day'},
+        'page_size': 500,
+    },
+    'days_not_available': {'filters': {'period': 'period_id'}},
+    'teachers': {},
+    'subjects': {
+        'prefetch_related': ('teachers',),
+        'filters': {'career': 'career_id', 'year': 'year_id', 'type': 'type'},
+    },
+    'schedules': {
+        # to_string usa la carrera
+        'select_related': ('career',),
+        'prefetch_related': ('subjects',),
+        'filters': {'period': 'period_id', 'career': 'career_id', 'year': 'year_id', 'class_room': 'class_room_id'},
+    },
+    'years': {'filters': {'career': 'career_id'}},
+    'weeks_not_available': {'filters': {'period': 'period_id'}},
+    'load_balances': {'filters': {'schedule': 'schedule_id'}},
+    'class_rooms': {},
+}
+
 class GenericModelViewSet(viewsets.ModelViewSet):
     serializer_class = GenericModelSerializer
     permission_classes = [ReadOnlyOrAdminOrPlanner]  # Solo lectura para usuarios comunes, acceso total para admin/planificador
+    pagination_class = OptionalPageNumberPagination
 
-    def get_serializer(self, *args, **kwargs):
+    def get_serializer_class(self):
         model = self.get_model()
-        kwargs['model'] = model
-        return self.get_serializer_class()(*args, **kwargs)
+        if model is None:
+            return super().get_serializer_class()
+        return serializer_for_model(model)
 
     def get_queryset(self):
         model = self.get_model()
         if model is None:
             return super().get_queryset()
+        plan = self.get_plan()
         queryset = model.objects.all()
-        if model.__name__ == "ClassTime":
-            schedule_id = self.request.query_params.get("schedule")
-            if schedule_id:
-                queryset = queryset.filter(schedule_id=schedule_id)
+        if plan.get('select_related'):
+            queryset = queryset.select_related(*plan['select_related'])
+        if plan.get('prefetch_related'):
+            queryset = queryset.prefetch_related(*plan['prefetch_related'])
+        if self.action == 'list':
+            for param, field in plan.get('filters', {}).items():
+                value = self.request.query_params.get(param)
+                if value:
+                    try:
+                        queryset = queryset.filter(**{field: value})
+                    except (ValueError, DjangoValidationError):
+                        raise ValidationError({param: f'Valor inválido: {value}'})
+            if not queryset.ordered:
+                queryset = queryset.order_by('pk')  # Orden estable para paginar
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Los turnos de un horario (?schedule=<id>) se validan con la versión del horario
+        if self.get_model() is ClassTime and request.query_params.get('schedule', '').isdigit():
+            validadores = _validadores_horario(int(request.query_params['schedule']), 'turnos', request.GET.urlencode())
+            return _respuesta_condicional(request, validadores, lambda: super(GenericModelViewSet, self).list(request, *args, **kwargs))
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.get_model() is Schedule and str(kwargs.get('pk', '')).isdigit():
+            validadores = _validadores_horario(int(kwargs['pk']), 'horario')
+            return _respuesta_condicional(request, validadores, lambda: super(GenericModelViewSet, self).retrieve(request, *args, **kwargs))
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_plan(self):
+        return QUERYSET_PLANS.get(self.kwargs.get('model_name'), {})
+
+    @property
+    def page_size(self):
+        return self.get_plan().get('page_size')
+
     def get_model(self):
         model_name = self.kwargs.get('model_name')
         return MODEL_MAP.get(model_name)
 
+def _validadores_horario(schedule_id, *partes):
+    """
+    ETag y Last-Modified de un recurso que depende de un horario, con una sola consulta a una
+    fila (sin leer los turnos): versión de los turnos, fecha de modificación, carrera (usada en
+    to_string) y versión del calendario del período. Devuelve None si el horario no existe.
+    """
+    import hashlib
+    fila = Schedule.objects.filter(pk=schedule_id).values_list(
+        'class_times_version', 'updated', 'career__name', 'period__calendar_version',
+    ).first()
+    if fila is None:
+        return None
+    version, updated, career_name, calendar_version = fila
+    clave = '|'.join(str(x) for x in (schedule_id, version, updated.isoformat(), career_name, calendar_version) + partes)
+    return f'"{hashlib.sha1(clave.encode()).hexdigest()[:20]}"', updated
+
+
+def _respuesta_condicional(request, validadores, construir):
+    """
+    Responde 304 si el cliente ya tiene la versión actual (If-None-Match / If-Modified-Since),
+    sin construir la respuesta; si no, llama a `construir()` y le agrega ETag y Last-Modified.
+    """
+    from django.utils.cache import get_conditional_response
+    from django.utils.http import http_date
+
+    if validadores is None:
+        return construir()
+    etag, updated = validadores
+    last_modified = int(updated.timestamp())
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if no_modificado is not None:
+        return no_modificado
+    response = construir()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# Opciones numéricas del generador en calculate-balance (y en cada item del lote):
+# campo de la petición -> (clave en el payload, valor por defecto, mínimo, máximo o None)
+OPCIONES_GENERACION = {
+    'tabuIterations': ('tabu_iterations', 50, 1, 1_000_000),
+    'seed': ('seed', None, 0, 2 ** 31 - 1),
+    'milpTimeLimit': ('milp_time_limit', 10, 1, 3600),  # Segundos máximos para CBC
+    'tabuStarts': ('tabu_starts', 1, 1, 64),  # Trayectorias tabú independientes en paralelo
+    'timeBudgetMs': ('time_budget_ms', None, 1, None),  # Tiempo máximo de la búsqueda tabú
+    'maxNoImprove': ('max_no_improve', None, 1, None),  # Iteraciones seguidas sin mejora antes de parar
+}
+
+
+class _DatosInvalidos(Exception):
+    pass
+
+
+def _opciones_generacion(data):
+    """
+    Opciones del generador leídas de la petición, con tipo y rango validados. Lanza
+    _DatosInvalidos con el mensaje del 400; se llama antes de crear el horario y el trabajo,
+    para que un valor inválido no deje un horario vacío ni un trabajo fallido.
+    """
+    import math
+
+    opciones = {}
+    for campo, (clave, por_defecto, minimo, maximo) in OPCIONES_GENERACION.items():
+        valor = data.get(campo)
+        if valor is None or valor == '':
+            opciones[clave] = por_defecto
+            continue
+        try:
+            if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+                raise ValueError(valor)
+            valor = int(valor)
+        except (TypeError, ValueError):
+            raise _DatosInvalidos(f"El campo '{campo}' debe ser un número entero")
+        if maximo is not None and not minimo <= valor <= maximo:
+            raise _DatosInvalidos(f"El campo '{campo}' debe estar entre {minimo} y {maximo}")
+        if valor < minimo:
+            raise _DatosInvalidos(f"El campo '{campo}' debe ser al menos {minimo}")
+        opciones[clave] = valor
+
+    objetivo = data.get('targetObjective')  # Objetivo suficiente para parar
+    if objetivo == '':
+        objetivo = None
+    if objetivo is not None:
+        try:
+            if isinstance(objetivo, bool):
+                raise ValueError(objetivo)
+            objetivo = float(objetivo)
+        except (TypeError, ValueError):
+            raise _DatosInvalidos("El campo 'targetObjective' debe ser un número")
+        if not math.isfinite(objetivo) or objetivo < 0:
+            raise _DatosInvalidos("El campo 'targetObjective' debe ser un número no negativo")
+    opciones['target_objective'] = objetivo
+
+    opciones['engine'] = data.get('tabuEngine', 'python')
+    if opciones['engine'] not in TABU_ENGINES:
+        raise _DatosInvalidos(f"El campo 'tabuEngine' debe ser uno de: {', '.join(TABU_ENGINES)}")
+    opciones['solver'] = data.get('solver', 'tabu')
+    if opciones['solver'] not in SOLVERS:
+        raise _DatosInvalidos(f"El campo 'solver' debe ser uno de: {', '.join(SOLVERS)}")
+    return opciones
+
+
+def _payload_generacion(data, days_not_available_by_week, opciones):
+    """
+    Datos de entrada del generador (los que se guardan en el trabajo) a partir de la petición
+    y de las opciones ya validadas por _opciones_generacion.
+    """
+    return {
+        'subjects_symbology': data.get('subjectsSymbology'),
+        'time_base_list': data.get('timeBaseList', []),
+        'weeks_count': data.get('weeksCount'),
+        'balance_below_list': data.get('balanceBelowList', []),
+        'encounters_list': data.get('encountersList', []),
+        'above_list': data.get('aboveList', []),
+        'below_list': data.get('belowList', []),
+        'days_not_available_by_week': days_not_available_by_week,
+        'activities_list': data.get('activitiesList', []),
+        'period_id': data.get('periodId'),
+        **opciones,
+    }
+
+
 @api_view(['POST'])
 @api_permission_classes([IsAuthenticated, IsPlannerUser | IsAdminUserCustom])
 def calculate_balance(request):
@@ -77,6 +288,10 @@ def calculate_balance(request):
     below_list = data.get('belowList', [])
     balance_below_list = data.get('balanceBelowList', [])
     tabu_iterations = data.get('tabuIterations', 50)  # Valor por defecto 50 si no se envía
+    tabu_engine = data.get('tabuEngine', 'python')  # 'python' o 'numpy'
+    seed = data.get('seed')  # Semilla opcional para reproducir una corrida
+    solver = data.get('solver', 'tabu')  # 'tabu' o 'milp'
+    tabu_starts = data.get('tabuStarts', 1)  # Trayectorias tabú independientes en paralelo
     period_id = data.get('periodId')
     career_id = data.get('careerId')
     year_id = data.get('yearId')
@@ -91,6 +306,10 @@ def calculate_balance(request):
     print(f"group: {group}")
     print(f"classRoom: {class_room_id}")
     print(f"tabuIterations: {tabu_iterations}")
+    print(f"tabuEngine: {tabu_engine}")
+    print(f"seed: {seed}")
+    print(f"solver: {solver}")
+    print(f"tabuStarts: {tabu_starts}")
     print("=======================================")
     
     if not period_id:
@@ -105,6 +324,10 @@ def calculate_balance(request):
         return Response({"error": "El campo 'group' es requerido"}, status=400)
     if not class_room_id:
         return Response({"error": "El campo 'classRoom' es requerido"}, status=400)
+    try:
+        opciones = _opciones_generacion(data)
+    except _DatosInvalidos as e:
+        return Response({"error": str(e)}, status=400)
 
     print("Subjects symbology:", subjects_symbology)
     print("Weeks count:", weeks_count)
@@ -149,21 +372,342 @@ def calculate_balance(request):
             days_not_available_by_week = []
     print("Days not available by week:", days_not_available_by_week)
     
-    generar_horario(
-        subjects_symbology,
-        time_base_list,
-        weeks_count,
-        balance_below_list,
-        encounters_list,
-        above_list,
-        below_list,
-        days_not_available_by_week,
-        activities_list,
-        schedule_id, 
-        period_id,
-        tabu_iterations,
+    payload = _payload_generacion(data, days_not_available_by_week, opciones)
+
+    if not settings.GENERATION_JOBS_ASYNC:
+        # Sin worker: se ejecuta el trabajo dentro de la petición, como antes. Se crea ya en curso
+        # (como en calculate_balance_batch) para que un worker que esté corriendo no lo reclame.
+        job = GenerationJob.objects.create(
+            schedule=schedule, payload=payload, created_by=request.user,
+            state=GenerationJob.State.RUNNING, started=timezone.now(),
+        )
+        ejecutar_trabajo(job.pk, observar=False)
+        job.refresh_from_db()
+        resumen = job.result or None
+        return Response({
+            "message": "Balance calculado correctamente" if job.state == GenerationJob.State.DONE else "Error calculando el balance",
+            "job_id": job.pk,
+            "state": job.state,
+            "schedule_id": schedule_id,
+            "solver_summary": resumen,
+            "cache": resumen.get('cache') if resumen else None,
+        }, status=200 if job.state == GenerationJob.State.DONE else 500)
+
+    job = encolar_generacion(schedule, payload, request.user)
+    return Response({
+        "message": "Generación del horario en cola",
+        "job_id": job.pk,
+        "state": job.state,
+        "schedule_id": schedule_id,
+    }, status=202)
+
+
+class _LoteInvalido(Exception):
+    pass
+
+
+@api_view(['POST'])
+@api_permission_classes([IsAuthenticated, IsPlannerUser | IsAdminUserCustom])
+def calculate_balance_batch(request):
+    """
+    Genera en paralelo los horarios de varios grupos. Recibe {"items": [...], "workers": n};
+    cada item tiene los mismos campos que calculate-balance, pero en lugar de group/classRoom
+    trae "groups": [{"group": "1", "classRoom": 3}, ...] (o una lista de nombres de grupo que
+    comparten el classRoom del item). Se crea un horario y un trabajo por grupo, se resuelven
+    en procesos separados y cada uno se guarda en bloque. Sin semilla, cada grupo recibe una
+    distinta para que los grupos no compartan el mismo horario.
+    """
+    import random
+    from django.db import transaction
+    from .models import Schedule, Period, Career, Year, Subject, ClassRoom
+
+    items = request.data.get('items')
+    workers = request.data.get('workers')
+    if not isinstance(items, list) or not items:
+        return Response({"error": "El campo 'items' debe ser una lista no vacía"}, status=400)
+
+    inicio = time.perf_counter()
+    especificaciones = []
+    try:
+        # Si un item es inválido no se crea ningún horario del lote
+        with transaction.atomic():
+            for indice, item in enumerate(items):
+                for campo in ('periodId', 'careerId', 'yearId'):
+                    if not item.get(campo):
+                        raise _LoteInvalido(f"Item {indice}: el campo '{campo}' es requerido")
+                if not item.get('subjectIds'):
+                    raise _LoteInvalido(f"Item {indice}: debe seleccionar al menos una asignatura")
+                try:
+                    opciones = _opciones_generacion(item)
+                except _DatosInvalidos as e:
+                    raise _LoteInvalido(f"Item {indice}: {e}")
+
+                grupos = item.get('groups') or [{'group': item.get('group'), 'classRoom': item.get('classRoom')}]
+                try:
+                    period = Period.objects.get(pk=item['periodId'])
+                    career = Career.objects.get(pk=item['careerId'])
+                    year = Year.objects.get(pk=item['yearId'])
+                except Exception as e:
+                    raise _LoteInvalido(f"Item {indice}: {e}")
+                subjects = list(Subject.objects.filter(pk__in=item['subjectIds']))
+                payload_base = _payload_generacion(item, period.days_not_available_by_week(), opciones)
+
+                for k, grupo in enumerate(grupos):
+                    if not isinstance(grupo, dict):
+                        grupo = {'group': grupo, 'classRoom': item.get('classRoom')}
+                    if not grupo.get('group'):
+                        raise _LoteInvalido(f"Item {indice}: el campo 'group' es requerido")
+                    if not grupo.get('classRoom'):
+                        raise _LoteInvalido(f"Item {indice}, grupo {grupo['group']}: el campo 'classRoom' es requerido")
+                    try:
+                        class_room = ClassRoom.objects.get(pk=grupo['classRoom'])
+                    except ClassRoom.DoesNotExist:
+                        raise _LoteInvalido(f"Item {indice}, grupo {grupo['group']}: el aula no existe")
+                    schedule = Schedule.objects.create(
+                        career=career, year=year, period=period, group=grupo['group'], class_room=class_room,
+                    )
+                    schedule.subjects.set(subjects)
+                    payload = dict(payload_base)
+                    payload['seed'] = payload_base['seed'] + k if payload_base['seed'] is not None else random.randrange(2 ** 31)
+                    especificaciones.append((indice, grupo['group'], schedule, payload))
+    except _LoteInvalido as e:
+        return Response({"error": str(e)}, status=400)
+
+    # Los trabajos se crean ya en curso para que el worker en segundo plano no los tome
+    jobs = GenerationJob.objects.bulk_create([
+        GenerationJob(schedule=schedule, payload=payload, created_by=request.user,
+                      state=GenerationJob.State.RUNNING, started=timezone.now(), worker='lote')
+        for _, _, schedule, payload in especificaciones
+    ])
+    preparacion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    # El lote corre dentro de la petición: nadie conoce los ids todavía, no hace falta observarlos
+    resultados = ejecutar_lote([job.pk for job in jobs], workers, observar=False)
+
+    respuesta = []
+    for (indice, grupo, schedule, _), job in zip(especificaciones, jobs):
+        job.refresh_from_db()
+        estado, tiempo_ms = resultados[job.pk]
+        resumen = job.result or {}
+        respuesta.append({
+            "item": indice,
+            "group": grupo,
+            "job_id": job.pk,
+            "schedule_id": schedule.pk,
+            "state": job.state,
+            "elapsed_ms": tiempo_ms,
+            "objective": resumen.get('objective'),
+            "variance": resumen.get('variance'),
+            "max_deviation": resumen.get('max_deviation'),
+            "seed": resumen.get('seed'),
+            "cache": resumen.get('cache'),
+            "unplaced_turns": resumen.get('unplaced_turns'),
+            "error": job.error or None,
+        })
+    correctos = sum(1 for r in respuesta if r['state'] == GenerationJob.State.DONE)
+    return Response({
+        "message": f"{correctos} de {len(respuesta)} horarios generados",
+        "succeeded": correctos,
+        "failed": len(respuesta) - correctos,
+        "prepare_ms": preparacion_ms,
+        "total_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "results": respuesta,
+    })
+
+
+@api_view(['POST'])
+@api_permission_classes([IsAuthenticated, IsPlannerUser | IsAdminUserCustom])
+def repair_period_schedules(request, period_id):
+    """
+    Mueve los turnos de los horarios del período que caen en días o semanas no disponibles
+    agregados después de generarlos. Acepta "scheduleIds" (por defecto todos los horarios del
+    período) y "dryRun" para ver el resultado sin guardar.
+    """
+    from .logic.repair import reparar_periodo
+
+    if not Period.objects.filter(pk=period_id).exists():
+        return Response({"error": "El período no existe"}, status=404)
+    schedule_ids = request.data.get('scheduleIds') or None
+    dry_run = request.data.get('dryRun', False) in (True, 'true', '1')
+    resultados = reparar_periodo(period_id, schedule_ids, dry_run)
+    return Response({
+        "message": "Vista previa de la reparación" if dry_run else "Horarios reparados",
+        "dry_run": dry_run,
+        "moved": sum(r['moved_same_week'] + r['moved_other_week'] for r in resultados),
+        "unplaced": sum(len(r['unplaced']) for r in resultados),
+        "schedules": resultados,
+    })
+
+
+@api_view(['GET'])
+@api_permission_classes([IsAuthenticated, IsPlannerUser | IsAdminUserCustom])
+def generation_job_status(request, job_id):
+    """Estado, progreso y horario resultante de un trabajo de generación."""
+    try:
+        job = GenerationJob.objects.get(pk=job_id)
+    except GenerationJob.DoesNotExist:
+        return Response({"error": "El trabajo no existe"}, status=404)
+    return Response(job_to_dict(job))
+
+
+@api_view(['POST'])
+@api_permission_classes([IsAuthenticated, IsPlannerUser | IsAdminUserCustom])
+def stop_generation_job(request, job_id):
+    """
+    Detiene la búsqueda de un trabajo; el horario se guarda con la mejor solución hasta ahora.
+    Solo sirve con GENERATION_JOBS_ASYNC: sin worker el trabajo corre dentro de la petición de
+    calculate-balance y su id recién se conoce cuando ya terminó.
+    """
+    if not GenerationJob.objects.filter(pk=job_id).exists():
+        return Response({"error": "El trabajo no existe"}, status=404)
+    if not solicitar_detencion(job_id):
+        return Response({"error": "El trabajo ya terminó"}, status=409)
+    return Response({"message": "Detención solicitada", "job_id": job_id}, status=202)
+
+
+TICKET_EVENTOS_SALT = 'base.generation_job_events'
+
+
+@api_view(['POST'])
+@api_permission_classes([IsAuthenticated, IsPlannerUser | IsAdminUserCustom])
+def generation_job_events_ticket(request, job_id):
+    """
+    Ticket para abrir los eventos de un trabajo con EventSource, que no permite encabezados:
+    va en ?ticket= en lugar del JWT, así que en los logs de accesos y proxies queda algo que
+    solo sirve para leer el progreso de ese trabajo y vence en GENERATION_EVENTS_TICKET_SECONDS.
+    """
+    from django.core import signing
+    from django.urls import reverse
+
+    if not GenerationJob.objects.filter(pk=job_id).exists():
+        return Response({"error": "El trabajo no existe"}, status=404)
+    ticket = signing.dumps({'job': job_id, 'user': request.user.pk}, salt=TICKET_EVENTOS_SALT)
+    return Response({
+        "ticket": ticket,
+        "expires_in": settings.GENERATION_EVENTS_TICKET_SECONDS,
+        "url": f"{reverse('generation_job_events', args=[job_id])}?ticket={ticket}",
+    })
+
+
+def _usuario_planificador_eventos(request, job_id):
+    """
+    Autentica con el JWT del encabezado Authorization o con un ticket de
+    generation_job_events_ticket para este trabajo en ?ticket=. Devuelve el usuario si es
+    planificador o administrador, si no None.
+    """
+    from django.core import signing
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+    autenticador = JWTAuthentication()
+    encabezado = autenticador.get_header(request)
+    if encabezado:
+        try:
+            usuario = autenticador.get_user(autenticador.get_validated_token(autenticador.get_raw_token(encabezado)))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+    else:
+        try:
+            datos = signing.loads(request.GET.get('ticket', ''), salt=TICKET_EVENTOS_SALT,
+                                  max_age=settings.GENERATION_EVENTS_TICKET_SECONDS)
+        except signing.BadSignature:  # También si venció (SignatureExpired)
+            return None
+        if datos.get('job') != job_id:
+            return None
+        usuario = User.objects.filter(pk=datos.get('user'), is_active=True).first()
+    if usuario is None or not usuario.groups.filter(name__in=['administrador', 'planificador']).exists():
+        return None
+    return usuario
+
+
+async def generation_job_events(request, job_id):
+    """
+    Server-Sent Events con el progreso de un trabajo de generación. Emite `progress` con cada
+    evento nuevo de la búsqueda tabú (iteración, objetivo actual y mejor, cargas por semana,
+    tiempo transcurrido), `state` cuando cambia el estado o la etapa y `end` al terminar.
+    El worker guarda el progreso en el trabajo; aquí solo se consulta cada
+    GENERATION_EVENTS_POLL_SECONDS.
+
+    Se autentica con el encabezado Authorization o con ?ticket= (ver
+    generation_job_events_ticket). Mientras hay un cliente conectado el worker guarda el
+    progreso en vivo (marcar_observado); sin nadie mirando solo actualiza el porcentaje.
+    Los eventos solo existen con GENERATION_JOBS_ASYNC: sin worker el trabajo corre dentro
+    de la petición de calculate-balance, sin observador, y cuando se conoce su id ya terminó.
+
+    El flujo continuo necesita un servidor ASGI (p. ej. `uvicorn backend.asgi:application` o
+    `gunicorn -k uvicorn.workers.UvicornWorker backend.asgi:application`): bajo WSGI Django
+    consume el iterador asíncrono entero antes de responder. Por eso con WSGI se envía el
+    estado actual una sola vez con `retry:`, y EventSource vuelve a conectarse a ese ritmo
+    (sondeo en lugar de flujo).
+    """
+    import asyncio
+    import json
+    from asgiref.sync import sync_to_async
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import JsonResponse, StreamingHttpResponse
+
+    if request.method != 'GET':
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+    usuario = await sync_to_async(_usuario_planificador_eventos)(request, job_id)
+    if usuario is None:
+        return JsonResponse({"error": "No autorizado"}, status=401)
+
+    consultar = sync_to_async(
+        lambda: GenerationJob.objects.filter(pk=job_id)
+        .values('state', 'progress', 'stage', 'live', 'schedule_id', 'error', 'stop_requested')
+        .first()
     )
-    return Response({"message": "Balance calculado correctamente", "schedule_id": schedule_id})
+    if await consultar() is None:
+        return JsonResponse({"error": "El trabajo no existe"}, status=404)
+
+    def evento(nombre, datos):
+        return f"event: {nombre}\ndata: {json.dumps(datos, default=str)}\n\n"
+
+    flujo_continuo = isinstance(request, ASGIRequest)
+    observar = sync_to_async(marcar_observado)
+
+    async def eventos():
+        anterior_estado = None
+        anterior_live = None
+        espera = settings.GENERATION_EVENTS_POLL_SECONDS
+        sin_cambios = 0.0
+        if not flujo_continuo:
+            yield f"retry: {max(int(espera * 1000), 1000)}\n\n"
+        while True:
+            await observar(job_id)
+            job = await consultar()
+            if job is None:
+                yield evento('end', {'state': 'deleted'})
+                return
+            estado = (job['state'], job['stage'], job['stop_requested'])
+            if estado != anterior_estado:
+                anterior_estado = estado
+                sin_cambios = 0.0
+                yield evento('state', {
+                    'state': job['state'], 'stage': job['stage'], 'progress': job['progress'],
+                    'stop_requested': job['stop_requested'],
+                })
+            if job['live'] and job['live'] != anterior_live:
+                anterior_live = job['live']
+                sin_cambios = 0.0
+                yield evento('progress', job['live'])
+            if job['state'] in (GenerationJob.State.DONE, GenerationJob.State.FAILED):
+                yield evento('end', {
+                    'state': job['state'], 'schedule_id': job['schedule_id'], 'error': job['error'] or None,
+                })
+                return
+            if not flujo_continuo:
+                return
+            await asyncio.sleep(espera)
+            sin_cambios += espera
+            if sin_cambios >= 15:
+                # Comentario SSE para que los proxies no cierren la conexión inactiva
+                sin_cambios = 0.0
+                yield ": keep-alive\n\n"
+
+    respuesta = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -200,6 +744,7 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 from django.http import HttpResponse
+from .exports import browser_pool, render_cache
 from django.template.loader import render_to_string
 import os
 from django.templatetags.static import static
@@ -252,29 +797,11 @@ def build_schedule_pdf_context(schedule_id, request=None):
     course = period.course if hasattr(period, 'course') else None
     subjects = {s.id: s for s in schedule.subjects.all()}
 
-    start_date = period.start
-    end_date = period.end
-
-    dias_no_disponibles = list(DayNotAvailable.objects.filter(period=period))
-    semanas_no_disponibles = list(WeekNotAvailable.objects.filter(period=period))
-
-    weeks = []
-    current = start_date - timedelta(days=start_date.weekday())
-    week_num = 1
-    while current <= end_date:
-        unavailable = False
-        for w in semanas_no_disponibles:
-            if w.start_date <= current <= w.end_date:
-                unavailable = True
-                break
-        if not unavailable:
-            weeks.append({
-                'weekNum': week_num,
-                'start': current,
-                'end': current + timedelta(days=4),
-            })
-            week_num += 1
-        current += timedelta(weeks=1)
+    calendario = period.calendar()
+    weeks = [
+        {'weekNum': k + 1, 'start': lunes, 'end': lunes + timedelta(days=4)}
+        for k, lunes in enumerate(calendario.lunes)
+    ]
 
     dias_semana = [
         {'nombre': 'Lunes', 'index': 0},
@@ -297,7 +824,6 @@ def build_schedule_pdf_context(schedule_id, request=None):
 
     activities_list = _collect_activities_for_schedule(schedule)
 
-    dias_libres = {d.day: d.reason for d in dias_no_disponibles}
 
     def _to_date_obj(x):
         if x is None:
@@ -325,7 +851,7 @@ def build_schedule_pdf_context(schedule_id, request=None):
         for dia in dias_semana:
             fecha_dt = week['start'] + timedelta(days=dia['index'])
             fecha = _to_date_obj(fecha_dt)
-            if fecha in { _to_date_obj(k) for k in dias_libres.keys() }:
+            if calendario.dia_no_disponible(fecha):
                 week_row.append({'type': 'libre', 'fecha': fecha_dt})
                 continue
             turnos_dia = [ct for ct in class_times if _to_date_obj(getattr(ct, 'day', None)) == fecha]
@@ -519,10 +1045,170 @@ def build_schedule_pdf_context(schedule_id, request=None):
     return context
 
 
+EXPORT_FORMATOS = {
+    'pdf': ('application/pdf', 'horario_playwright.pdf'),
+    'png': ('image/png', 'horario_playwright.png'),
+}
+
+
+def _exportar_con_cache(validadores, formato, dpi, renderizar):
+    """
+    Sirve la exportación desde la caché en disco si ya se renderizó esta versión del horario
+    con el mismo formato y dpi; si no, la renderiza y la guarda. La clave sale del ETag, que
+    cambia con cada modificación del horario y también al renombrar lo que muestra (profesores,
+    asignaturas, aulas...; ver base/signals.py).
+    """
+    cache = render_cache()
+    if validadores is None or not cache.activa:
+        return renderizar()
+    clave = cache.clave(validadores[0], formato, dpi)
+    contenido = cache.get(clave)
+    if contenido is not None:
+        content_type, nombre = EXPORT_FORMATOS[formato]
+        response = HttpResponse(contenido, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        response['X-Export-Cache'] = 'hit'
+        return response
+    response = renderizar()
+    if response.status_code == 200:
+        cache.put(clave, response.content)
+        response['X-Export-Cache'] = 'miss'
+    return response
+
+
+EXPORT_MOTORES = ('chromium', 'pymupdf')
+
+
+def _motor_exportacion(request):
+    """Motor pedido con ?engine= (EXPORT_ENGINE si no se indica), o None si no es válido."""
+    motor = request.GET.get('engine') or settings.EXPORT_ENGINE
+    return motor if motor in EXPORT_MOTORES else None
+
+
+def _dpi_exportacion(request, por_defecto=300):
+    try:
+        dpi = int(request.GET.get('dpi', por_defecto))
+    except ValueError:
+        dpi = por_defecto
+    return min(max(dpi, 72), 600)
+
+
 def exportar_horario_pdf_playwright(request, schedule_id):
+    motor = _motor_exportacion(request)
+    if motor is None:
+        return HttpResponse(f"Motor de exportación no válido. Opciones: {', '.join(EXPORT_MOTORES)}", status=400)
+    validadores = _validadores_horario(schedule_id, 'exportar', 'pdf', motor)
+    if motor == 'pymupdf':
+        renderizar = lambda: _exportar_horario_pymupdf(request, schedule_id, 'pdf')
+    else:
+        renderizar = lambda: _exportar_horario_pdf_playwright(request, schedule_id)
+    return _respuesta_condicional(request, validadores, lambda: _exportar_con_cache(
+        validadores, 'pdf', None, renderizar,
+    ))
+
+
+@api_view(['GET'])
+@api_permission_classes([IsAuthenticated])
+def exportar_periodo_zip(request, period_id):
+    """
+    ZIP con el PDF de cada horario del período (o solo de ?career= / ?year=), una carpeta por
+    carrera. Los horarios se renderizan en paralelo (EXPORT_BULK_WORKERS a la vez, con el motor
+    de ?engine=) pasando por la caché de exportaciones, y el ZIP se envía a medida que cada PDF
+    termina.
+    """
+    from django.db import connection
+    from django.http import StreamingHttpResponse
+    from django.utils.text import get_valid_filename
+    from .exports.bulk import zip_en_paralelo
+
+    period = Period.objects.filter(pk=period_id).first()
+    if period is None:
+        return Response({"error": "El período no existe"}, status=404)
+    motor = _motor_exportacion(request)
+    if motor is None:
+        return Response({"error": f"Motor de exportación no válido. Opciones: {', '.join(EXPORT_MOTORES)}"}, status=400)
+    schedules = Schedule.objects.filter(period=period)
+    try:
+        if request.query_params.get('career'):
+            schedules = schedules.filter(career_id=int(request.query_params['career']))
+        if request.query_params.get('year'):
+            schedules = schedules.filter(year_id=int(request.query_params['year']))
+    except ValueError:
+        return Response({"error": "career y year deben ser ids numéricos"}, status=400)
+    horarios = list(schedules.order_by('career__name', 'year__number', 'group').values_list(
+        'id', 'career__name', 'year__number', 'group'))
+    if not horarios:
+        return Response({"error": "No hay horarios para exportar"}, status=404)
+
+    def renderizar(horario):
+        schedule_id, carrera, año, grupo = horario
+        nombre = f'{get_valid_filename(carrera)}/{año}_{get_valid_filename(grupo or schedule_id)}.pdf'
+        try:
+            validadores = _validadores_horario(schedule_id, 'exportar', 'pdf', motor)
+            if motor == 'pymupdf':
+                response = _exportar_con_cache(validadores, 'pdf', None, lambda: _exportar_horario_pymupdf(request, schedule_id, 'pdf'))
+            else:
+                response = _exportar_con_cache(validadores, 'pdf', None, lambda: _exportar_horario_pdf_playwright(request, schedule_id))
+            return nombre, response.content if response.status_code == 200 else None
+        except Exception as e:
+            print(f"❌ Error exportando el horario {schedule_id}: {str(e)}")
+            return nombre, None
+        finally:
+            # Cada hilo del pool abre su propia conexión
+            connection.close()
+
+    respuesta = StreamingHttpResponse(
+        zip_en_paralelo(horarios, renderizar, settings.EXPORT_BULK_WORKERS),
+        content_type='application/zip',
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="horarios_{get_valid_filename(period.name)}.zip"'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+def _exportar_horario_pymupdf(request, schedule_id, formato, dpi=300):
+    """Exportación sin navegador: el horario se dibuja con PyMuPDF (base/exports/pymupdf_render.py)."""
+    print(f"===== EXPORTAR {formato.upper()} (PyMuPDF): Schedule ID {schedule_id} =====")
+    try:
+        from .exports import pymupdf_render
+        import fitz  # PyMuPDF  # noqa: F401 (solo comprobar que está instalado)
+    except Exception as e:
+        print(f"❌ Error importando PyMuPDF: {str(e)}")
+        return HttpResponse(
+            "PyMuPDF no está disponible en este entorno. Instálalo con 'pip install pymupdf'.",
+            status=503,
+        )
+
+    try:
+        context = build_schedule_pdf_context(schedule_id, request=request)
+    except Exception as e:
+        print(f"❌ Error construyendo contexto: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return HttpResponse(f"Error construyendo el contexto: {str(e)}", status=500)
+
+    try:
+        logo = pymupdf_render.logo_por_defecto()
+        if formato == 'png':
+            contenido = pymupdf_render.renderizar_png(context, dpi=dpi, logo=logo)
+        else:
+            contenido = pymupdf_render.renderizar_pdf(context, logo=logo)
+    except Exception as e:
+        print(f"❌ Error con PyMuPDF: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return HttpResponse(f"Error generando {formato.upper()} con PyMuPDF: {str(e)}", status=500)
+
+    content_type, nombre = EXPORT_FORMATOS[formato]
+    response = HttpResponse(contenido, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+
+def _exportar_horario_pdf_playwright(request, schedule_id):
     print(f"===== EXPORTAR PDF: Schedule ID {schedule_id} =====")
     try:
-        from playwright.sync_api import sync_playwright  # type: ignore
+        import playwright.sync_api  # type: ignore  # noqa: F401 (solo comprobar que está instalado)
     except Exception as e:
         print(f"❌ Error importando Playwright: {str(e)}")
         return HttpResponse(
@@ -565,24 +1251,9 @@ def exportar_horario_pdf_playwright(request, schedule_id):
         html_string = f'<base href="{base_href}">{html_string}'
 
     try:
-        print("🎭 Iniciando Playwright...")
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu'
-                ]
-            )
-            try:
-                page = browser.new_page()
-                page.set_content(html_string, wait_until="networkidle")
-                pdf_bytes = page.pdf(format="A4")
-                print("✅ PDF generado exitosamente")
-            finally:
-                browser.close()
+        print("🎭 Renderizando con el pool de Chromium...")
+        pdf_bytes = browser_pool().pdf(html_string)
+        print("✅ PDF generado exitosamente")
     except Exception as e:
         print(f"❌ Error con Playwright: {str(e)}")
         import traceback
@@ -596,9 +1267,24 @@ def exportar_horario_pdf_playwright(request, schedule_id):
 
 
 def exportar_horario_imagen_playwright(request, schedule_id):
+    motor = _motor_exportacion(request)
+    if motor is None:
+        return HttpResponse(f"Motor de exportación no válido. Opciones: {', '.join(EXPORT_MOTORES)}", status=400)
+    dpi = _dpi_exportacion(request)
+    validadores = _validadores_horario(schedule_id, 'exportar', 'imagen', dpi, motor)
+    if motor == 'pymupdf':
+        renderizar = lambda: _exportar_horario_pymupdf(request, schedule_id, 'png', dpi)
+    else:
+        renderizar = lambda: _exportar_horario_imagen_playwright(request, schedule_id, dpi)
+    return _respuesta_condicional(request, validadores, lambda: _exportar_con_cache(
+        validadores, 'png', dpi, renderizar,
+    ))
+
+
+def _exportar_horario_imagen_playwright(request, schedule_id, dpi=300):
     print(f"===== EXPORTAR IMAGEN: Schedule ID {schedule_id} =====")
     try:
-        from playwright.sync_api import sync_playwright  # type: ignore
+        import playwright.sync_api  # type: ignore  # noqa: F401 (solo comprobar que está instalado)
     except Exception as e:
         print(f"❌ Error importando Playwright: {str(e)}")
         return HttpResponse(
@@ -654,30 +1340,10 @@ def exportar_horario_imagen_playwright(request, schedule_id):
         )
 
     try:
-        print("🎭 Iniciando Playwright...")
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu'
-                ]
-            )
-            try:
-                page = browser.new_page()
-                # Forzar estilos de impresión para que la plantilla con @page se aplique
-                try:
-                    page.emulate_media(media="print")
-                except Exception:
-                    pass
-                page.set_content(html_string, wait_until="networkidle")
-                # Generar PDF con Playwright (esto preserva exactamente la distribución A4)
-                pdf_bytes = page.pdf(format="A4", print_background=True)
-                print("✅ PDF generado exitosamente")
-            finally:
-                browser.close()
+        print("🎭 Renderizando con el pool de Chromium...")
+        # Generar PDF con Playwright (esto preserva exactamente la distribución A4)
+        pdf_bytes = browser_pool().pdf(html_string, emular_impresion=True, print_background=True)
+        print("✅ PDF generado exitosamente")
     except Exception as e:
         print(f"❌ Error con Playwright: {str(e)}")
         import traceback
@@ -690,7 +1356,6 @@ def exportar_horario_imagen_playwright(request, schedule_id):
         # Abrir PDF desde bytes
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
         page0 = doc.load_page(0)
-        dpi = 300.0
         zoom = dpi / 72.0
         mat = fitz.Matrix(zoom, zoom)
         pix = page0.get_pixmap(matrix=mat, alpha=False)
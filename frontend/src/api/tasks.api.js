@@ -64,8 +64,21 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Algunos listados (los turnos) vienen siempre paginados: se siguen las páginas hasta el final
+const getAllPages = async (resource, params = {}) => {
+  const items = [];
+  let { data } = await apiClient.get(`/${resource}/`, { params });
+  while (!Array.isArray(data)) {
+    items.push(...data.results);
+    if (!data.next) return items;
+    ({ data } = await apiClient.get(data.next));
+  }
+  return items.concat(data);
+};
+
 const createApiEndpoints = (resource) => ({
   getAll: () => apiClient.get(`/${resource}/`),
+  getAllPages: (params) => getAllPages(resource, params),
   get: (id) => apiClient.get(`/${resource}/${id}/`),
   create: (data) => apiClient.post(`/${resource}/`, data),
   update: (id, data) => apiClient.put(`/${resource}/${id}/`, data),
@@ -93,6 +106,10 @@ export const usersApi = createApiEndpoints("admin/users");
 export const calculateBalanceApi = (data) =>
   apiClient.post("calculate-balance/", data);
 
+// Estado de un trabajo de generación encolado por calculate-balance
+export const generationJobApi = (jobId) =>
+  apiClient.get(`jobs/${jobId}/`);
+
 // NUEVO: Endpoint para obtener el rol/grupo del usuario autenticado
 export const whoamiApi = (config = {}) =>
   apiClient.get("whoami/", config);
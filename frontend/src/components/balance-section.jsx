@@ -22,7 +22,44 @@ import {
   TableRow,
 } from "@/components/ui/table";
 import { ArrowRightCircle } from "lucide-react";
-import { periodsApi, calculateBalanceApi } from "../api/tasks.api";
+import { periodsApi, calculateBalanceApi, generationJobApi } from "../api/tasks.api";
+
+// Consulta del trabajo de generación en segundo plano: cada 1 s, hasta 10 minutos en total.
+// Si sigue pendiente después de 1 minuto es que ningún worker lo tomó.
+const JOB_POLL_MS = 1000;
+const JOB_MAX_POLLS = 600;
+const JOB_MAX_PENDING_POLLS = 60;
+const JOB_MAX_POLL_ERRORS = 5;
+
+// Espera a que termine el trabajo; devuelve el trabajo o lanza un Error con el motivo
+async function waitForGenerationJob(jobId) {
+  let job = { state: "pending" };
+  let pendingPolls = 0;
+  let pollErrors = 0;
+  for (let poll = 0; poll < JOB_MAX_POLLS; poll++) {
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+    try {
+      job = (await generationJobApi(jobId)).data;
+      pollErrors = 0;
+    } catch (error) {
+      pollErrors += 1;
+      if (pollErrors >= JOB_MAX_POLL_ERRORS) {
+        throw new Error("No se pudo consultar el estado de la generación. Revise su conexión e intente de nuevo.");
+      }
+      continue;
+    }
+    if (job.state === "done") return job;
+    if (job.state === "failed") {
+      const detail = (job.error || "").trim().split("\n").pop();
+      throw new Error(`No se pudo generar el horario.${detail ? ` ${detail}` : ""}`);
+    }
+    pendingPolls = job.state === "pending" ? pendingPolls + 1 : 0;
+    if (pendingPolls >= JOB_MAX_PENDING_POLLS) {
+      throw new Error("La generación sigue en cola: no hay ningún proceso atendiendo los trabajos. Contacte al administrador.");
+    }
+  }
+  throw new Error(`La generación no terminó en ${(JOB_MAX_POLLS * JOB_POLL_MS) / 60000} minutos (trabajo ${jobId}). Consulte más tarde el horario generado.`);
+}
 
 function useBreakpoint() {
   const [breakpoint, setBreakpoint] = useState("lg");
@@ -230,6 +267,15 @@ export default function BalanceSection({ data, updateData, onComplete }) {
 
     try {
       const response = await calculateBalanceApi(formData);
+      // La generación corre en segundo plano: esperar a que el trabajo termine
+      if (response.status === 202 && response.data?.job_id) {
+        try {
+          await waitForGenerationJob(response.data.job_id);
+        } catch (error) {
+          alert(`Error: ${error.message}`);
+          return;
+        }
+      }
       if (response.data && response.data.schedule_id) {
         navigate(`/calendario/${response.data.schedule_id}`);
       } else {
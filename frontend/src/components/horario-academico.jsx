@@ -345,10 +345,9 @@ export function HorarioAcademico({ scheduleId }) {
       });
       setActivitiesMap(amap);
 
-      const { data: classTimesList } = await class_times.getAll();
-      const filteredClassTimes = classTimesList.filter(
-        (ct) => ct.schedule === Number(scheduleId)
-      );
+      const filteredClassTimes = await class_times.getAllPages({
+        schedule: scheduleId,
+      });
       setClassTimes(filteredClassTimes); // solo para mostrar
       setOriginalTurnos(JSON.parse(JSON.stringify(filteredClassTimes))); // copia inmutable
       setEditedTurnos(JSON.parse(JSON.stringify(filteredClassTimes)));
@@ -595,10 +594,9 @@ export function HorarioAcademico({ scheduleId }) {
       }
 
       // Recargar los turnos desde la base de datos para reflejar los cambios
-      const { data: classTimesList } = await class_times.getAll();
-      const filteredClassTimes = classTimesList.filter(
-        (ct) => ct.schedule === Number(scheduleId)
-      );
+      const filteredClassTimes = await class_times.getAllPages({
+        schedule: scheduleId,
+      });
       setClassTimes(filteredClassTimes);
       setOriginalTurnos(JSON.parse(JSON.stringify(filteredClassTimes)));
       setEditedTurnos(JSON.parse(JSON.stringify(filteredClassTimes)));